@@ -7,7 +7,15 @@ from .models import (
     Issue,
     IssueDepartment,
     Response,
-    Notification
+    Notification,
+    ProcessingJob,
+    ExtractionCacheEntry,
+    ModelCallMetric,
+    IssueIndexEntry,
+    IssueIndexVocabulary,
+    MatchVerdict,
+    CacheVersion,
+    DepartmentAlias
 )
 
 
@@ -36,3 +44,17 @@ admin.site.register(Issue)
 admin.site.register(IssueDepartment)
 admin.site.register(Response)
 admin.site.register(Notification)
+admin.site.register(ProcessingJob)
+admin.site.register(ExtractionCacheEntry)
+admin.site.register(ModelCallMetric)
+admin.site.register(IssueIndexEntry)
+admin.site.register(IssueIndexVocabulary)
+admin.site.register(MatchVerdict)
+admin.site.register(CacheVersion)
+
+
+@admin.register(DepartmentAlias)
+class DepartmentAliasAdmin(admin.ModelAdmin):
+    list_display = ("alias", "department", "source", "use_count", "updated_at")
+    list_filter = ("source",)
+    search_fields = ("alias", "department__dept_name")
@@ -0,0 +1,195 @@
+"""
+allocation.py - Writes a DPO-reviewed minutes draft as Issues and IssueDepartment assignments.
+
+Re-allocating a draft updates what an earlier allocation wrote: issues are
+matched on (minutes, issue_title) and assignments on (issue, department),
+as update_or_create did per row. Everything is done in bulk inside one
+transaction: existing rows and parent chains are preloaded, then written
+with bulk_create and upserts, so the query count does not grow with the
+number of issues (parent chains cost one query per level of depth).
+
+Bulk writes send no post_save, so the work of the Issue signals (similarity
+index entries, stale match verdicts) and the alias signal (department
+matcher version) is done here explicitly.
+"""
+import time
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from .department_utils import _extract_departments, get_department_matcher, learn_department_aliases
+from .issue_index_store import index_issues
+from .match_cache import invalidate_issues
+from .models import Issue, IssueDepartment, Notification, User
+
+ISSUE_FIELDS = ['issue_no', 'issue_description', 'location', 'priority', 'parent_issue']
+
+
+def _upsert(model, objs, fields):
+    """
+    Write loaded rows back as INSERT ... ON CONFLICT (id) DO UPDATE of `fields`:
+    one statement, without the per-row CASE expressions of bulk_update that
+    dominate re-allocation time.
+    """
+    if objs:
+        model.objects.bulk_create(objs, update_conflicts=True, unique_fields=['id'], update_fields=fields)
+
+
+def _parse_deadline(item):
+    """Parse deadline from item data, defaulting to 14 days from today."""
+    raw = item.get('deadline', '')
+    if raw and raw.strip():
+        try:
+            # Handle DD-MM-YYYY format from frontend
+            parts = raw.strip().split('-')
+            if len(parts) == 3:
+                return date(int(parts[2]), int(parts[1]), int(parts[0]))
+        except (ValueError, IndexError):
+            pass
+    return date.today() + timedelta(days=14)
+
+
+def _parent_id(item):
+    try:
+        return int(item.get('parent_issue_id')) if item.get('parent_issue_id') else None
+    except (ValueError, TypeError):
+        return None
+
+
+def _resolve_roots(parent_ids):
+    """
+    {parent_id: root issue id}. Star topology: follow-ups always point at the
+    top-most issue. Ids that do not exist are left out, as before.
+    """
+    parents = {}
+    pending = set(parent_ids)
+    while pending:
+        found = dict(Issue.objects.filter(id__in=pending).values_list('id', 'parent_issue_id'))
+        parents.update(found)
+        pending = {parent for parent in found.values() if parent and parent not in parents}
+
+    roots = {}
+    for parent_id in parent_ids:
+        if parent_id not in parents:
+            continue
+        current, visited = parent_id, set()
+        while parents.get(current) and current not in visited:
+            visited.add(current)
+            current = parents[current]
+        roots[parent_id] = current
+    return roots
+
+
+def _notify_departments(dept_counts):
+    """One notification per department user for genuinely new assignments."""
+    if not dept_counts:
+        return 0
+    counts = {dept.pk: count for dept, count in dept_counts.items()}
+    users = User.objects.filter(department_id__in=list(counts)).exclude(role__in=['DPO', 'COLLECTOR']).only('id', 'department_id')
+    notifications = [
+        Notification(
+            user=u,
+            issue_department=None,
+            message=f"ACTION REQUIRED: {counts[u.department_id]} new issues have been assigned to your department."
+        )
+        for u in users
+    ]
+    Notification.objects.bulk_create(notifications)
+    return len(notifications)
+
+
+def allocate_issues(minute_obj, issues_data, user=None, resolution=None):
+    """
+    Create or update the issues of `minute_obj` and their department
+    assignments. Returns counts of what was written.
+    """
+    resolution = resolution or get_department_matcher().resolution('allocation')
+    started = time.perf_counter()
+
+    with transaction.atomic():
+        # Corrections are read before normalization rewrites the department fields
+        learn_department_aliases(issues_data, resolution.maps, user=user, resolution=resolution)
+
+        rows = []
+        for item in issues_data:
+            normalized_item = resolution.normalize_issue(item)
+            departments = [resolution.match(name) for name in _extract_departments(normalized_item)]
+            rows.append((item, [dept for dept in departments if dept], _parse_deadline(item)))
+
+        roots = _resolve_roots({pid for pid in (_parent_id(item) for item in issues_data) if pid})
+
+        titles = {item.get('issue', 'No Title') for item, _depts, _deadline in rows}
+        issues = {}
+        for issue in Issue.objects.filter(minutes=minute_obj, issue_title__in=titles).order_by('id'):
+            issues.setdefault(issue.issue_title, issue)
+        existing_ids = {issue.pk for issue in issues.values()}
+
+        # Later items with the same title overwrite earlier ones, as sequential update_or_create did
+        changed = set()
+        for item, _depts, _deadline in rows:
+            title = item.get('issue', 'No Title')
+            issue = issues.get(title) or Issue(minutes=minute_obj, issue_title=title)
+            values = {
+                'issue_no': str(item.get('issue_no', '')),
+                'issue_description': item.get('issue_description', ''),
+                'location': item.get('location', ''),
+                'priority': item.get('priority', 'Medium'),
+                'parent_issue_id': roots.get(_parent_id(item)),
+            }
+            if any(getattr(issue, field) != value for field, value in values.items()):
+                changed.add(title)
+            for field, value in values.items():
+                setattr(issue, field, value)
+            issues[title] = issue
+
+        # Rows a re-allocation leaves as they were are not written again
+        updated = [issue for title, issue in issues.items() if issue.pk and title in changed]
+        created = [issue for issue in issues.values() if not issue.pk]
+        _upsert(Issue, updated, ISSUE_FIELDS)
+        if created:
+            Issue.objects.bulk_create(created)
+
+        assignments = {}
+        if existing_ids:
+            for link in IssueDepartment.objects.filter(issue_id__in=existing_ids).order_by('id'):
+                assignments.setdefault((link.issue_id, link.department_id), link)
+        dept_counts = {}
+        new_links, updated_links = {}, {}
+        for item, departments, deadline in rows:
+            issue = issues[item.get('issue', 'No Title')]
+            for dept in departments:
+                key = (issue.pk, dept.pk)
+                link = assignments.get(key) or new_links.get(key)
+                if link is None:
+                    link = IssueDepartment(issue=issue, department=dept)
+                    new_links[key] = link
+                    # Only count as new assignment if the IssueDepartment is being created
+                    dept_counts[dept] = dept_counts.get(dept, 0) + 1
+                elif link.pk and (link.deadline_date != deadline or link.status != 'pending'):
+                    updated_links[key] = link
+                link.deadline_date = deadline
+                link.status = 'pending'
+        _upsert(IssueDepartment, list(updated_links.values()), ['deadline_date', 'status'])
+        if new_links:
+            IssueDepartment.objects.bulk_create(new_links.values())
+
+        notified = _notify_departments(dept_counts)
+
+        # What the Issue post_save signals would have done; an optimization, so never fail the allocation
+        try:
+            with transaction.atomic():
+                index_issues(created + updated)
+                invalidate_issues(updated)
+        except Exception as e:
+            print(f"⚠️ Issue index update failed during allocation: {e}")
+
+    summary = {
+        'issues_created': len(created),
+        'issues_updated': len(updated),
+        'assignments_created': len(new_links),
+        'assignments_updated': len(updated_links),
+        'notifications': notified,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    print(f"📌 Allocated {len(issues_data)} issue(s) to minutes {minute_obj.pk}: {summary}")
+    return summary
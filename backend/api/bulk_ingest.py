@@ -0,0 +1,247 @@
+"""
+bulk_ingest.py - Back-load many minutes files from one ZIP archive.
+
+Parsing, Gemini extraction and the Supabase upload of each file run in a
+process pool; everything that touches the database (cache lookups,
+department normalization, Minutes rows) stays in the parent process.
+"""
+import json
+import multiprocessing
+import os
+import re
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+
+import django
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .models import Minutes
+from .gemini_utils import analyze_document_with_gemini
+from .supabase_utils import upload_to_supabase
+from .extraction_cache import lookup_extraction, store_extraction
+from .model_metrics import collect_metrics, merge_metrics, metrics_endpoint
+from .near_duplicates import resolve_near_duplicates
+from .department_utils import (
+    build_available_departments,
+    get_department_matcher,
+)
+
+SUPABASE_BUCKET = os.getenv('SUPABASE_BUCKET_NAME', 'Mnutes')
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx')
+
+# "26.04.2025", "26-04-2025" or "26_04_2025" anywhere in the file name
+FILENAME_DATE_RE = re.compile(r'(\d{1,2})[.\-_](\d{1,2})[.\-_](\d{4})')
+
+
+def default_worker_count():
+    configured = int(getattr(settings, 'BULK_INGEST_MAX_WORKERS', 0) or 0)
+    return configured if configured > 0 else min(4, os.cpu_count() or 1)
+
+
+def _pool_options():
+    """
+    Pool children need Django's app registry. Forked children inherit it;
+    spawn and forkserver (the Linux default from Python 3.14) start a fresh
+    interpreter, so where fork is unavailable each child runs django.setup().
+    """
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return {'mp_context': multiprocessing.get_context('fork')}
+    return {'mp_context': multiprocessing.get_context('spawn'), 'initializer': django.setup}
+
+
+def meeting_date_from_filename(filename, fallback):
+    match = FILENAME_DATE_RE.search(filename)
+    if match:
+        day, month, year = (int(g) for g in match.groups())
+        try:
+            return date(year, month, day)
+        except ValueError:
+            pass
+    return fallback
+
+
+def _unpack_zip(zip_path, target_dir):
+    """Extract supported files flat into target_dir. Returns [(original_name, path)]."""
+    os.makedirs(target_dir, exist_ok=True)
+    members = []
+    used_names = set()
+    with zipfile.ZipFile(zip_path) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or '__MACOSX' in info.filename:
+                continue
+            # Only the base name is used, so entries can't escape target_dir
+            name = os.path.basename(info.filename)
+            if not name or not name.lower().endswith(SUPPORTED_EXTENSIONS):
+                continue
+
+            stored_name = name
+            while stored_name in used_names:
+                stem, ext = os.path.splitext(name)
+                stored_name = f"{stem}_{uuid.uuid4().hex[:6]}{ext}"
+            used_names.add(stored_name)
+
+            path = os.path.join(target_dir, stored_name)
+            with archive.open(info) as src, open(path, 'wb') as dest:
+                dest.write(src.read())
+            members.append((name, path))
+    return members
+
+
+def _process_member(file_path, original_filename, available_departments, needs_extraction):
+    """
+    Runs in a pool process: extract (unless cached) and upload one file.
+    Must not touch the database; model call metrics are returned for the
+    parent to write.
+    """
+    started = time.perf_counter()
+    metrics = []
+    extraction = {}
+    try:
+        raw_data, complete = None, True
+        if needs_extraction:
+            with collect_metrics() as metrics, metrics_endpoint('job:bulk_ingest'):
+                raw_data, complete = analyze_document_with_gemini(file_path, available_departments, extraction)
+            if not raw_data:
+                # Nothing to ingest, so the file isn't uploaded either
+                error = 'No issues extracted' if complete else 'Extraction failed'
+                return {'raw_data': None, 'complete': complete, 'public_url': None, 'error': error,
+                        'seconds': round(time.perf_counter() - started, 3), 'metrics': metrics,
+                        'presegment': extraction.get('presegment')}
+        with open(file_path, 'rb') as f:
+            file_data = f.read()
+        public_url = upload_to_supabase(
+            file_data=file_data,
+            original_filename=original_filename,
+            bucket=SUPABASE_BUCKET,
+            folder='public'
+        )
+        return {'raw_data': raw_data, 'complete': complete, 'public_url': public_url, 'error': '',
+                'seconds': round(time.perf_counter() - started, 3), 'metrics': metrics,
+                'presegment': extraction.get('presegment')}
+    except Exception as e:
+        return {'raw_data': None, 'complete': False, 'public_url': None, 'error': str(e),
+                'seconds': round(time.perf_counter() - started, 3), 'metrics': metrics,
+                'presegment': extraction.get('presegment')}
+
+
+def _entry_status(entry):
+    """'failed' (no Minutes created), 'partial' (some sections were lost) or 'ok'."""
+    if entry['error']:
+        return 'failed'
+    return 'ok' if entry['complete'] else 'partial'
+
+
+def ingest_zip(zip_path, user, default_meeting_date=None, max_workers=None, manifest_path=None, on_progress=None):
+    """
+    Ingest every PDF/DOCX in `zip_path` as a Minutes record uploaded by `user`.
+
+    Returns the manifest: one dict per file with status, minutes_id, issue
+    count, completeness and cache hit flags, timing, pre-segmenter stats,
+    error and the normalized issues. Files whose extraction failed or found no issues are
+    'failed' and get no Minutes; incomplete extractions are 'partial'. The
+    manifest is also written as JSON to `manifest_path` (default: next to
+    the ZIP).
+    """
+    default_meeting_date = default_meeting_date or timezone.now().date()
+    max_workers = max_workers or default_worker_count()
+    target_dir = os.path.join('media', 'minutes', f"bulk_{uuid.uuid4().hex[:8]}")
+
+    members = _unpack_zip(zip_path, target_dir)
+    print(f"--- 📦 Bulk ingest: {len(members)} file(s) from {zip_path}, {max_workers} worker(s) ---")
+
+    available_departments = build_available_departments()
+    entries = []
+    for original_name, path in members:
+        with open(path, 'rb') as f:
+            file_sha256, cache_key, cached = lookup_extraction(f.read(), available_departments)
+        entries.append({
+            'filename': original_name,
+            'path': path,
+            'file_sha256': file_sha256,
+            'cache_key': cache_key,
+            'raw_data': cached,
+            'cache_hit': cached is not None,
+        })
+
+    # Forked children must not reuse (and later close) the parent's DB sockets
+    connections.close_all()
+
+    done = 0
+    with ProcessPoolExecutor(max_workers=max_workers, **_pool_options()) as pool:
+        futures = {
+            pool.submit(_process_member, e['path'], e['filename'], available_departments, not e['cache_hit']): e
+            for e in entries
+        }
+        for future in as_completed(futures):
+            entry = futures[future]
+            try:
+                outcome = future.result()
+            except Exception as e:
+                # A crashed child (BrokenProcessPool) fails its file, not the whole archive
+                outcome = {'raw_data': None, 'complete': False, 'public_url': None,
+                           'error': f"{type(e).__name__}: {e}", 'seconds': 0.0, 'metrics': [], 'presegment': None}
+            merge_metrics(outcome['metrics'])
+            entry['public_url'] = outcome['public_url']
+            entry['error'] = outcome['error']
+            entry['seconds'] = outcome['seconds']
+            entry['presegment'] = outcome['presegment']
+            entry['complete'] = entry['cache_hit'] or outcome['complete']
+            if not entry['cache_hit']:
+                entry['raw_data'] = outcome['raw_data']
+                # Partial extractions are ingested but not cached
+                if entry['raw_data'] and outcome['complete']:
+                    store_extraction(entry['cache_key'], entry['file_sha256'], entry['raw_data'], entry['filename'])
+            done += 1
+            print(f"  [{done}/{len(entries)}] {entry['filename']}: {len(entry['raw_data'] or [])} issues in {entry['seconds']}s")
+            if on_progress:
+                on_progress(done, len(entries))
+
+    # One memo for the whole archive: the same committee stakeholders recur in every file
+    resolution = get_department_matcher().resolution(os.path.basename(zip_path))
+    to_create = []
+    for entry in entries:
+        if entry['error']:
+            continue
+        entry['clean_data'] = resolve_near_duplicates(
+            [resolution.normalize_issue(item) for item in (entry['raw_data'] or [])]
+        )
+        to_create.append(Minutes(
+            title=entry['filename'],
+            meeting_date=meeting_date_from_filename(entry['filename'], default_meeting_date),
+            uploaded_by=user,
+            file_path=entry['public_url'] or entry['path'],
+        ))
+    created = iter(Minutes.objects.bulk_create(to_create))
+
+    resolution.log()
+
+    manifest = []
+    for entry in entries:
+        minute_obj = None if entry['error'] else next(created)
+        manifest.append({
+            'filename': entry['filename'],
+            'status': _entry_status(entry),
+            'minutes_id': minute_obj.id if minute_obj else None,
+            'meeting_date': minute_obj.meeting_date.isoformat() if minute_obj else None,
+            'issue_count': len(entry.get('clean_data') or []),
+            'complete': entry['complete'],
+            'cache_hit': entry['cache_hit'],
+            'seconds': entry.get('seconds'),
+            'presegment': entry.get('presegment'),
+            'error': entry['error'],
+            'clean_data': entry.get('clean_data') or [],
+        })
+
+    manifest_path = manifest_path or f"{os.path.splitext(zip_path)[0]}.manifest.json"
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    ok = sum(1 for m in manifest if m['status'] == 'ok')
+    partial = sum(1 for m in manifest if m['status'] == 'partial')
+    print(f"✅ Bulk ingest finished: {ok}/{len(manifest)} ok, {partial} partial, manifest at {manifest_path}")
+    return manifest
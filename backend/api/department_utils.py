@@ -0,0 +1,761 @@
+"""
+department_utils.py - Matching of extracted stakeholder strings to the Department master list.
+
+Shared by the upload/allocation views and the background job worker.
+
+The lookup maps are built once per process by the DepartmentMatcher
+returned from get_department_matcher(). Department and DepartmentAlias
+signals bump a version stamp in the database (CacheVersion 'departments'), and each process
+rebuilds its matcher when it sees a newer stamp, so all workers stay in
+step with the master list. Keys come from department_keys (Unicode and
+transliteration aware) and are stored on Department. Within one upload or allocation request,
+matcher.resolution() memoizes each distinct stakeholder string.
+"""
+import difflib
+import heapq
+import json
+import threading
+import time
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .department_keys import KEY_VERSION, canonical_key, department_keys, phonetic_key
+from .models import CacheVersion, Department, DepartmentAlias
+
+DEPARTMENTS_VERSION_KEY = 'departments'
+# CacheVersion row holding the department_keys.KEY_VERSION the stored keys were computed with
+DEPARTMENT_KEYS_VERSION_KEY = 'department_keys'
+
+KEY_NGRAM = 3
+# Keys sharing the most trigrams with the query that difflib ranks first
+FUZZY_CANDIDATES = 100
+FUZZY_CUTOFF = 0.55
+# Answers (misses included) remembered per index; cleared when full
+FUZZY_MEMO_SIZE = 10000
+# Shorter skeletons ("KSB", "PLS") are left to the exact and alias maps
+PHONETIC_MIN_LENGTH = 4
+
+
+def _format_available(departments):
+    available_departments = []
+    for dept in departments:
+        desig = (dept.designation or '').strip()
+        name = (dept.dept_name or '').strip()
+        if desig:
+            available_departments.append(f"{desig}, {name}")
+        else:
+            available_departments.append(name)
+    return available_departments
+
+
+def build_available_departments():
+    """Return the master list formatted as "Designation, Department Name" for the model prompt."""
+    return list(get_department_matcher().available)
+
+
+def _extract_departments(item):
+    val = item.get('departments')
+    # AI now returns a list of objects: [{"designation": "...", "department": "..."}, ...]
+    if isinstance(val, list):
+        return val
+    
+    # Fallback for old/manual data
+    val = item.get('department', 'GENERAL')
+    return [
+        d.strip()[:100]
+        for d in str(val).split(',')
+        if d.strip()
+    ]
+
+
+def _dept_key(value):
+    # Canonical Unicode form (NFKC, no ZWJ/ZWNJ, one chillu encoding), letters, digits and Malayalam signs
+    return canonical_key(value)
+
+
+def _build_department_name_maps(departments, aliases=None, key=None):
+    """
+    `key` replaces _dept_key (and the keys stored on Department) for
+    measurements against another normalization; the phonetic map is then left empty.
+    """
+    key_fn = key or _dept_key
+    exact = {}
+    normalized = {}
+    designation_map = {}
+    combined = {}
+    phonetic = {}
+
+    for dept in departments:
+        name = (dept.dept_name or '').strip()
+        desig = (dept.designation or '').strip()
+        if not name:
+            continue
+
+        exact[name.upper()] = dept
+        
+        # Keys precomputed on save (Department.name_key etc.); computed here for unsaved rows
+        n_name = (not key and getattr(dept, 'name_key', '')) or key_fn(name)
+        if n_name and n_name not in normalized:
+            normalized[n_name] = dept
+            
+        if desig:
+            n_desig = key_fn(desig)
+            if n_desig and n_desig not in designation_map:
+                designation_map[n_desig] = dept
+            
+            n_comb = (not key and getattr(dept, 'combined_key', '')) or key_fn(f"{desig}{name}")
+            if n_comb and n_comb not in combined:
+                combined[n_comb] = dept
+
+        if not key:
+            p_name = getattr(dept, 'phonetic_key', '') or phonetic_key(name)
+            if len(p_name) >= PHONETIC_MIN_LENGTH:
+                phonetic.setdefault(p_name, []).append(dept)
+
+    return {
+        'exact': exact,
+        'normalized': normalized,
+        'designation': designation_map,
+        'combined': combined,
+        # Only skeletons naming a single department; a shared one would be a guess
+        'phonetic': {p_key: depts[0] for p_key, depts in phonetic.items() if len(depts) == 1},
+        'normalized_keys': list(normalized.keys()),
+        'key_index': DepartmentKeyIndex(normalized, combined),
+        # alias_key -> Department, learned from DPO corrections (DepartmentAlias)
+        'alias': dict(aliases or {}),
+        'key': key_fn,
+    }
+
+
+def _key_grams(key):
+    return {key[i:i + KEY_NGRAM] for i in range(len(key) - KEY_NGRAM + 1)}
+
+
+class DepartmentKeyIndex:
+    """
+    Trigram inverted index over the normalized and combined department keys.
+
+    Replaces the linear containment scan and the difflib pass over every key
+    in _match_department with lookups that only touch keys sharing trigrams
+    with the query, while returning the same department. A name close to no
+    key still has to be ruled out against every key of a similar length, so
+    fuzzy answers are kept in a dict by exact key: each unknown name pays
+    that scan once per index, not on every upload.
+    """
+
+    def __init__(self, normalized, combined):
+        # Entry ids follow the scan order of the linear version (normalized
+        # keys, then combined keys) so ties are broken the same way
+        self.keys = list(normalized.keys()) + list(combined.keys())
+        self.depts = list(normalized.values()) + list(combined.values())
+        self.normalized_count = len(normalized)
+        self.normalized_ids = {key: i for i, key in enumerate(normalized)}
+        self.normalized_lengths = sorted({len(key) for key in normalized})
+        self.normalized_by_length = {}
+        for entry_id, key in enumerate(normalized):
+            self.normalized_by_length.setdefault(len(key), []).append(entry_id)
+        self.postings = {}
+        for entry_id, key in enumerate(self.keys):
+            for gram in _key_grams(key):
+                self.postings.setdefault(gram, []).append(entry_id)
+        self._fuzzy_memo = {}
+
+    def _entries_containing(self, key):
+        """Ids of entries whose key contains `key`."""
+        if len(key) < KEY_NGRAM:
+            # Too short for a trigram; rare enough that a scan is fine
+            return [i for i, entry_key in enumerate(self.keys) if key in entry_key]
+        lists = sorted((self.postings.get(gram, ()) for gram in _key_grams(key)), key=len)
+        if not lists[0]:
+            return []
+        ids = set(lists[0])
+        for posting in lists[1:]:
+            ids.intersection_update(posting)
+            if not ids:
+                return []
+        return [i for i in ids if key in self.keys[i]]
+
+    def _normalized_inside(self, key):
+        """Ids of normalized keys that are substrings of `key`."""
+        found = []
+        for length in self.normalized_lengths:
+            if length > len(key):
+                break
+            for start in range(len(key) - length + 1):
+                entry_id = self.normalized_ids.get(key[start:start + length])
+                if entry_id is not None:
+                    found.append(entry_id)
+        return found
+
+    def containment(self, key):
+        """
+        Same as step 7 of _resolve_department: normalized keys containing or
+        contained in `key` and combined keys containing it, closest in
+        length first.
+        """
+        ids = set(self._normalized_inside(key))
+        ids.update(self._entries_containing(key))
+        if not ids:
+            return None
+        best = min(ids, key=lambda i: (abs(len(self.keys[i]) - len(key)), i))
+        return self.depts[best]
+
+    def fuzzy(self, key, cutoff=FUZZY_CUTOFF, candidates=FUZZY_CANDIDATES):
+        """Step 8, answered from the exact-key dict when `key` was seen before."""
+        memo_key = (key, cutoff)
+        if memo_key in self._fuzzy_memo:
+            return self._fuzzy_memo[memo_key]
+        if len(self._fuzzy_memo) >= FUZZY_MEMO_SIZE:
+            self._fuzzy_memo.clear()
+        matched = self._closest(key, cutoff, candidates)
+        self._fuzzy_memo[memo_key] = matched
+        return matched
+
+    def _closest(self, key, cutoff, candidates):
+        """
+        Exactly difflib.get_close_matches(key, normalized keys, n=1).
+
+        The keys sharing the most trigrams with `key` are ranked first, so a
+        good match is usually found at once. Its ratio then becomes the bar
+        for every other key: lengths that cannot reach it are skipped, and
+        the rest are mostly rejected by difflib's cheap quick_ratio bound
+        before the full ratio is computed.
+        """
+        grams = _key_grams(key)
+        shared = Counter()
+        for gram in grams:
+            for entry_id in self.postings.get(gram, ()):
+                if entry_id < self.normalized_count:
+                    shared[entry_id] += 1
+        # Dice overlap, like difflib's ratio, favours keys of similar length
+        query_size = len(grams) + KEY_NGRAM - 1
+        ranked = heapq.nlargest(candidates, shared, key=lambda i: shared[i] / (query_size + len(self.keys[i])))
+
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(key)
+        # get_close_matches keeps the largest (ratio, key), so ties go to the larger key
+        best = None
+
+        def consider(entry_id):
+            nonlocal best
+            matcher.set_seq1(self.keys[entry_id])
+            bar = best[0] if best else cutoff
+            if matcher.real_quick_ratio() < bar or matcher.quick_ratio() < bar:
+                return
+            ratio = matcher.ratio()
+            if ratio >= cutoff and (best is None or (ratio, self.keys[entry_id]) > best):
+                best = (ratio, self.keys[entry_id])
+
+        for entry_id in ranked:
+            consider(entry_id)
+
+        # difflib's real_quick_ratio: the best ratio any key of that length can reach
+        size = len(key)
+        length_bound = lambda length: 2.0 * min(length, size) / (length + size)
+        seen = set(ranked)
+        for length in sorted(self.normalized_lengths, key=length_bound, reverse=True):
+            if length_bound(length) < (best[0] if best else cutoff):
+                break
+            for entry_id in self.normalized_by_length[length]:
+                if entry_id not in seen:
+                    consider(entry_id)
+        return self.depts[self.normalized_ids[best[1]]] if best else None
+
+
+def _scan_containment(key, dept_maps):
+    """Linear reference for DepartmentKeyIndex.containment (benchmarks and golden checks)."""
+    containment_candidates = []
+    for normalized_key, dept in dept_maps['normalized'].items():
+        if key in normalized_key or normalized_key in key:
+            containment_candidates.append((abs(len(normalized_key) - len(key)), dept))
+    for comb_key, dept in dept_maps['combined'].items():
+        if key in comb_key:
+            containment_candidates.append((abs(len(comb_key) - len(key)), dept))
+    if containment_candidates:
+        containment_candidates.sort(key=lambda x: x[0])
+        return containment_candidates[0][1]
+    return None
+
+
+def _scan_fuzzy(key, dept_maps):
+    """Linear reference for DepartmentKeyIndex.fuzzy."""
+    close = difflib.get_close_matches(key, dept_maps['normalized_keys'], n=1, cutoff=FUZZY_CUTOFF)
+    return dept_maps['normalized'].get(close[0]) if close else None
+
+
+def _resolve_department(raw_input, dept_maps):
+    """(Department or None, name of the step that matched or None)."""
+    if not raw_input:
+        return None, None
+
+    # Handle structured object from Gemini: {"designation": "...", "department": "..."}
+    if isinstance(raw_input, dict):
+        d_val = (raw_input.get('designation') or '').strip()
+        n_val = (raw_input.get('department') or '').strip()
+        query = f"{d_val}{n_val}"
+    else:
+        query = raw_input
+        n_val = raw_input
+
+    exact = dept_maps['exact']
+    normalized = dept_maps['normalized']
+    combined = dept_maps.get('combined', {})
+    designation_map = dept_maps.get('designation', {})
+
+    # 1. Try exact name match if query is a string
+    if not isinstance(raw_input, dict):
+        exact_match = exact.get(query.strip().upper())
+        if exact_match:
+            return exact_match, 'exact'
+
+    # 2. Try normalized combined match (designation + name)
+    key = dept_maps.get('key', _dept_key)(query)
+    if not key:
+        return None, None
+
+    if key in combined:
+        return combined[key], 'combined'
+
+    # 3. Try normalized name match
+    if key in normalized:
+        return normalized[key], 'name'
+        
+    # 4. Try normalized designation match (only if raw_input was a string/designation only)
+    if key in designation_map:
+        return designation_map[key], 'designation'
+
+    # 5. Aliases the DPO has mapped before (O(1), ahead of the scans below)
+    alias_match = dept_maps.get('alias', {}).get(key)
+    if alias_match:
+        return alias_match, 'alias'
+
+    # 6. Same spelling skeleton across scripts and transliterations (പഞ്ചായത്ത് / Panchayath)
+    phonetic = dept_maps.get('phonetic')
+    if phonetic:
+        matched = phonetic.get(phonetic_key(n_val or query))
+        if matched:
+            return matched, 'phonetic'
+
+    # 7. Handle alias-like values by containment
+    index = dept_maps.get('key_index')
+    matched = index.containment(key) if index else _scan_containment(key, dept_maps)
+    if matched:
+        return matched, 'containment'
+
+    # 8. Fuzzy match fallback
+    matched = index.fuzzy(key) if index else _scan_fuzzy(key, dept_maps)
+    if matched:
+        return matched, 'fuzzy'
+
+    return None, None
+
+
+def _match_department(raw_input, dept_maps):
+    if not raw_input:
+        return None
+
+    raw_name = _department_label(raw_input)
+    print(f"    Matching Dept: '{raw_name}'")
+    matched, _step = _resolve_department(raw_input, dept_maps)
+    if matched is None:
+        print(f"    ⚠️ Match Failed for: '{raw_name}'")
+    return matched
+
+
+def _manual_departments(item):
+    """Departments from the UI's `department` string (JSON array or comma-separated), or []."""
+    dept_str = (item.get('department') or '').strip()
+    raw_depts = []
+    
+    if dept_str:
+        # Try to parse as JSON array first (from DepartmentSelector)
+        try:
+            if dept_str.startswith('['):
+                parsed = json.loads(dept_str)
+                if isinstance(parsed, list):
+                    raw_depts = parsed
+        except (json.JSONDecodeError, ValueError):
+            # Not JSON, fall through to comma-separated parsing
+            pass
+        
+        # Fall back to comma-separated parsing (for backward compatibility)
+        if not raw_depts:
+            raw_depts = [d.strip() for d in dept_str.split(',') if d.strip()]
+    return raw_depts
+
+
+def _department_inputs(item):
+    # PRIORITY: Manual edits from UI (department string) take precedence over extracted array
+    raw_depts = _manual_departments(item)
+
+    # If still no departments, try the extracted array
+    if not raw_depts:
+        raw_depts = item.get('departments') or []
+        if not raw_depts:
+            raw_depts = [item.get('department', 'GENERAL')]
+    return raw_depts
+
+
+def _department_label(raw_input):
+    if isinstance(raw_input, dict):
+        d_val = (raw_input.get('designation') or '').strip()
+        n_val = (raw_input.get('department') or '').strip()
+        return f"{d_val}, {n_val}" if d_val and n_val else (d_val or n_val)
+    return str(raw_input)
+
+
+def _normalize_issue_departments(item, dept_maps, match=None):
+    """`match` defaults to an unmemoized _match_department; pass DepartmentResolution.match to share a memo."""
+    match = match or (lambda raw_input: _match_department(raw_input, dept_maps))
+    raw_depts = _department_inputs(item)
+
+    resolved = []
+    unresolved = []
+    seen = set()
+
+    for raw_input in raw_depts:
+        if not raw_input:
+            continue
+
+        matched = match(raw_input)
+        if matched:
+            canonical = matched.dept_name
+            if canonical not in seen:
+                resolved.append(canonical)
+                seen.add(canonical)
+        else:
+            # For unresolved, if it's a dict, convert to a readable string for display
+            unresolved.append(_department_label(raw_input) or "Unknown")
+
+    if resolved:
+        item['departments'] = resolved
+        item['department'] = json.dumps(resolved)
+    else:
+        item['departments'] = unresolved
+        item['department'] = json.dumps(unresolved)
+    # Kept so a DPO correction of these strings can be learned as an alias at allocation
+    item['unresolved_departments'] = unresolved
+
+    return item
+
+
+def record_department_aliases(pairs, user=None, source='dpo'):
+    """
+    Create or repoint the aliases for (label, Department) pairs in three
+    queries however many there are. A label seen again counts as a use.
+    Returns the number of aliases written.
+    """
+    by_key, uses = {}, Counter()
+    for label, department in pairs:
+        key = _dept_key(label)
+        if not key or key == _dept_key(department.dept_name):
+            continue
+        by_key[key] = (label, department)
+        uses[key] += 1
+    if not by_key:
+        return 0
+
+    existing = {alias.alias_key: alias for alias in DepartmentAlias.objects.filter(alias_key__in=list(by_key))}
+    now = timezone.now()
+    to_update, to_create = [], []
+    for key, (label, department) in by_key.items():
+        alias = existing.get(key)
+        if alias:
+            alias.department = department
+            alias.source = source
+            alias.use_count += uses[key]
+            alias.updated_at = now  # bulk_update skips auto_now
+            to_update.append(alias)
+        else:
+            to_create.append(DepartmentAlias(
+                alias=label[:255], alias_key=key, department=department, source=source,
+                created_by=user, use_count=uses[key] - 1,
+            ))
+    if to_update:
+        DepartmentAlias.objects.bulk_update(to_update, ['department', 'source', 'use_count', 'updated_at'])
+    if to_create:
+        DepartmentAlias.objects.bulk_create(to_create, ignore_conflicts=True)
+    # Neither bulk call sends post_save, so bump the stamp here
+    bump_departments_version()
+    for label, department in by_key.values():
+        print(f"🏷️ Learned department alias: '{label}' -> {department.dept_name}")
+    return len(by_key)
+
+
+def _alias_corrections(item, dept_maps, match):
+    """
+    The DPO's corrections on one issue, read before it is normalized:
+    explicit `department_aliases` ({label: dept_name}, sent by the
+    department selector when an unknown tag is replaced), or, failing that,
+    a single unresolved string replaced by a single new department.
+    """
+    exact = dept_maps['exact']
+    pairs = []
+    explicit = item.get('department_aliases')
+    if isinstance(explicit, dict) and explicit:
+        for label, dept_name in explicit.items():
+            dept = exact.get(str(dept_name or '').strip().upper())
+            if dept:
+                pairs.append((str(label), dept))
+    else:
+        unresolved = item.get('unresolved_departments') or []
+        if len(unresolved) == 1 and not match(unresolved[0]):
+            extracted = {str(d).strip().upper() for d in (item.get('departments') or []) if isinstance(d, str)}
+            added = [
+                exact[str(d).strip().upper()] for d in _manual_departments(item)
+                if isinstance(d, str) and str(d).strip().upper() in exact and str(d).strip().upper() not in extracted
+            ]
+            if len(added) == 1:
+                pairs.append((unresolved[0], added[0]))
+    return pairs
+
+
+def learn_department_aliases(issues_data, dept_maps, user=None, resolution=None):
+    """
+    Record the corrections on every issue being allocated. With a
+    `resolution`, its memo answers the corrected labels from now on.
+    Returns the number of aliases recorded.
+    """
+    match = resolution.match if resolution else (lambda raw_input: _match_department(raw_input, dept_maps))
+    pairs = [pair for item in issues_data for pair in _alias_corrections(item, dept_maps, match)]
+    recorded = record_department_aliases(pairs, user=user)
+    if resolution and recorded:
+        resolution.learn(pairs)
+    return recorded
+
+
+def export_department_aliases():
+    """Every alias as {alias, department, designation, source, use_count}, for backup or another deployment."""
+    return [
+        {
+            'alias': alias.alias,
+            'department': alias.department.dept_name,
+            'designation': alias.department.designation,
+            'source': alias.source,
+            'use_count': alias.use_count,
+        }
+        for alias in DepartmentAlias.objects.select_related('department').order_by('department__dept_name', 'alias')
+    ]
+
+
+def import_department_aliases(rows, user=None):
+    """
+    Upsert aliases from rows of {alias, department} (department = exact
+    dept_name) in one bulk statement. Returns (imported, errors).
+    """
+    departments = {dept.dept_name.strip().upper(): dept for dept in Department.objects.all()}
+    by_key, errors = {}, []
+    for number, row in enumerate(rows, start=1):
+        label = str(row.get('alias') or '').strip()
+        dept = departments.get(str(row.get('department') or '').strip().upper())
+        key = _dept_key(label)
+        if not key or dept is None:
+            errors.append(f"row {number}: unknown department or empty alias ({label!r} -> {row.get('department')!r})")
+            continue
+        by_key[key] = DepartmentAlias(alias=label[:255], alias_key=key, department=dept, source='import', created_by=user)
+
+    if by_key:
+        DepartmentAlias.objects.bulk_create(
+            by_key.values(),
+            update_conflicts=True,
+            unique_fields=['alias_key'],
+            update_fields=['alias', 'department', 'source'],
+        )
+        # bulk_create sends no post_save, so bump the stamp here
+        bump_departments_version()
+    return len(by_key), errors
+
+
+def recompute_department_keys(force=False):
+    """
+    Re-key every Department and DepartmentAlias with the current
+    department_keys functions when the stored keys predate KEY_VERSION (or
+    `force`). Returns (departments, aliases) rewritten, or None when the
+    keys were already current.
+    """
+    stored = CacheVersion.objects.filter(key=DEPARTMENT_KEYS_VERSION_KEY).values_list('version', flat=True).first()
+    if stored == KEY_VERSION and not force:
+        return None
+
+    with transaction.atomic():
+        departments = []
+        for dept in Department.objects.all():
+            keys = department_keys(dept.dept_name, dept.designation)
+            if any(getattr(dept, field) != value for field, value in keys.items()):
+                for field, value in keys.items():
+                    setattr(dept, field, value)
+                departments.append(dept)
+        Department.objects.bulk_update(departments, ['name_key', 'combined_key', 'phonetic_key'], batch_size=500)
+
+        # Two aliases may now share a key: the oldest one is kept
+        seen, aliases = set(), []
+        for alias in DepartmentAlias.objects.order_by('id'):
+            key = _dept_key(alias.alias)
+            if not key or key in seen:
+                alias.delete()
+                continue
+            seen.add(key)
+            if key != alias.alias_key:
+                aliases.append((alias, key))
+        # Two passes so a new key never collides with an old key not yet rewritten
+        for alias, _key in aliases:
+            alias.alias_key = f"~{alias.pk}"
+        DepartmentAlias.objects.bulk_update([alias for alias, _key in aliases], ['alias_key'])
+        for alias, key in aliases:
+            alias.alias_key = key
+        DepartmentAlias.objects.bulk_update([alias for alias, _key in aliases], ['alias_key'])
+
+        CacheVersion.objects.update_or_create(key=DEPARTMENT_KEYS_VERSION_KEY, defaults={'version': KEY_VERSION})
+        # bulk_update sends no post_save, so bump the stamp here
+        bump_departments_version()
+    print(f"🔑 Department keys recomputed (version {KEY_VERSION}): {len(departments)} department(s), {len(aliases)} alias(es)")
+    return len(departments), len(aliases)
+
+
+class DepartmentMatcher:
+    """The Department master list with its lookup maps, built once per version."""
+
+    def __init__(self, departments, version=0, aliases=None):
+        """`aliases` is an iterable of (alias_key, department_id)."""
+        self.departments = list(departments)
+        self.version = version
+        by_id = {dept.pk: dept for dept in self.departments}
+        alias_map = {key: by_id[dept_id] for key, dept_id in (aliases or ()) if dept_id in by_id}
+        self.maps = _build_department_name_maps(self.departments, alias_map)
+        self.available = _format_available(self.departments)
+
+    def match(self, raw_input):
+        return _match_department(raw_input, self.maps)
+
+    def normalize_issue(self, item):
+        return _normalize_issue_departments(item, self.maps)
+
+    def resolution(self, label=''):
+        """A fresh memo for one operation (an upload, an allocation request)."""
+        return DepartmentResolution(self.maps, label)
+
+
+def _resolution_key(raw_input):
+    """What _match_department's answer depends on: exact text for strings, only the key for dicts."""
+    if isinstance(raw_input, dict):
+        d_val = (raw_input.get('designation') or '').strip()
+        n_val = (raw_input.get('department') or '').strip()
+        return ('dict', _dept_key(f"{d_val}{n_val}"))
+    return ('str', str(raw_input).strip().upper())
+
+
+class DepartmentResolution:
+    """
+    Per-operation memo over _match_department. Stakeholder strings repeat
+    across the issues of one meeting, and allocation re-resolves the
+    canonical names normalization produced, so each distinct input is
+    matched (and printed) once; every later lookup is a dict hit.
+    Not shared across requests: a DPO edit to the master list applies from
+    the next operation on. Aliases learned mid-request are applied to the
+    memo at once (learn()), so the rest of the request doesn't resolve
+    the corrected label to its stale answer.
+    """
+
+    def __init__(self, dept_maps, label=''):
+        self.maps = dept_maps
+        self.label = label
+        self._memo = {}
+        self.hits = 0
+        self.misses = 0
+        self.miss_seconds = 0.0
+
+    def match(self, raw_input):
+        if not raw_input:
+            return None
+        key = _resolution_key(raw_input)
+        if key in self._memo:
+            self.hits += 1
+            return self._memo[key]
+
+        start = time.perf_counter()
+        dept = _match_department(raw_input, self.maps)
+        self.miss_seconds += time.perf_counter() - start
+        self.misses += 1
+        self._memo[key] = dept
+        if dept is not None:
+            # Allocation looks the canonical name up again; answer it from the exact map now
+            name_key = ('str', dept.dept_name.strip().upper())
+            if name_key not in self._memo and self.maps['exact'].get(name_key[1]) is not None:
+                self._memo[name_key] = self.maps['exact'][name_key[1]]
+        return dept
+
+    def learn(self, pairs):
+        """Answer each (label, Department) alias just recorded without consulting the maps."""
+        for label, department in pairs:
+            self._memo[_resolution_key(label)] = department
+
+    def normalize_issue(self, item):
+        return _normalize_issue_departments(item, self.maps, match=self.match)
+
+    def stats(self):
+        """Counters for the job timings / logs. `saved_ms` assumes each hit would have cost an average miss."""
+        lookups = self.hits + self.misses
+        average = self.miss_seconds / self.misses if self.misses else 0.0
+        return {
+            'lookups': lookups,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+            'match_ms': round(self.miss_seconds * 1000, 1),
+            'saved_ms': round(self.hits * average * 1000, 1),
+        }
+
+    def log(self):
+        stats = self.stats()
+        print(
+            f"🧮 Department resolution{f' ({self.label})' if self.label else ''}: "
+            f"{stats['lookups']} lookups, {stats['hits']} memo hits ({stats['hit_ratio']:.0%}), "
+            f"{stats['misses']} matched in {stats['match_ms']} ms, ~{stats['saved_ms']} ms saved"
+        )
+        return stats
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def departments_version():
+    return CacheVersion.objects.filter(key=DEPARTMENTS_VERSION_KEY).values_list('version', flat=True).first() or 0
+
+
+def bump_departments_version():
+    """Called from the Department signals; every process rebuilds its matcher on its next use."""
+    global _matcher
+    updated = CacheVersion.objects.filter(key=DEPARTMENTS_VERSION_KEY).update(version=F('version') + 1)
+    if not updated:
+        try:
+            with transaction.atomic():
+                CacheVersion.objects.create(key=DEPARTMENTS_VERSION_KEY, version=1)
+        except IntegrityError:
+            CacheVersion.objects.filter(key=DEPARTMENTS_VERSION_KEY).update(version=F('version') + 1)
+    _matcher = None
+
+
+def get_department_matcher():
+    """The process-wide matcher; one version query per call, a rebuild only when the stamp moved."""
+    global _matcher
+    version = departments_version()
+    matcher = _matcher
+    if matcher is not None and matcher.version == version:
+        return matcher
+    with _matcher_lock:
+        if _matcher is None or _matcher.version != version:
+            _matcher = DepartmentMatcher(
+                Department.objects.all(),
+                version,
+                DepartmentAlias.objects.values_list('alias_key', 'department_id'),
+            )
+            print(
+                f"🏢 Department matcher built: {len(_matcher.departments)} department(s), "
+                f"{len(_matcher.maps['alias'])} alias(es), version {version}"
+            )
+        return _matcher
+
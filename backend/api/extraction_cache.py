@@ -0,0 +1,107 @@
+"""
+extraction_cache.py - Content-addressed cache for Gemini extraction results.
+
+Entries are keyed by SHA-256 of the file bytes, the department master list
+and the extraction settings (prompt version, streaming or not, sectioning,
+pre-segmentation and the PDF text-layer gate), so re-uploading identical
+minutes skips the model entirely. Entries expire after a TTL and the least recently used
+ones are evicted once the table grows past its size cap.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ExtractionCacheEntry
+from .gemini_utils import extraction_settings, EXTRACTION_PROMPT_VERSION
+from .model_metrics import record_call
+
+
+def _ttl():
+    return timedelta(days=int(getattr(settings, 'EXTRACTION_CACHE_TTL_DAYS', 30) or 0))
+
+
+def compute_cache_key(file_sha256, available_departments, streaming=False):
+    """Combine file hash, department list and extraction settings into one key."""
+    dept_digest = hashlib.sha256(
+        '\n'.join(sorted(available_departments or [])).encode('utf-8')
+    ).hexdigest()
+    settings_digest = hashlib.sha256(
+        json.dumps(extraction_settings(streaming), sort_keys=True).encode('utf-8')
+    ).hexdigest()
+    return hashlib.sha256(
+        f"{file_sha256}:{dept_digest}:{settings_digest}".encode('utf-8')
+    ).hexdigest()
+
+
+def get_cached_extraction(cache_key):
+    """Return the cached result for `cache_key`, or None on a miss or expired entry."""
+    entry = ExtractionCacheEntry.objects.filter(cache_key=cache_key).first()
+    if entry is None:
+        return None
+
+    ttl = _ttl()
+    if ttl and entry.created_at < timezone.now() - ttl:
+        entry.delete()
+        return None
+
+    ExtractionCacheEntry.objects.filter(pk=entry.pk).update(
+        hit_count=F('hit_count') + 1,
+        last_accessed_at=timezone.now(),
+    )
+    return entry.result
+
+
+def store_extraction(cache_key, file_sha256, result, original_filename=''):
+    ExtractionCacheEntry.objects.update_or_create(
+        cache_key=cache_key,
+        defaults={
+            'file_sha256': file_sha256,
+            'prompt_version': EXTRACTION_PROMPT_VERSION,
+            'original_filename': original_filename[:255],
+            'result': result,
+            'last_accessed_at': timezone.now(),
+        }
+    )
+    evict_lru()
+
+
+def evict_lru():
+    """Delete least recently used entries beyond EXTRACTION_CACHE_MAX_ENTRIES."""
+    max_entries = int(getattr(settings, 'EXTRACTION_CACHE_MAX_ENTRIES', 500) or 0)
+    if max_entries <= 0:
+        return 0
+
+    stale_ids = list(
+        ExtractionCacheEntry.objects.order_by('-last_accessed_at')
+        .values_list('id', flat=True)[max_entries:]
+    )
+    if not stale_ids:
+        return 0
+    deleted, _ = ExtractionCacheEntry.objects.filter(id__in=stale_ids).delete()
+    return deleted
+
+
+def purge_expired():
+    ttl = _ttl()
+    if not ttl:
+        return 0
+    deleted, _ = ExtractionCacheEntry.objects.filter(created_at__lt=timezone.now() - ttl).delete()
+    return deleted
+
+
+def lookup_extraction(file_data, available_departments=None, streaming=False):
+    """
+    Hash in-memory file bytes and return (file_sha256, cache_key, cached_result_or_None).
+    `streaming` says which extraction path a miss will take.
+    """
+    file_sha256 = hashlib.sha256(file_data).hexdigest()
+    cache_key = compute_cache_key(file_sha256, available_departments, streaming)
+    cached = get_cached_extraction(cache_key)
+    if cached is not None:
+        record_call('extraction_cache', outcome='cache_hit')
+    return file_sha256, cache_key, cached
+
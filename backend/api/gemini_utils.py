@@ -1,92 +1,394 @@
 from google import genai
 from google.genai import types
+import atexit
+import contextvars
+import httpx
 import os
 import json
+import queue
+import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from docx import Document
-import tempfile
+
+from .model_backends import ReplayClient, RecordingClient
+from .model_metrics import InstrumentedClient
+from .json_stream import iter_array_items, parse_json_array
 
 load_dotenv()
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY', '')
 
+# Bump whenever the extraction prompt or output schema changes so cached
+# extraction results from the old prompt are no longer reused.
+EXTRACTION_PROMPT_VERSION = '1'
+# Same for the matching prompt and the cached match verdicts (api/match_cache.py)
+MATCH_PROMPT_VERSION = '1'
+
+# Sectioned extraction: 'single' sends the whole text in one call,
+# 'sectioned' always splits the text, 'auto' splits only when it is large.
+GEMINI_EXTRACTION_MODE = os.getenv('GEMINI_EXTRACTION_MODE', 'auto').lower()
+GEMINI_SECTION_MAX_TOKENS = int(os.getenv('GEMINI_SECTION_MAX_TOKENS', '8000'))
+GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', '4'))
+GEMINI_SECTION_RETRIES = int(os.getenv('GEMINI_SECTION_RETRIES', '2'))
+
+# Issue matching: existing issues are split into batches of ~this many prompt
+# tokens, matched concurrently (GEMINI_MAX_CONCURRENCY) and reconciled
+GEMINI_MATCH_BATCH_TOKENS = int(os.getenv('GEMINI_MATCH_BATCH_TOKENS', '12000'))
+GEMINI_MATCH_RETRIES = int(os.getenv('GEMINI_MATCH_RETRIES', '1'))
+
+# Local pre-pass that keeps only the paragraphs around (നടപടി markers.
+# Bump PRESEGMENT_VERSION when what it keeps changes (part of the extraction cache key).
+GEMINI_PRESEGMENT = os.getenv('GEMINI_PRESEGMENT', 'True').lower() == 'true'
+PRESEGMENT_VERSION = '2'
+
+# Workers stream extraction output so each issue reaches the job (and the
+# SSE endpoint) as soon as the model finishes writing it
+GEMINI_STREAMING = os.getenv('GEMINI_STREAMING', 'True').lower() == 'true'
+
+# PDF text-layer quality gate: born-digital PDFs are sent as text, scans and
+# PDFs with a broken or non-Malayalam text layer still go through the Files API
+PDF_TEXT_MIN_CHARS_PER_PAGE = int(os.getenv('PDF_TEXT_MIN_CHARS_PER_PAGE', '100'))
+PDF_TEXT_MIN_PAGE_COVERAGE = float(os.getenv('PDF_TEXT_MIN_PAGE_COVERAGE', '0.8'))
+PDF_TEXT_MIN_MALAYALAM_RATIO = float(os.getenv('PDF_TEXT_MIN_MALAYALAM_RATIO', '0.5'))
+PDF_TEXT_MAX_ORPHAN_SIGN_RATIO = float(os.getenv('PDF_TEXT_MAX_ORPHAN_SIGN_RATIO', '0.25'))
+
+# Files API polling for binary PDFs: exponential backoff between status checks
+FILE_POLL_INITIAL_DELAY = float(os.getenv('GEMINI_FILE_POLL_INITIAL_DELAY', '0.25'))
+FILE_POLL_MAX_DELAY = float(os.getenv('GEMINI_FILE_POLL_MAX_DELAY', '4'))
+FILE_POLL_TIMEOUT = float(os.getenv('GEMINI_FILE_POLL_TIMEOUT', '300'))
+
+# Shared client: per-request timeout and keep-alive pool size
+GEMINI_REQUEST_TIMEOUT = float(os.getenv('GEMINI_REQUEST_TIMEOUT', '180'))
+GEMINI_MAX_CONNECTIONS = int(os.getenv('GEMINI_MAX_CONNECTIONS', '10'))
+GEMINI_KEEPALIVE_EXPIRY = float(os.getenv('GEMINI_KEEPALIVE_EXPIRY', '60'))
+
+# Model backend: 'live' (Gemini API), 'replay' (recorded fixtures, no network)
+# or 'record' (live, saving every response as a fixture). GEMINI_BASE_URL
+# points the live client at another endpoint such as the run_gemini_stub server.
+GEMINI_BACKEND = os.getenv('GEMINI_BACKEND', 'live').lower()
+GEMINI_BASE_URL = os.getenv('GEMINI_BASE_URL', '')
+GEMINI_FIXTURES_DIR = os.getenv('GEMINI_FIXTURES_DIR', os.path.join(os.path.dirname(__file__), 'fixtures', 'gemini'))
+GEMINI_REPLAY_STRICT = os.getenv('GEMINI_REPLAY_STRICT', 'False').lower() == 'true'
+GEMINI_REPLAY_LATENCY = os.getenv('GEMINI_REPLAY_LATENCY', 'False').lower() == 'true'
+
+# Rough size of one model token in characters for Malayalam-heavy text
+CHARS_PER_TOKEN = 3
+ACTION_MARKER = '(നടപടി'
+# "(നടപടി" tolerant of spaces after the bracket and of ZWJ/ZWNJ inside the word
+_ZW = '[\u200c\u200d]*'
+ACTION_MARKER_RE = re.compile(r'\(\s*' + _ZW.join('നടപടി'))
+# Numbered issue heading such as "12. " or "12) " at the start of a line
+ISSUE_START_RE = re.compile(r'^\s*\d{1,3}\s*[.)]\s')
+PAGE_NUMBER_RE = re.compile(r'^\s*\d{1,3}\s*$')
+MALAYALAM_CHAR_RE = re.compile(r'[\u0d00-\u0d7f]')
+MALAYALAM_WORD_RE = re.compile(r'[\u0d00-\u0d7f]+')
+LATIN_LETTER_RE = re.compile(r'[A-Za-z]')
+# A word starting with a vowel sign or virama means the text layer is in visual
+# glyph order (legacy font without a proper ToUnicode map), not Unicode order
+ORPHAN_SIGN_RE = re.compile(r'(?:^|(?<=[\s(]))[\u0d3e-\u0d4d\u0d57\u0d02\u0d03]')
+
+SAFETY_SETTINGS = [
+    types.SafetySetting(category=types.HarmCategory.HARM_CATEGORY_HARASSMENT, threshold=types.HarmBlockThreshold.BLOCK_NONE),
+    types.SafetySetting(category=types.HarmCategory.HARM_CATEGORY_HATE_SPEECH, threshold=types.HarmBlockThreshold.BLOCK_NONE),
+    types.SafetySetting(category=types.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT, threshold=types.HarmBlockThreshold.BLOCK_NONE),
+    types.SafetySetting(category=types.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT, threshold=types.HarmBlockThreshold.BLOCK_NONE),
+]
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    Return the process-wide Gemini client, creating it on first use.
+
+    The underlying httpx pool keeps connections alive between calls, so
+    requests after the first skip the TLS handshake. A forked worker gets
+    its own client rather than sharing the parent's sockets.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            _client = InstrumentedClient(_build_client())
+            _client_pid = pid
+    return _client
+
+def _build_client():
+    if GEMINI_BACKEND == 'replay':
+        print(f"🎞️ Gemini replay backend: {GEMINI_FIXTURES_DIR}")
+        return ReplayClient(GEMINI_FIXTURES_DIR, strict=GEMINI_REPLAY_STRICT, simulate_latency=GEMINI_REPLAY_LATENCY)
+
+    http_options = types.HttpOptions(
+        timeout=int(GEMINI_REQUEST_TIMEOUT * 1000),
+        client_args={
+            'limits': httpx.Limits(
+                max_connections=GEMINI_MAX_CONNECTIONS,
+                max_keepalive_connections=GEMINI_MAX_CONNECTIONS,
+                keepalive_expiry=GEMINI_KEEPALIVE_EXPIRY,
+            ),
+        },
+    )
+    if GEMINI_BASE_URL:
+        http_options.base_url = GEMINI_BASE_URL
+    live = genai.Client(api_key=GOOGLE_API_KEY, http_options=http_options)
+
+    if GEMINI_BACKEND == 'record':
+        print(f"⏺️ Recording Gemini responses to: {GEMINI_FIXTURES_DIR}")
+        return RecordingClient(live, GEMINI_FIXTURES_DIR)
+    return live
+
+def close_client():
+    """Close the shared client's connection pool; the next get_client() builds a new one."""
+    global _client, _client_pid
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            try:
+                _client.close()
+            except Exception as e:
+                print(f"⚠️ Gemini client close error: {e}")
+        _client = None
+        _client_pid = None
+
+atexit.register(close_client)
+
 def get_best_model():
-    client = genai.Client(api_key=GOOGLE_API_KEY)
-    '''try:
+    '''client = get_client()
+    try:
         for m in client.models.list():
             if m.supported_actions and 'generateContent' in m.supported_actions and 'flash' in m.name:
                 return m.name
     except: pass'''
     return 'gemini-3.1-flash-lite'
 
-def convert_docx_to_txt(docx_path):
-    """Convert DOCX file to TXT by extracting all text"""
+def extract_docx_text(docx_path):
+    """Return all paragraph and table text of a DOCX file, one block per line."""
+    doc = Document(docx_path)
+    txt_content = []
+    for para in doc.paragraphs:
+        if para.text.strip():
+            txt_content.append(para.text)
+
+    # Also extract text from tables
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                if cell.text.strip():
+                    txt_content.append(cell.text)
+
+    return '\n'.join(txt_content)
+
+def assess_pdf_text(pages):
+    """
+    Decide whether a PDF text layer is good enough to replace the binary upload.
+    `pages` is the extracted text per page. Returns a stats dict with 'ok' and 'reason'.
+    """
+    text = '\n'.join(pages)
+    page_count = max(1, len(pages))
+    malayalam_chars = len(MALAYALAM_CHAR_RE.findall(text))
+    latin_letters = len(LATIN_LETTER_RE.findall(text))
+    malayalam_words = len(MALAYALAM_WORD_RE.findall(text))
+    orphan_signs = len(ORPHAN_SIGN_RE.findall(text))
+
+    stats = {
+        'pages': len(pages),
+        'chars': len(text),
+        'chars_per_page': round(len(text) / page_count, 1),
+        'page_coverage': round(sum(1 for p in pages if len(p) >= 20) / page_count, 2),
+        'malayalam_ratio': round(malayalam_chars / max(1, malayalam_chars + latin_letters), 2),
+        'orphan_sign_ratio': round(orphan_signs / max(1, malayalam_words), 3),
+    }
+
+    if stats['chars_per_page'] < PDF_TEXT_MIN_CHARS_PER_PAGE:
+        reason = 'too little text (scanned PDF?)'
+    elif stats['page_coverage'] < PDF_TEXT_MIN_PAGE_COVERAGE:
+        reason = 'some pages have no text layer'
+    elif stats['malayalam_ratio'] < PDF_TEXT_MIN_MALAYALAM_RATIO:
+        reason = 'not enough Malayalam text'
+    elif stats['orphan_sign_ratio'] > PDF_TEXT_MAX_ORPHAN_SIGN_RATIO:
+        reason = 'Malayalam text layer is in glyph order'
+    else:
+        reason = ''
+
+    stats['ok'] = not reason
+    stats['reason'] = reason
+    return stats
+
+def read_pdf_pages(pdf_path):
+    """Return the text layer of each page, or None if the PDF can't be read."""
     try:
-        doc = Document(docx_path)
-        txt_content = []
-        for para in doc.paragraphs:
-            if para.text.strip():
-                txt_content.append(para.text)
-        
-        # Also extract text from tables
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    if cell.text.strip():
-                        txt_content.append(cell.text)
-        
-        # Create temp TXT file
-        txt_path = tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False, encoding='utf-8')
-        txt_path.write('\n'.join(txt_content))
-        txt_path.close()
-        print(f"✅ DOCX converted to TXT: {txt_path.name} ({len(txt_content)} lines extracted)")
-        return txt_path.name
-    except Exception as e:
-        print(f"❌ DOCX Conversion Error: {e}")
+        from pypdf import PdfReader
+    except ImportError:
+        print("⚠️ pypdf not installed; PDF text layer unavailable.")
         return None
 
-def analyze_document_with_gemini(file_path, available_departments=None):
-    print(f"--- 🧠 Starting AI Analysis for: {file_path} ---")
-    client = genai.Client(api_key=GOOGLE_API_KEY)
-    
-    # Convert DOCX to TXT if needed
-    analysis_file_path = file_path
-    temp_txt_path = None
-    if file_path.lower().endswith('.docx'):
-        print(f"📄 Converting DOCX to TXT...")
-        temp_txt_path = convert_docx_to_txt(file_path)
-        if temp_txt_path:
-            analysis_file_path = temp_txt_path
-        else:
-            return []
-    
     try:
-        # Don't specify mime_type - let Gemini auto-detect
-        uploaded_file = client.files.upload(file=analysis_file_path, config={'display_name': 'Minutes'})
-        while uploaded_file.state.name == "PROCESSING":
-            time.sleep(1)
-            uploaded_file = client.files.get(name=uploaded_file.name)
+        reader = PdfReader(pdf_path)
+        return [(page.extract_text() or '').strip() for page in reader.pages]
     except Exception as e:
-        print(f"❌ Upload Error: {e}")
-        # Clean up temp file
-        if temp_txt_path and os.path.exists(temp_txt_path):
-            os.remove(temp_txt_path)
-        return []
+        print(f"❌ PDF Text Extraction Error: {e}")
+        return None
+
+def extract_pdf_text(pdf_path):
+    """Return the embedded text layer of a PDF if it passes assess_pdf_text, else None."""
+    pages = read_pdf_pages(pdf_path)
+    if not pages:
+        return None
 
-    safety = [
-        types.SafetySetting(category=types.HarmCategory.HARM_CATEGORY_HARASSMENT, threshold=types.HarmBlockThreshold.BLOCK_NONE),
-        types.SafetySetting(category=types.HarmCategory.HARM_CATEGORY_HATE_SPEECH, threshold=types.HarmBlockThreshold.BLOCK_NONE),
-        types.SafetySetting(category=types.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT, threshold=types.HarmBlockThreshold.BLOCK_NONE),
-        types.SafetySetting(category=types.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT, threshold=types.HarmBlockThreshold.BLOCK_NONE),
+    stats = assess_pdf_text(pages)
+    if not stats['ok']:
+        print(f"📄 PDF text layer rejected ({stats['reason']}): {stats}")
+        return None
+
+    text = '\n'.join(p for p in pages if p)
+    print(f"📄 Using PDF text layer: {stats['chars']} chars from {stats['pages']} page(s) instead of uploading {os.path.getsize(pdf_path) // 1024} KB")
+    return text
+
+def extract_document_text(file_path):
+    """Return plain text for DOCX files or PDFs with a text layer, else None."""
+    lowered = file_path.lower()
+    if lowered.endswith('.docx'):
+        try:
+            return extract_docx_text(file_path) or None
+        except Exception as e:
+            print(f"❌ DOCX Conversion Error: {e}")
+            return None
+    if lowered.endswith('.pdf'):
+        return extract_pdf_text(file_path)
+    return None
+
+def estimate_tokens(text):
+    return len(text or '') // CHARS_PER_TOKEN + 1
+
+def presegment_action_items(text):
+    """
+    Keep only the (നടപടി action items: each marker line plus the lines before
+    it back to the segment boundary, i.e. the numbered issue heading or, if
+    the issue has none, the previous action item (the start of the text for
+    the first one). Attendance lists, page numbers and narrative between
+    items are dropped before the text reaches the model.
+
+    Returns (segmented_text, stats). If no marker is found the text is
+    returned unchanged so nothing is lost.
+    """
+    paragraphs = [
+        p for p in (text or '').split('\n')
+        if p.strip() and not PAGE_NUMBER_RE.match(p)
     ]
-    
+    marker_idx = [i for i, p in enumerate(paragraphs) if ACTION_MARKER_RE.search(p)]
+
+    original_chars = len(text or '')
+    if not marker_idx:
+        return text, {
+            'action_items': 0,
+            'segments': 0,
+            'original_chars': original_chars,
+            'kept_chars': original_chars,
+            'removed_chars': 0,
+            'removed_tokens_est': 0,
+        }
+
+    keep = set()
+    prev_marker = -1
+    for idx in marker_idx:
+        keep.add(idx)
+        # Walk back over the issue body to its heading, never into the previous action item
+        j = idx - 1
+        while j > prev_marker:
+            keep.add(j)
+            if ISSUE_START_RE.match(paragraphs[j]):
+                break
+            j -= 1
+        # Stakeholder list sometimes wraps onto the next line
+        if idx + 1 < len(paragraphs) and not ACTION_MARKER_RE.search(paragraphs[idx + 1]) and ')' not in paragraphs[idx]:
+            keep.add(idx + 1)
+        prev_marker = idx
+
+    segments, current, last = [], [], None
+    for i in sorted(keep):
+        if last is not None and i != last + 1:
+            segments.append('\n'.join(current))
+            current = []
+        current.append(paragraphs[i])
+        last = i
+    if current:
+        segments.append('\n'.join(current))
+
+    segmented = '\n\n'.join(segments)
+    removed = max(original_chars - len(segmented), 0)
+    stats = {
+        'action_items': len(marker_idx),
+        'segments': len(segments),
+        'original_chars': original_chars,
+        'kept_chars': len(segmented),
+        'removed_chars': removed,
+        'removed_tokens_est': estimate_tokens(text) - estimate_tokens(segmented),
+    }
+    print(
+        f"✂️ Pre-segmenter kept {len(marker_idx)} action item(s) in {len(segments)} segment(s); "
+        f"removed {removed} chars (~{stats['removed_tokens_est']} tokens, "
+        f"{(100 * removed / original_chars) if original_chars else 0:.0f}%)"
+    )
+    return segmented, stats
+
+def split_into_sections(text, max_tokens=GEMINI_SECTION_MAX_TOKENS):
+    """
+    Split minutes text into chunks of at most ~max_tokens.
+
+    Each (നടപടി line closes an issue, so chunks are only cut right after such
+    a line and an issue is never split from its action marker. An issue
+    that alone exceeds the budget is cut on line boundaries.
+    """
+    max_chars = max(max_tokens, 1) * CHARS_PER_TOKEN
+
+    # Group lines into units, each ending at an action-marker line
+    units, current = [], []
+    for line in (text or '').split('\n'):
+        current.append(line)
+        if ACTION_MARKER_RE.search(line):
+            units.append('\n'.join(current))
+            current = []
+    if current and '\n'.join(current).strip():
+        units.append('\n'.join(current))
+
+    sections, buffer = [], ''
+    for unit in units:
+        if len(unit) > max_chars:
+            if buffer:
+                sections.append(buffer)
+                buffer = ''
+            piece = ''
+            for line in unit.split('\n'):
+                if piece and len(piece) + len(line) + 1 > max_chars:
+                    sections.append(piece)
+                    piece = ''
+                piece = f"{piece}\n{line}" if piece else line
+            if piece:
+                sections.append(piece)
+            continue
+
+        if buffer and len(buffer) + len(unit) + 1 > max_chars:
+            sections.append(buffer)
+            buffer = ''
+        buffer = f"{buffer}\n{unit}" if buffer else unit
+
+    if buffer.strip():
+        sections.append(buffer)
+    return sections
+
+def _build_extraction_prompt(available_departments, section_note=''):
     available_departments = available_departments or []
     dept_list_text = '\n'.join(available_departments) if available_departments else '(No department list provided)'
 
-    prompt = f"""
+    return f"""
     You are an AI specialized in analyzing Malayalam minutes of meetings (PDF, DOCX, etc.). 
 
-    TASK: Extract every actionable issue from this document.
+    TASK: Extract every actionable issue from this document.{section_note}
 
     AVAILABLE DEPARTMENTS (Designation, Department Name):
     {dept_list_text}
@@ -130,50 +432,322 @@ def analyze_document_with_gemini(file_path, available_departments=None):
     Do NOT include any text outside the JSON array. Do NOT add explanations or code blocks.
     """
 
+def _parse_issue_array(text):
+    """
+    Every complete object in the model's array, even if the answer was cut off
+    mid-object. Returns (items, complete); complete is False for a recovered
+    partial answer.
+    """
+    report = parse_json_array(text)
+    if not report.found_array:
+        raise ValueError("Model output is not a JSON array")
+    if report.truncated and not report.items:
+        raise ValueError("Model output was truncated before the first complete issue")
+    if report.truncated or report.skipped:
+        print(f"⚠️ Recovered partial model output: {report.summary()}")
+    return report.items, report.lossless
+
+def _extract_section(client, model_name, prompt, section_text, label):
+    """
+    Extract one section, retrying it on its own if the call or JSON parse fails.
+    Returns (issues, complete); a section that failed every attempt is ([], False).
+    """
+    attempts = GEMINI_SECTION_RETRIES + 1
+    for attempt in range(1, attempts + 1):
+        try:
+            response = client.models.generate_content(
+                model=model_name,
+                contents=[types.Part.from_text(text=section_text), prompt],
+                config=types.GenerateContentConfig(safety_settings=SAFETY_SETTINGS)
+            )
+            return _parse_issue_array(response.text)
+        except Exception as e:
+            print(f"⚠️ Section {label} attempt {attempt}/{attempts} failed: {e}")
+            if attempt < attempts:
+                time.sleep(2 ** (attempt - 1))
+    print(f"❌ Section {label} failed after {attempts} attempts; its issues are skipped.")
+    return [], False
+
+def _merge_section_results(section_results):
+    """Concatenate per-section issues in document order, dropping repeated issue_no values."""
+    merged, seen = [], set()
+    for issues in section_results:
+        for item in issues:
+            if not isinstance(item, dict):
+                continue
+            issue_no = str(item.get('issue_no') or '').strip()
+            if issue_no:
+                if issue_no in seen:
+                    continue
+                seen.add(issue_no)
+            merged.append(item)
+    return merged
+
+def analyze_text_sectioned(text, available_departments=None, max_tokens=GEMINI_SECTION_MAX_TOKENS):
+    """
+    Extract issues from plain minutes text by splitting it and running sections
+    concurrently. Returns (issues, complete); complete only if every section did.
+    """
+    client = get_client()
+    model_name = get_best_model()
+    sections = split_into_sections(text, max_tokens)
+    if not sections:
+        return [], True
+
+    print(f"--- ✂️ Sectioned extraction: {len(sections)} section(s), up to {GEMINI_MAX_CONCURRENCY} concurrent ---")
+    total = len(sections)
+    prompts = [
+        _build_extraction_prompt(
+            available_departments,
+            section_note=f"\n    This is section {i + 1} of {total} of the document; extract only the issues in this section." if total > 1 else '',
+        )
+        for i in range(total)
+    ]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(GEMINI_MAX_CONCURRENCY, total))) as pool:
+        futures = [
+            pool.submit(contextvars.copy_context().run, _extract_section, client, model_name, prompts[i], section, f"{i + 1}/{total}")
+            for i, section in enumerate(sections)
+        ]
+        outcomes = [f.result() for f in futures]
+
+    section_results = [issues for issues, _complete in outcomes]
+    merged = _merge_section_results(section_results)
+    failed = sum(1 for _issues, complete in outcomes if not complete)
+    print(f"✅ Sectioned extraction merged {sum(len(r) for r in section_results)} -> {len(merged)} issues"
+          + (f" ({failed}/{total} section(s) incomplete)" if failed else ''))
+    return merged, not failed
+
+def extraction_settings(streaming=False):
+    """
+    Everything besides the file and the department list that changes what an
+    extraction returns. Part of the extraction cache key, so results from
+    another configuration are not served.
+    """
+    return {
+        'prompt_version': EXTRACTION_PROMPT_VERSION,
+        'streaming': bool(streaming),
+        'mode': GEMINI_EXTRACTION_MODE,
+        'section_max_tokens': GEMINI_SECTION_MAX_TOKENS,
+        'presegment': GEMINI_PRESEGMENT,
+        'presegment_version': PRESEGMENT_VERSION,
+        'pdf_text_gate': [
+            PDF_TEXT_MIN_CHARS_PER_PAGE,
+            PDF_TEXT_MIN_PAGE_COVERAGE,
+            PDF_TEXT_MIN_MALAYALAM_RATIO,
+            PDF_TEXT_MAX_ORPHAN_SIGN_RATIO,
+        ],
+    }
+
+
+def _use_sectioned_mode(text):
+    if not text or GEMINI_EXTRACTION_MODE == 'single':
+        return False
+    if GEMINI_EXTRACTION_MODE == 'sectioned':
+        return True
+    return estimate_tokens(text) > GEMINI_SECTION_MAX_TOKENS
+
+def analyze_text_inline(text, available_departments=None):
+    """Extract issues from text held in memory with one generate_content call (no Files API)."""
+    print(f"📝 Sending {len(text)} chars inline")
+    client = get_client()
+    prompt = _build_extraction_prompt(available_departments)
+    return _extract_section(client, get_best_model(), prompt, text, '1/1')
+
+def _wait_for_file_active(client, uploaded_file):
+    """Poll the Files API with exponential backoff until the file leaves PROCESSING."""
+    delay = FILE_POLL_INITIAL_DELAY
+    deadline = time.monotonic() + FILE_POLL_TIMEOUT
+    while uploaded_file.state.name == "PROCESSING":
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"File {uploaded_file.name} still processing after {FILE_POLL_TIMEOUT:.0f}s")
+        time.sleep(delay)
+        delay = min(delay * 2, FILE_POLL_MAX_DELAY)
+        uploaded_file = client.files.get(name=uploaded_file.name)
+
+    if uploaded_file.state.name == "FAILED":
+        raise RuntimeError(f"File processing failed for {uploaded_file.name}")
+    return uploaded_file
+
+def _analyze_uploaded_file(file_path, available_departments=None):
+    """Binary documents (scanned PDFs) still go through the Files API."""
+    client = get_client()
+
+    try:
+        # Don't specify mime_type - let Gemini auto-detect
+        uploaded_file = client.files.upload(file=file_path, config={'display_name': 'Minutes'})
+        uploaded_file = _wait_for_file_active(client, uploaded_file)
+    except Exception as e:
+        print(f"❌ Upload Error: {e}")
+        return [], False
+
+    prompt = _build_extraction_prompt(available_departments)
+
     try:
         response = client.models.generate_content(
             model=get_best_model(),
             contents=[uploaded_file, prompt],
-            config=types.GenerateContentConfig(safety_settings=safety)
+            config=types.GenerateContentConfig(safety_settings=SAFETY_SETTINGS)
         )
-        text = response.text.replace("```json", "").replace("```", "").strip()
-        result = json.loads(text)
-        # Clean up temp file
-        if temp_txt_path and os.path.exists(temp_txt_path):
-            os.remove(temp_txt_path)
-        return result
+        return _parse_issue_array(response.text)
     except Exception as e:
         print(f"❌ Generation Error: {e}")
-        # Clean up temp file
-        if temp_txt_path and os.path.exists(temp_txt_path):
-            os.remove(temp_txt_path)
-        return []
+        return [], False
+
+def analyze_document_with_gemini(file_path, available_departments=None, outcome=None):
+    """
+    Returns (issues, complete). complete is False when a call failed or the
+    model's answer was cut short, so callers must not cache the issues.
+    `outcome`, if given, receives the pre-segmenter stats under 'presegment'.
+    """
+    print(f"--- 🧠 Starting AI Analysis for: {file_path} ---")
+    outcome = outcome if outcome is not None else {}
+
+    # DOCX text and PDF text layers are sent inline; no temp file or Files API round trip
+    text = extract_document_text(file_path)
+    if text:
+        if GEMINI_PRESEGMENT:
+            text, outcome['presegment'] = presegment_action_items(text)
+        if _use_sectioned_mode(text):
+            return analyze_text_sectioned(text, available_departments)
+        return analyze_text_inline(text, available_departments)
+
+    if file_path.lower().endswith('.docx'):
+        # DOCX conversion failed; the Files API can't read DOCX either
+        return [], False
+
+    return _analyze_uploaded_file(file_path, available_departments)
 
 
-def match_issues_with_gemini(new_issues, existing_issues):
+def _stream_section(client, model_name, contents, outcome):
     """
-    Use Gemini to semantically match new issues against existing unresolved issues.
-    Works with Malayalam text — compares meaning, not exact words.
-    
-    new_issues: list of dicts with keys: index, issue, issue_description
-    existing_issues: list of dicts with keys: id, issue, issue_description, minutes_title
-    
-    Returns: list of dicts { new_index: int, existing_id: int, confidence: str }
+    Yield array elements from one streaming generate_content call as they
+    complete (stream_document_issues drops non-dicts). Clears
+    outcome['complete'] if the model's array was cut short.
     """
-    if not new_issues or not existing_issues:
-        return []
+    stream = client.models.generate_content_stream(
+        model=model_name,
+        contents=contents,
+        config=types.GenerateContentConfig(safety_settings=SAFETY_SETTINGS)
+    )
+    report = yield from iter_array_items(chunk.text or '' for chunk in stream)
+    if not report.lossless:
+        outcome['complete'] = False
 
-    print(f"--- 🔗 Starting Issue Matching: {len(new_issues)} new vs {len(existing_issues)} existing ---")
-    client = genai.Client(api_key=GOOGLE_API_KEY)
+def _issue_key(item):
+    """What identifies an issue when a section is re-extracted: its number, else its title."""
+    if not isinstance(item, dict):
+        return ''
+    return str(item.get('issue_no') or '').strip() or str(item.get('issue') or '').strip()
 
-    safety = [
-        types.SafetySetting(category=types.HarmCategory.HARM_CATEGORY_HARASSMENT, threshold=types.HarmBlockThreshold.BLOCK_NONE),
-        types.SafetySetting(category=types.HarmCategory.HARM_CATEGORY_HATE_SPEECH, threshold=types.HarmBlockThreshold.BLOCK_NONE),
-        types.SafetySetting(category=types.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT, threshold=types.HarmBlockThreshold.BLOCK_NONE),
-        types.SafetySetting(category=types.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT, threshold=types.HarmBlockThreshold.BLOCK_NONE),
-    ]
+# Marks the end of a section's queue
+_SECTION_DONE = object()
+
+def _stream_one_section(client, model_name, prompt, section, label, out, outcome):
+    """
+    Pool worker: stream one section into `out`. If the stream breaks, the
+    section is re-extracted with the retrying call and only issues not
+    already streamed are added; if that fails too the result is incomplete.
+    """
+    sent = set()
+    try:
+        try:
+            for item in _stream_section(client, model_name, [types.Part.from_text(text=section), prompt], outcome):
+                sent.add(_issue_key(item))
+                out.put(item)
+        except Exception as e:
+            print(f"⚠️ Streaming section {label} failed after {len(sent)} issue(s): {e}; re-extracting it")
+            issues, complete = _extract_section(client, model_name, prompt, section, label)
+            if not complete:
+                outcome['complete'] = False
+            for item in issues:
+                key = _issue_key(item)
+                if key and key in sent:
+                    continue
+                out.put(item)
+    finally:
+        out.put(_SECTION_DONE)
+
+def _stream_text_sections(text, available_departments, outcome):
+    client = get_client()
+    model_name = get_best_model()
+    sections = split_into_sections(text) if _use_sectioned_mode(text) else [text]
+    total = len(sections)
+
+    # All sections stream concurrently; the first is passed through live and the
+    # others are buffered until their turn, so issues still arrive in document order
+    queues = [queue.Queue() for _ in sections]
+    pool = ThreadPoolExecutor(max_workers=max(1, min(GEMINI_MAX_CONCURRENCY, total)))
+    try:
+        for i, section in enumerate(sections):
+            prompt = _build_extraction_prompt(
+                available_departments,
+                section_note=f"\n    This is section {i + 1} of {total} of the document; extract only the issues in this section." if total > 1 else '',
+            )
+            pool.submit(contextvars.copy_context().run, _stream_one_section,
+                        client, model_name, prompt, section, f"{i + 1}/{total}", queues[i], outcome)
+        for out in queues:
+            item = out.get()
+            while item is not _SECTION_DONE:
+                yield item
+                item = out.get()
+    finally:
+        # A consumer that stops early doesn't wait for (or start) the remaining sections
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _stream_uploaded_file(file_path, available_departments, outcome):
+    client = get_client()
+    try:
+        uploaded_file = client.files.upload(file=file_path, config={'display_name': 'Minutes'})
+        uploaded_file = _wait_for_file_active(client, uploaded_file)
+    except Exception as e:
+        print(f"❌ Upload Error: {e}")
+        outcome['complete'] = False
+        return
+
+    try:
+        yield from _stream_section(client, get_best_model(), [uploaded_file, _build_extraction_prompt(available_departments)], outcome)
+    except Exception as e:
+        print(f"❌ Generation Error: {e}")
+        outcome['complete'] = False
+
+def stream_document_issues(file_path, available_departments=None, outcome=None):
+    """
+    Streaming counterpart of analyze_document_with_gemini: yields raw issue
+    dicts one by one, in the same order and with the same issue_no
+    de-duplication as the batch path. Once exhausted, `outcome['complete']`
+    says whether the issues may be cached, as the batch path's flag does, and
+    `outcome['presegment']` holds the pre-segmenter stats when it ran.
+    """
+    print(f"--- 🧠 Starting streaming AI Analysis for: {file_path} ---")
+    outcome = outcome if outcome is not None else {}
+    outcome['complete'] = True
+
+    text = extract_document_text(file_path)
+    if text:
+        if GEMINI_PRESEGMENT:
+            text, outcome['presegment'] = presegment_action_items(text)
+        items = _stream_text_sections(text, available_departments, outcome)
+    elif file_path.lower().endswith('.docx'):
+        outcome['complete'] = False
+        return
+    else:
+        items = _stream_uploaded_file(file_path, available_departments, outcome)
+
+    seen = set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        issue_no = str(item.get('issue_no') or '').strip()
+        if issue_no:
+            if issue_no in seen:
+                continue
+            seen.add(issue_no)
+        yield item
 
-    prompt = f"""
+
+def _build_match_prompt(new_issues, existing_issues):
+    return f"""
 You are an expert at matching government meeting issues written in Malayalam.
 
 TASK: Compare NEW issues (extracted from the latest meeting minutes) against EXISTING issues (from previous meetings). Find which new issues are follow-ups or continuations of existing issues.
@@ -191,6 +765,7 @@ MATCHING RULES:
 4. A new issue can match AT MOST one existing issue.
 5. Not every new issue will have a match — only return genuine matches.
 6. confidence must be "high" (clearly same issue) or "medium" (likely same issue).
+7. If a new issue has "candidate_ids", it may ONLY be matched to one of those existing ids.
 
 Return a JSON ARRAY of match objects:
 - new_index: integer (the "index" field from the new issue)
@@ -201,16 +776,145 @@ If no matches found, return an empty array [].
 Output ONLY PURE JSON.
 """
 
-    try:
-        response = client.models.generate_content(
-            model=get_best_model(),
-            contents=prompt,
-            config=types.GenerateContentConfig(safety_settings=safety)
-        )
-        text = response.text.replace("```json", "").replace("```", "").strip()
-        matches = json.loads(text)
-        print(f"✅ Gemini returned {len(matches)} matches")
-        return matches if isinstance(matches, list) else []
-    except Exception as e:
-        print(f"❌ Matching Error: {e}")
-        return []
\ No newline at end of file
+def _payload_tokens(item):
+    # Dumped inside a list, as the prompt does, so the extra indentation is counted
+    return estimate_tokens(json.dumps([item], ensure_ascii=False, indent=2))
+
+def _chunk_by_tokens(items, tokens, budget):
+    """Consecutive runs of `items` whose `tokens` add up to at most `budget` (an oversized item goes alone)."""
+    chunks, current, used = [], [], 0
+    for item, cost in zip(items, tokens):
+        if current and used + cost > budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+def build_match_batches(new_issues, existing_issues, max_tokens=None):
+    """
+    Split the issues into batches whose prompt stays within ~max_tokens.
+    Existing issues are grouped first; each group is paired with the new
+    issues that may match something in it (no candidate_ids, or at least
+    one candidate in the group), split into as many batches as their own
+    size needs. Returns a list of (new_batch, existing_batch).
+    """
+    max_tokens = max_tokens or GEMINI_MATCH_BATCH_TOKENS
+    available = max(max_tokens - estimate_tokens(_build_match_prompt([], [])), 2)
+    new_tokens = {id(n): _payload_tokens(n) for n in new_issues}
+    # Existing groups leave room for every new issue when they fit, else for half the budget
+    group_budget = max(available - sum(new_tokens.values()), available // 2)
+
+    existing_tokens = [_payload_tokens(e) for e in existing_issues]
+    batches = []
+    for group in _chunk_by_tokens(existing_issues, existing_tokens, group_budget):
+        ids = {e.get('id') for e in group}
+        new_batch = [
+            n for n in new_issues
+            if n.get('candidate_ids') is None or ids.intersection(n['candidate_ids'])
+        ]
+        new_budget = max(available - sum(_payload_tokens(e) for e in group), 1)
+        for chunk in _chunk_by_tokens(new_batch, [new_tokens[id(n)] for n in new_batch], new_budget):
+            batches.append((chunk, group))
+    return batches
+
+def _match_batch(client, model_name, new_batch, existing_batch, label):
+    """
+    Run one matching call, retrying it on its own. Returns (matches, ok);
+    a batch that keeps failing yields no matches instead of failing the rest.
+    """
+    attempts = GEMINI_MATCH_RETRIES + 1
+    for attempt in range(1, attempts + 1):
+        try:
+            response = client.models.generate_content(
+                model=model_name,
+                contents=_build_match_prompt(new_batch, existing_batch),
+                config=types.GenerateContentConfig(safety_settings=SAFETY_SETTINGS)
+            )
+            report = parse_json_array(response.text)
+            if not report.found_array:
+                raise ValueError("no JSON array in match output")
+            if report.truncated or report.skipped:
+                print(f"⚠️ Recovered partial match output for batch {label}: {report.summary()}")
+            return [m for m in report.items if isinstance(m, dict)], True
+        except Exception as e:
+            print(f"⚠️ Match batch {label} attempt {attempt}/{attempts} failed: {e}")
+            if attempt < attempts:
+                time.sleep(2 ** (attempt - 1))
+    print(f"❌ Match batch {label} failed after {attempts} attempts; its matches are skipped.")
+    return [], False
+
+# Public: issue_matching ranks cached and fresh verdicts on the same scale
+CONFIDENCE_RANK = {'high': 2, 'medium': 1}
+
+def reconcile_matches(batches, batch_matches):
+    """
+    Keep only matches that point into their own batch (and into the new
+    issue's candidate_ids), then at most one match per new issue: the one
+    with the best confidence, earlier batches winning ties.
+    """
+    best = {}
+    for (new_batch, existing_batch), matches in zip(batches, batch_matches):
+        existing_ids = {e.get('id') for e in existing_batch}
+        allowed = {n.get('index'): n.get('candidate_ids') for n in new_batch}
+        for m in matches:
+            new_index, existing_id = m.get('new_index'), m.get('existing_id')
+            if new_index not in allowed or existing_id not in existing_ids:
+                continue
+            candidates = allowed[new_index]
+            if candidates is not None and existing_id not in candidates:
+                continue
+            rank = CONFIDENCE_RANK.get(str(m.get('confidence', '')).lower(), 0)
+            if new_index not in best or rank > best[new_index][0]:
+                best[new_index] = (rank, m)
+    return [m for _rank, m in best.values()]
+
+def match_issues_with_gemini(new_issues, existing_issues, evaluated=None):
+    """
+    Use Gemini to semantically match new issues against existing unresolved issues.
+    Works with Malayalam text — compares meaning, not exact words.
+
+    new_issues: list of dicts with keys: index, issue, issue_description
+    existing_issues: list of dicts with keys: id, issue, issue_description, minutes_title
+    When a new issue carries "candidate_ids" (from the local prefilter), it
+    may only be matched to one of those ids.
+
+    Long existing lists are split into token-budgeted batches that run
+    concurrently; a batch that fails only loses its own matches. If
+    `evaluated` is a set, the (new_index, existing_id) pairs the model
+    actually judged (i.e. of batches that succeeded) are added to it.
+
+    Returns: list of dicts { new_index: int, existing_id: int, confidence: str }
+    """
+    if not new_issues or not existing_issues:
+        return []
+
+    batches = build_match_batches(new_issues, existing_issues)
+    total = len(batches)
+    if not total:
+        return []
+    print(f"--- 🔗 Starting Issue Matching: {len(new_issues)} new vs {len(existing_issues)} existing in {total} batch(es) ---")
+    client = get_client()
+    model_name = get_best_model()
+
+    with ThreadPoolExecutor(max_workers=max(1, min(GEMINI_MAX_CONCURRENCY, total))) as pool:
+        futures = [
+            pool.submit(contextvars.copy_context().run, _match_batch, client, model_name, new_batch, existing_batch, f"{i + 1}/{total}")
+            for i, (new_batch, existing_batch) in enumerate(batches)
+        ]
+        batch_results = [f.result() for f in futures]
+
+    matches = reconcile_matches(batches, [found for found, _ok in batch_results])
+    failed = sum(1 for _found, ok in batch_results if not ok)
+    if evaluated is not None:
+        for (new_batch, existing_batch), (_found, ok) in zip(batches, batch_results):
+            if not ok:
+                continue
+            ids = {e.get('id') for e in existing_batch}
+            for n in new_batch:
+                candidates = ids if n.get('candidate_ids') is None else ids.intersection(n['candidate_ids'])
+                evaluated.update((n.get('index'), existing_id) for existing_id in candidates)
+    print(f"✅ Gemini returned {len(matches)} matches" + (f" ({failed}/{total} batch(es) failed)" if failed else ''))
+    return matches
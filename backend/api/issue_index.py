@@ -0,0 +1,119 @@
+"""
+issue_index.py - Local character n-gram TF-IDF index over issues.
+
+Used to shortlist existing issues before asking Gemini whether a new issue
+is a follow-up of one of them. Character n-grams work on Malayalam script
+without a tokenizer or stemmer: inflected forms of the same word
+(റോഡ്, റോഡിൽ, റോഡുകൾ) still share most of their n-grams.
+"""
+import heapq
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+# Trigrams cover roughly one Malayalam syllable (consonant + sign + conjunct)
+NGRAM_SIZES = (3,)
+# Long descriptions add cost but little ranking signal beyond their opening
+MAX_TEXT_CHARS = 1000
+# Grams present in more than this share of documents carry no signal and only
+# lengthen the posting lists scanned per query
+MAX_DOC_FREQUENCY = 0.5
+
+_ZERO_WIDTH_RE = re.compile('[\u200b-\u200d\ufeff]')
+# \w alone would split words at Malayalam vowel signs and virama (category M)
+_NON_WORD_RE = re.compile(r'[^\w\u0d00-\u0d7f]+|_')
+
+
+def normalize_text(text):
+    """NFC, lower case, zero-width joiners removed, punctuation collapsed to single spaces."""
+    text = unicodedata.normalize('NFC', text or '')
+    text = _ZERO_WIDTH_RE.sub('', text).lower()
+    return _NON_WORD_RE.sub(' ', text).strip()
+
+
+def char_ngrams(text, sizes=NGRAM_SIZES):
+    """Counter of character n-grams over the normalized text; spaces mark word boundaries."""
+    padded = f" {normalize_text(text)} "
+    grams = Counter()
+    for n in sizes:
+        grams.update(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return grams
+
+
+def issue_fields(issue):
+    """Matching fields of an Issue row in the same shape the API uses."""
+    return {
+        'issue': issue.issue_title,
+        'issue_description': issue.issue_description,
+        'location': issue.location,
+    }
+
+
+def issue_text(issue):
+    """The fields an issue is matched on: title, location and the start of the description."""
+    return ' '.join([
+        str(issue.get('issue') or ''),
+        str(issue.get('location') or ''),
+        str(issue.get('issue_description') or '')[:MAX_TEXT_CHARS],
+    ])
+
+
+class IssueIndex:
+    """
+    In-memory TF-IDF index. Vectors are L2-normalized so the score of a
+    query against a document is their cosine similarity.
+    """
+
+    def __init__(self, documents):
+        """`documents` is an iterable of (doc_id, text)."""
+        self.doc_ids = []
+        doc_grams = []
+        for doc_id, text in documents:
+            self.doc_ids.append(doc_id)
+            doc_grams.append(char_ngrams(text))
+
+        doc_count = len(self.doc_ids)
+        df = Counter()
+        for grams in doc_grams:
+            df.update(grams.keys())
+
+        max_df = max(1, int(MAX_DOC_FREQUENCY * doc_count)) if doc_count > 10 else doc_count
+        self.idf = {
+            gram: math.log((1 + doc_count) / (1 + freq)) + 1
+            for gram, freq in df.items()
+            if freq <= max_df
+        }
+
+        self.postings = defaultdict(list)
+        for position, grams in enumerate(doc_grams):
+            for gram, weight in self._vector(grams).items():
+                self.postings[gram].append((position, weight))
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def _vector(self, grams):
+        vector = {
+            gram: (1 + math.log(count)) * self.idf[gram]
+            for gram, count in grams.items()
+            if gram in self.idf
+        }
+        norm = math.sqrt(sum(w * w for w in vector.values()))
+        if not norm:
+            return {}
+        return {gram: w / norm for gram, w in vector.items()}
+
+    def search(self, text, top_k=5, min_score=0.0):
+        """Return up to `top_k` (doc_id, score) pairs, best first."""
+        scores = defaultdict(float)
+        for gram, q_weight in self._vector(char_ngrams(text)).items():
+            for position, d_weight in self.postings.get(gram, ()):
+                scores[position] += q_weight * d_weight
+
+        ranked = heapq.nlargest(top_k, scores.items(), key=lambda kv: kv[1])
+        return [
+            (self.doc_ids[position], round(score, 4))
+            for position, score in ranked
+            if score >= min_score
+        ]
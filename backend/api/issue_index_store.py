@@ -0,0 +1,320 @@
+"""
+issue_index_store.py - Persistent, incrementally maintained issue similarity index.
+
+Every Issue has an IssueIndexEntry holding the normalized TF-IDF weights of
+its most distinctive character n-grams, computed against the vocabulary of
+the last full rebuild, so loading the index does no text processing.
+Signals keep the entries current when issues are created, edited, resolved
+or deleted.
+
+Each worker process loads the entries once into an in-memory inverted index
+and, before every search, applies only the entries changed since its last
+sync (by `updated_at`), so writes from other processes show up without a
+reload. Deletions and rebuilds leave no row to sync, so they bump a version
+stamp (CacheVersion 'issue_index') and every process reloads when it moves.
+`rebuild_issue_index` recomputes everything, including the vocabulary, and
+should be run after bulk imports. A database that has issues but was never
+indexed (issues that predate the index, a restored dump) is built by
+`run_jobs` at startup, never inside a request.
+"""
+import hashlib
+import heapq
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .issue_index import char_ngrams, issue_fields, issue_text
+from .models import CacheVersion, Issue, IssueIndexEntry, IssueIndexVocabulary
+
+ISSUE_INDEX_VERSION_KEY = 'issue_index'
+
+
+def _max_terms():
+    return int(getattr(settings, 'ISSUE_INDEX_MAX_TERMS', 64))
+
+
+def _query_terms():
+    return int(getattr(settings, 'ISSUE_INDEX_QUERY_TERMS', 32))
+
+
+def index_version():
+    return CacheVersion.objects.filter(key=ISSUE_INDEX_VERSION_KEY).values_list('version', flat=True).first() or 0
+
+
+def bump_index_version():
+    """Called when entries are deleted or rebuilt; every process reloads on its next sync."""
+    updated = CacheVersion.objects.filter(key=ISSUE_INDEX_VERSION_KEY).update(version=F('version') + 1)
+    if not updated:
+        try:
+            with transaction.atomic():
+                CacheVersion.objects.create(key=ISSUE_INDEX_VERSION_KEY, version=1)
+        except IntegrityError:
+            CacheVersion.objects.filter(key=ISSUE_INDEX_VERSION_KEY).update(version=F('version') + 1)
+
+
+def _text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class Vocabulary:
+    """IDF table from the last rebuild; n-grams it has never seen get the highest IDF."""
+
+    def __init__(self, doc_count=0, doc_freq=None):
+        self.doc_count = doc_count
+        self.doc_freq = doc_freq or {}
+
+    @classmethod
+    def load(cls):
+        row = IssueIndexVocabulary.objects.order_by('-built_at').first()
+        return cls(row.doc_count, row.doc_freq) if row else cls()
+
+    def idf(self, gram):
+        return math.log((1 + self.doc_count) / (1 + self.doc_freq.get(gram, 0))) + 1
+
+
+def weigh_terms(grams, vocabulary, limit=None):
+    """L2-normalized TF-IDF weights of the `limit` most distinctive grams."""
+    weights = {gram: (1 + math.log(count)) * vocabulary.idf(gram) for gram, count in grams.items()}
+    if limit and len(weights) > limit:
+        weights = dict(heapq.nlargest(limit, weights.items(), key=lambda kv: kv[1]))
+    norm = math.sqrt(sum(w * w for w in weights.values()))
+    if not norm:
+        return {}
+    return {gram: w / norm for gram, w in weights.items()}
+
+
+def entry_terms(grams, vocabulary):
+    """The stored form of an issue: [[gram, weight], ...] for its top terms."""
+    return [[gram, round(weight, 5)] for gram, weight in weigh_terms(grams, vocabulary, _max_terms()).items()]
+
+
+class PersistentIssueIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.vocabulary = Vocabulary()
+        self.vectors = {}
+        self.postings = defaultdict(dict)
+        self.open_ids = set()
+        self.synced_at = None
+        self.version = None
+
+    # ----- in-memory maintenance -----
+
+    def _remove(self, issue_id):
+        vector = self.vectors.pop(issue_id, None)
+        if vector:
+            for gram in vector:
+                bucket = self.postings.get(gram)
+                if bucket is not None:
+                    bucket.pop(issue_id, None)
+                    if not bucket:
+                        del self.postings[gram]
+        self.open_ids.discard(issue_id)
+
+    def _apply(self, issue_id, terms, is_open):
+        self._remove(issue_id)
+        vector = dict(terms)
+        self.vectors[issue_id] = vector
+        for gram, weight in vector.items():
+            self.postings[gram][issue_id] = weight
+        if is_open:
+            self.open_ids.add(issue_id)
+
+    def _apply_rows(self, rows):
+        for issue_id, terms, is_open, updated_at in rows:
+            self._apply(issue_id, terms, is_open)
+            if self.synced_at is None or updated_at > self.synced_at:
+                self.synced_at = updated_at
+
+    def load(self):
+        """Read every entry once; later calls only sync changes."""
+        with self._lock:
+            started = time.perf_counter()
+            # Read before the entries, so a bump during the load triggers another one
+            self.version = index_version()
+            self.vocabulary = Vocabulary.load()
+            self.vectors, self.postings, self.open_ids, self.synced_at = {}, defaultdict(dict), set(), None
+            self._apply_rows(
+                IssueIndexEntry.objects.values_list('issue_id', 'terms', 'is_open', 'updated_at').iterator(chunk_size=2000)
+            )
+            self.loaded = True
+            print(f"📚 Issue index loaded: {len(self.vectors)} issue(s) in {time.perf_counter() - started:.2f}s")
+
+    def sync(self):
+        """Apply entries written by any process since the last load/sync; reload after a deletion or rebuild."""
+        with self._lock:
+            if not self.loaded or index_version() != self.version:
+                self.load()
+                return
+            rows = IssueIndexEntry.objects.values_list('issue_id', 'terms', 'is_open', 'updated_at')
+            if self.synced_at is not None:
+                # >= so rows written in the same instant as the last sync are not missed
+                rows = rows.filter(updated_at__gte=self.synced_at)
+            self._apply_rows(rows)
+
+    def forget(self, issue_id):
+        with self._lock:
+            self._remove(issue_id)
+
+    # ----- queries -----
+
+    def search(self, text, top_k=5, min_score=0.0, allowed_ids=None, open_only=True, sync=True):
+        """Up to `top_k` (issue_id, score) pairs by cosine similarity, best first."""
+        if sync:
+            self.sync()
+        # Only the query's most distinctive grams are looked up; they dominate the cosine anyway
+        query = weigh_terms(char_ngrams(text), self.vocabulary, _query_terms())
+        scores = defaultdict(float)
+        with self._lock:
+            for gram, q_weight in query.items():
+                for issue_id, d_weight in self.postings.get(gram, {}).items():
+                    scores[issue_id] += q_weight * d_weight
+            if open_only:
+                scores = {i: s for i, s in scores.items() if i in self.open_ids}
+        if allowed_ids is not None:
+            scores = {i: s for i, s in scores.items() if i in allowed_ids}
+
+        ranked = heapq.nlargest(top_k, scores.items(), key=lambda kv: kv[1])
+        return [(issue_id, round(score, 4)) for issue_id, score in ranked if score >= min_score]
+
+    def __contains__(self, issue_id):
+        return issue_id in self.vectors
+
+
+_index = PersistentIssueIndex()
+
+
+def get_issue_index():
+    """The process-wide index, loaded from the database on first use."""
+    return _index
+
+
+def index_issue(issue):
+    """Create or refresh the entry of one Issue. Called from the post_save signal."""
+    text = issue_text(issue_fields(issue))
+    text_hash = _text_hash(text)
+    is_open = issue.resolution_status == 'unresolved'
+
+    entry = IssueIndexEntry.objects.filter(issue_id=issue.pk).only('text_hash', 'is_open').first()
+    if entry and entry.text_hash == text_hash:
+        if entry.is_open != is_open:
+            entry.is_open = is_open
+            entry.save(update_fields=['is_open', 'updated_at'])
+        return
+
+    vocabulary = _index.vocabulary if _index.loaded else Vocabulary.load()
+    IssueIndexEntry.objects.update_or_create(
+        issue_id=issue.pk,
+        defaults={
+            'terms': entry_terms(char_ngrams(text), vocabulary),
+            'text_hash': text_hash,
+            'is_open': is_open,
+        },
+    )
+
+
+def index_issues(issues):
+    """
+    index_issue for many issues in at most four queries, for bulk writes that send
+    no post_save (the allocation engine). Returns the number of entries written.
+    """
+    issues = [issue for issue in issues if issue.pk]
+    if not issues:
+        return 0
+    entries = {
+        entry.issue_id: entry
+        for entry in IssueIndexEntry.objects.filter(issue_id__in=[issue.pk for issue in issues]).only('issue_id', 'text_hash', 'is_open')
+    }
+    vocabulary = _index.vocabulary if _index.loaded else Vocabulary.load()
+    now = timezone.now()
+    to_create, retexted, reopened = [], [], []
+    for issue in issues:
+        text = issue_text(issue_fields(issue))
+        text_hash = _text_hash(text)
+        is_open = issue.resolution_status == 'unresolved'
+        entry = entries.get(issue.pk)
+        if entry is None:
+            to_create.append(IssueIndexEntry(
+                issue_id=issue.pk, terms=entry_terms(char_ngrams(text), vocabulary), text_hash=text_hash, is_open=is_open,
+            ))
+        elif entry.text_hash != text_hash or entry.is_open != is_open:
+            # bulk_update skips auto_now, and sync() reads updated_at
+            entry.is_open, entry.updated_at = is_open, now
+            if entry.text_hash != text_hash:
+                entry.terms = entry_terms(char_ngrams(text), vocabulary)
+                entry.text_hash = text_hash
+                retexted.append(entry)
+            else:
+                reopened.append(entry)
+    if to_create:
+        IssueIndexEntry.objects.bulk_create(to_create, ignore_conflicts=True)
+    if retexted:
+        # An upsert on the primary key; bulk_update's per-row CASE over JSON terms is far slower
+        IssueIndexEntry.objects.bulk_create(
+            retexted, update_conflicts=True, unique_fields=['issue'], update_fields=['terms', 'text_hash', 'is_open', 'updated_at'],
+        )
+    if reopened:
+        # `terms` was not loaded, so it must stay out of this update
+        IssueIndexEntry.objects.bulk_update(reopened, ['is_open', 'updated_at'])
+    return len(to_create) + len(retexted) + len(reopened)
+
+
+def _iter_issue_texts(batch_size):
+    fields = ('id', 'issue_title', 'issue_description', 'location', 'resolution_status')
+    for issue in Issue.objects.only(*fields).iterator(chunk_size=batch_size):
+        yield issue, issue_text(issue_fields(issue))
+
+
+def _build_index(batch_size=1000):
+    """
+    Recompute the vocabulary from every issue, then every entry with it.
+    Two passes over the table keep memory flat instead of holding every
+    issue's n-grams at once. Returns the number of issues indexed.
+    """
+    doc_freq = Counter()
+    doc_count = 0
+    for _issue, text in _iter_issue_texts(batch_size):
+        doc_freq.update(char_ngrams(text).keys())
+        doc_count += 1
+    vocabulary = Vocabulary(doc_count, dict(doc_freq))
+
+    with transaction.atomic():
+        IssueIndexVocabulary.objects.all().delete()
+        IssueIndexVocabulary.objects.create(doc_count=vocabulary.doc_count, doc_freq=vocabulary.doc_freq)
+        IssueIndexEntry.objects.all().delete()
+        batch = []
+        for issue, text in _iter_issue_texts(batch_size):
+            batch.append(IssueIndexEntry(
+                issue_id=issue.pk,
+                terms=entry_terms(char_ngrams(text), vocabulary),
+                text_hash=_text_hash(text),
+                is_open=issue.resolution_status == 'unresolved',
+            ))
+            if len(batch) >= batch_size:
+                IssueIndexEntry.objects.bulk_create(batch)
+                batch = []
+        IssueIndexEntry.objects.bulk_create(batch)
+        bump_index_version()
+    return doc_count
+
+
+def ensure_index_built():
+    """Build the index if issues exist but it never was. Returns the number of issues indexed, or None."""
+    if IssueIndexVocabulary.objects.exists() or not Issue.objects.exists():
+        return None
+    print("📚 Issue index was never built; indexing existing issues")
+    return _build_index()
+
+
+def rebuild_index(batch_size=1000):
+    """Rebuild the stored index and reload this process's copy. Returns the number of issues indexed."""
+    doc_count = _build_index(batch_size)
+    _index.load()
+    return doc_count
@@ -0,0 +1,134 @@
+"""
+issue_matching.py - Match newly extracted issues against unresolved ones.
+
+A local character n-gram index shortlists the top-K existing issues for
+each new issue; only those shortlisted issues go into the Gemini prompt, so
+the prompt size depends on the number of new issues, not on how many
+issues are open. The persistent index (issue_index_store) is used when it
+covers the existing issues; otherwise a throwaway index is built from the
+request payload. New issues the model has already matched are answered
+from the verdict cache (match_cache) and not sent again.
+
+The engine is 'gemini', 'lexical' (BM25, no model call; lexical_matcher) or
+'auto': Gemini, falling back to the lexical matcher for the new issues the
+model could not judge at all.
+"""
+from django.conf import settings
+
+from .gemini_utils import match_issues_with_gemini, CONFIDENCE_RANK
+from .issue_index import IssueIndex, issue_text
+from .issue_index_store import get_issue_index
+from .lexical_matcher import lexical_match
+from .match_cache import content_hash, existing_hashes, lookup_verdicts, store_verdicts, verdict_key
+
+
+def prefilter_candidates(new_issues, existing_issues, top_k=None, min_score=None):
+    """
+    Return {new_index: [(existing_id, score), ...]} with the best `top_k`
+    existing issues per new issue. New issues without any candidate above
+    `min_score` are left out.
+    """
+    top_k = top_k or int(getattr(settings, 'MATCH_PREFILTER_TOP_K', 5))
+    min_score = float(getattr(settings, 'MATCH_PREFILTER_MIN_SCORE', 0.05)) if min_score is None else min_score
+
+    existing_ids = {e.get('id') for e in existing_issues}
+    persistent = get_issue_index()
+    persistent.sync()
+    covered = sum(1 for existing_id in existing_ids if existing_id in persistent)
+
+    if covered == len(existing_ids):
+        search = lambda text: persistent.search(text, top_k=top_k, min_score=min_score, allowed_ids=existing_ids, sync=False)
+    else:
+        print(f"⚠️ Issue index covers {covered}/{len(existing_ids)} existing issue(s); indexing the request instead (run rebuild_issue_index)")
+        index = IssueIndex((e.get('id'), issue_text(e)) for e in existing_issues)
+        search = lambda text: index.search(text, top_k=top_k, min_score=min_score)
+
+    candidates = {}
+    for new in new_issues:
+        hits = search(issue_text(new))
+        if hits:
+            candidates[new.get('index')] = hits
+    return candidates
+
+
+MATCH_ENGINES = ('auto', 'gemini', 'lexical')
+
+
+def match_new_issues(new_issues, existing_issues, top_k=None, min_score=None, engine=None):
+    """
+    Prefilter locally, answer already-matched new issues from the verdict
+    cache, then let Gemini decide for the rest among their shortlisted
+    candidates only.
+    """
+    if not new_issues or not existing_issues:
+        return []
+
+    engine = engine or getattr(settings, 'MATCH_ENGINE', 'auto')
+    if engine not in MATCH_ENGINES:
+        print(f"⚠️ Unknown match engine '{engine}'; using 'auto'")
+        engine = 'auto'
+    if engine == 'lexical':
+        return lexical_match(new_issues, existing_issues)
+
+    candidates = prefilter_candidates(new_issues, existing_issues, top_k, min_score)
+    if not candidates:
+        print("🔎 Prefilter found no candidates; skipping Gemini matching")
+        return []
+
+    shortlisted_ids = {existing_id for hits in candidates.values() for existing_id, _score in hits}
+    versions = existing_hashes(shortlisted_ids)
+    new_by_index = {new.get('index'): new for new in new_issues if new.get('index') in candidates}
+
+    # (new_index, existing_id) -> cache key, for pairs whose existing issue is in the database
+    pair_keys = {}
+    for new_index, new in new_by_index.items():
+        new_hash = content_hash(new)
+        for existing_id, _score in candidates[new_index]:
+            if existing_id in versions:
+                pair_keys[(new_index, existing_id)] = verdict_key(new_hash, existing_id, versions[existing_id])
+    cached = lookup_verdicts(list(pair_keys.values()))
+
+    results = [
+        {'new_index': new_index, 'existing_id': existing_id, 'confidence': cached[key][1]}
+        for (new_index, existing_id), key in pair_keys.items()
+        if key in cached
+    ]
+    answered = {match['new_index'] for match in results}
+    prompt_new = [
+        dict(new, candidate_ids=[existing_id for existing_id, _score in candidates[new_index]])
+        for new_index, new in new_by_index.items()
+        if new_index not in answered
+    ]
+
+    pending_ids = {existing_id for new in prompt_new for existing_id in new['candidate_ids']}
+    shortlisted = [e for e in existing_issues if e.get('id') in pending_ids]
+    print(
+        f"🔎 Prefilter: {len(new_by_index)}/{len(new_issues)} new issue(s) with candidates, "
+        f"{len(answered)} answered from the verdict cache, "
+        f"{len(shortlisted)}/{len(existing_issues)} existing issue(s) sent to Gemini"
+    )
+
+    if prompt_new:
+        evaluated = set()
+        fresh = match_issues_with_gemini(prompt_new, shortlisted, evaluated=evaluated)
+        matched = {(m.get('new_index'), m.get('existing_id')): m.get('confidence', '') for m in fresh}
+        store_verdicts(
+            (pair_keys[pair], pair[1], versions[pair[1]], True, confidence)
+            for pair, confidence in matched.items()
+            if pair in pair_keys
+        )
+        results.extend(fresh)
+
+        # New issues none of whose pairs the model judged (every batch they were in failed)
+        unjudged = [new for new in prompt_new if not any(pair[0] == new.get('index') for pair in evaluated)]
+        if unjudged and engine == 'auto':
+            print(f"⚠️ Gemini could not judge {len(unjudged)} new issue(s); using the lexical matcher for them")
+            results.extend(lexical_match(unjudged, shortlisted))
+
+    # A new issue still matches at most one existing issue: keep the most confident
+    best = {}
+    for match in results:
+        rank = CONFIDENCE_RANK.get(str(match.get('confidence', '')).lower(), 0)
+        if match['new_index'] not in best or rank > best[match['new_index']][0]:
+            best[match['new_index']] = (rank, match)
+    return [match for _rank, match in best.values()]
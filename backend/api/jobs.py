@@ -0,0 +1,258 @@
+"""
+jobs.py - DB-backed background job pipeline.
+
+Web requests only enqueue a ProcessingJob row and return its id. The
+`run_jobs` management command claims queued rows and runs extraction,
+normalization and storage outside of the HTTP request cycle.
+"""
+import contextvars
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Minutes, ProcessingJob
+from .gemini_utils import analyze_document_with_gemini, stream_document_issues, GEMINI_STREAMING
+from .extraction_cache import lookup_extraction, store_extraction
+from .bulk_ingest import ingest_zip
+from .supabase_utils import upload_to_supabase
+from .model_metrics import metrics_endpoint
+from .near_duplicates import resolve_near_duplicates
+from .department_utils import (
+    build_available_departments,
+    get_department_matcher,
+)
+
+SUPABASE_BUCKET = os.getenv('SUPABASE_BUCKET_NAME', 'Mnutes')
+
+
+def enqueue_minutes_upload(user, file_path, original_filename, meeting_date):
+    """Create a queued job for a minutes file already saved at `file_path`."""
+    job = ProcessingJob.objects.create(
+        job_type='minutes_upload',
+        created_by=user,
+        file_path=file_path,
+        original_filename=original_filename,
+        meeting_date=meeting_date,
+    )
+    print(f"📥 Queued job {job.id} for: {original_filename}")
+    return job
+
+
+def enqueue_bulk_ingest(user, zip_path, original_filename, default_meeting_date):
+    """Create a queued job for a ZIP of minutes files already saved at `zip_path`."""
+    job = ProcessingJob.objects.create(
+        job_type='bulk_ingest',
+        created_by=user,
+        file_path=zip_path,
+        original_filename=original_filename,
+        meeting_date=default_meeting_date,
+    )
+    print(f"📥 Queued bulk ingest job {job.id} for: {original_filename}")
+    return job
+
+
+def claim_next_job():
+    """Atomically move the oldest queued job to running. Returns None if the queue is empty."""
+    with transaction.atomic():
+        job = (
+            ProcessingJob.objects.select_for_update(skip_locked=True)
+            .filter(status='queued')
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+
+        job.status = 'running'
+        job.stage = 'starting'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'stage', 'started_at', 'updated_at'])
+    return job
+
+
+def requeue_stale_jobs():
+    """Put back jobs left running by a worker that died mid-job."""
+    stale_minutes = int(getattr(settings, 'JOB_STALE_AFTER_MINUTES', 30) or 0)
+    if stale_minutes <= 0:
+        return 0
+
+    cutoff = timezone.now() - timedelta(minutes=stale_minutes)
+    return ProcessingJob.objects.filter(status='running', updated_at__lt=cutoff).update(
+        status='queued',
+        stage='queued',
+        progress=0,
+        updated_at=timezone.now(),
+    )
+
+
+def _set_stage(job, stage, progress):
+    job.stage = stage
+    job.progress = progress
+    job.save(update_fields=['stage', 'progress', 'updated_at'])
+
+
+def run_job(job):
+    """Run a claimed job to completion, recording failure instead of raising."""
+    handler = JOB_HANDLERS.get(job.job_type)
+    print(f"--- ⚙️ Running job {job.id} ({job.job_type}) ---")
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown job type: {job.job_type}")
+        with metrics_endpoint(f"job:{job.job_type}"):
+            handler(job)
+    except Exception as e:
+        traceback.print_exc()
+        job.status = 'failed'
+        job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at', 'updated_at'])
+        print(f"❌ Job {job.id} failed: {e}")
+        return job
+
+    job.status = 'completed'
+    job.stage = 'done'
+    job.progress = 100
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'stage', 'progress', 'finished_at', 'updated_at'])
+    print(f"✅ Job {job.id} completed")
+    return job
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, round(time.perf_counter() - start, 3)
+
+
+def _stream_extraction(job, available_departments, resolution, timings):
+    """
+    Consume the streaming extractor, normalizing each issue as it arrives and
+    saving the partial clean_data on the job so the SSE endpoint can push it.
+    Returns (raw_data, clean_data, complete).
+    """
+    start = time.perf_counter()
+    raw_data, clean_data = [], []
+    outcome = {}
+    for item in stream_document_issues(job.file_path, available_departments, outcome):
+        raw_data.append(item)
+        # Normalize a copy; raw_data is what goes into the extraction cache
+        clean = resolution.normalize_issue(dict(item))
+        print(f"  Streamed issue {len(clean_data) + 1}: {clean.get('departments')}")
+        clean_data.append(clean)
+        if len(clean_data) == 1:
+            timings['first_issue'] = round(time.perf_counter() - start, 3)
+        job.clean_data = clean_data
+        job.save(update_fields=['clean_data', 'updated_at'])
+    timings['extraction'] = round(time.perf_counter() - start, 3)
+    if 'presegment' in outcome:
+        timings['presegment'] = outcome['presegment']
+    return raw_data, clean_data, outcome['complete']
+
+
+def process_minutes_upload(job):
+    """
+    Extraction and storage (concurrently) -> department normalization -> Minutes record.
+    With GEMINI_STREAMING each issue is normalized and saved on the job as soon as it is extracted.
+    """
+    timings = {}
+    started = time.perf_counter()
+
+    _set_stage(job, 'extracting', 10)
+    # Read the file once; the same bytes feed the cache key and the Supabase upload
+    with open(job.file_path, 'rb') as f:
+        file_data = f.read()
+    available_departments = build_available_departments()
+    (file_sha256, cache_key, raw_data), timings['cache_lookup'] = _timed(
+        lookup_extraction, file_data, available_departments, GEMINI_STREAMING
+    )
+
+    resolution = get_department_matcher().resolution(job.original_filename)
+
+    # Storage does not depend on extraction, so the two run side by side.
+    # The pool only runs the network calls; all DB access stays on this thread.
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        upload_future = pool.submit(
+            _timed,
+            upload_to_supabase,
+            file_data=file_data,
+            original_filename=job.original_filename,
+            bucket=SUPABASE_BUCKET,
+            folder='public'
+        )
+        clean_data = None
+        if raw_data is not None:
+            print(f"⚡ Extraction cache hit for: {job.original_filename}")
+            timings['extraction'] = 0.0
+        else:
+            if GEMINI_STREAMING:
+                raw_data, clean_data, complete = _stream_extraction(job, available_departments, resolution, timings)
+            else:
+                outcome = {}
+                (raw_data, complete), timings['extraction'] = pool.submit(
+                    contextvars.copy_context().run, _timed, analyze_document_with_gemini, job.file_path, available_departments, outcome
+                ).result()
+                if 'presegment' in outcome:
+                    timings['presegment'] = outcome['presegment']
+            # A failed section or cut-off answer is used for this upload but not remembered
+            if raw_data and complete:
+                store_extraction(cache_key, file_sha256, raw_data, job.original_filename)
+        supabase_public_url, timings['storage_upload'] = upload_future.result()
+    print(f"🔍 Gemini returned {len(raw_data)} issues.")
+
+    _set_stage(job, 'normalizing', 70)
+    normalize_start = time.perf_counter()
+    if clean_data is None:
+        clean_data = []
+        for i, item in enumerate(raw_data):
+            print(f"--- Processing Issue {i+1} ---")
+            item = resolution.normalize_issue(item)
+            print(f"  Matched Depts: {item.get('departments')}")
+            clean_data.append(item)
+    # Merge (or flag) repeated action items before the DPO allocates them
+    clean_data = resolve_near_duplicates(clean_data)
+    timings['normalization'] = round(time.perf_counter() - normalize_start, 3)
+    timings['department_resolution'] = resolution.log()
+
+    _set_stage(job, 'storing', 90)
+    # Use Supabase URL if upload succeeded, otherwise fall back to local path
+    minute_obj, timings['minutes_record'] = _timed(
+        Minutes.objects.create,
+        title=job.original_filename,
+        meeting_date=job.meeting_date,
+        uploaded_by=job.created_by,
+        file_path=supabase_public_url or job.file_path
+    )
+    print(f"✅ Minutes record created: ID {minute_obj.id}, Title: {job.original_filename}")
+
+    timings['total'] = round(time.perf_counter() - started, 3)
+    print(f"⏱️ Job {job.id} timings: {timings}")
+
+    job.minutes = minute_obj
+    job.clean_data = clean_data
+    job.timings = timings
+    job.save(update_fields=['minutes', 'clean_data', 'timings', 'updated_at'])
+
+
+def process_bulk_ingest(job):
+    """Ingest every minutes file in an uploaded ZIP; the per-file manifest is stored on the job."""
+    _set_stage(job, 'extracting', 5)
+
+    def on_progress(done, total):
+        _set_stage(job, 'extracting', 5 + int(85 * done / total))
+
+    manifest = ingest_zip(job.file_path, job.created_by, job.meeting_date, on_progress=on_progress)
+
+    job.manifest = manifest
+    job.save(update_fields=['manifest', 'updated_at'])
+
+
+JOB_HANDLERS = {
+    'minutes_upload': process_minutes_upload,
+    'bulk_ingest': process_bulk_ingest,
+}
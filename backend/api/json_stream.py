@@ -0,0 +1,220 @@
+"""
+json_stream.py - Incremental, fault-tolerant parsing of JSON arrays from model output.
+
+Gemini answers with a JSON array, sometimes wrapped in ```json fences or a
+sentence of preamble, and near the output-token limit the last object is
+often cut off. `json.loads` on the whole text then fails and every issue is
+lost. ArrayStreamParser instead scans the text once and hands back each
+top-level element as soon as it is complete, so
+
+- a truncated answer still yields every complete element before the cut,
+- streamed chunks are parsed as they arrive without re-reading earlier text,
+- fences and text around the array are ignored; the array starts at the
+  first '[' followed by '{' or ']', so a stray bracket in the preamble
+  ("see item [3] below") is not taken for it.
+
+`parse_json_array(text)` is the one-shot helper for non-streamed responses.
+"""
+import json
+import re
+
+# Inside a string only quotes and backslashes matter
+_STRING_SPECIAL_RE = re.compile(r'["\\]')
+_STRUCTURAL_RE = re.compile(r'[\[\]{}",]')
+_ELEMENT_START_RE = re.compile(r'[^\s,]')
+# An array of objects (or an empty one); other brackets are prose
+_ARRAY_START_RE = re.compile(r'\[(?=\s*[{\]])')
+
+
+class ParseReport:
+    """What the parser saw: the recovered items plus how the array ended."""
+
+    def __init__(self, items, complete, truncated, skipped, trailing):
+        self.items = items
+        # The closing ']' of the array was seen
+        self.complete = complete
+        # The text ended inside the array (typically the output-token limit)
+        self.truncated = truncated
+        # Elements that were complete but not valid JSON
+        self.skipped = skipped
+        # Unparsed text of the element that was cut off, if any
+        self.trailing = trailing
+
+    @property
+    def found_array(self):
+        return self.complete or self.truncated
+
+    @property
+    def lossless(self):
+        """Every element the model wrote was recovered: the array closed and nothing was skipped."""
+        return self.complete and not self.skipped
+
+    def summary(self):
+        state = 'complete' if self.complete else ('truncated' if self.truncated else 'no array found')
+        return f"{len(self.items)} item(s), {state}, {self.skipped} malformed"
+
+    def __repr__(self):
+        return f"<ParseReport {self.summary()}>"
+
+
+class ArrayStreamParser:
+    """
+    Feed text chunks with `feed()`; each call returns the top-level array
+    elements completed by that chunk. `finish()` returns a ParseReport.
+
+    The scanner jumps between structural characters with regular
+    expressions instead of stepping through string contents one by one.
+
+    Consumed text is dropped from the buffer, so memory stays proportional
+    to the element currently being read, not the whole response.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._pos = 0
+        self._depth = 0           # 0 = before the array, 1 = between elements
+        self._in_string = False
+        self._element_start = None
+        self._element_kind = None  # 'container', 'string' or 'scalar'
+        self.items = []
+        self.skipped = 0
+        self.complete = False
+
+    def feed(self, chunk):
+        if self.complete or not chunk:
+            return []
+        self._buffer += chunk
+        completed = []
+        buffer = self._buffer
+        i = self._pos
+        end = len(buffer)
+
+        while i < end:
+            if self._in_string:
+                # Jump straight to the next quote or backslash; string bodies are most of the text
+                match = _STRING_SPECIAL_RE.search(buffer, i)
+                if match is None:
+                    i = end
+                    break
+                i = match.start()
+                if buffer[i] == '\\':
+                    if i + 1 >= end:
+                        break  # escape split across chunks; resume here next time
+                    i += 2
+                    continue
+                self._in_string = False
+                i += 1
+                if self._depth == 1 and self._element_kind == 'string':
+                    self._emit(buffer, i, completed)
+                continue
+
+            if self._depth == 0:
+                # Skip fences and preamble until the array opens
+                match = _ARRAY_START_RE.search(buffer, i)
+                if match is None:
+                    # A '[' at the end of the chunk may still be followed by '{' in the next one
+                    pending = buffer.rfind('[', i)
+                    i = pending if pending != -1 and not buffer[pending + 1:].strip() else end
+                    break
+                self._depth = 1
+                i = match.end()
+                continue
+
+            if self._depth == 1 and self._element_start is None:
+                match = _ELEMENT_START_RE.search(buffer, i)
+                if match is None:
+                    i = end
+                    break
+                i = match.start()
+                ch = buffer[i]
+                if ch == ']':
+                    self.complete = True
+                    self._depth = 0
+                    break
+                self._element_start = i
+                self._element_kind = 'container' if ch in '{[' else ('string' if ch == '"' else 'scalar')
+            else:
+                match = _STRUCTURAL_RE.search(buffer, i)
+                if match is None:
+                    i = end
+                    break
+                i = match.start()
+                ch = buffer[i]
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                if self._depth == 1:
+                    # ']' closing the array right after a bare scalar
+                    if self._element_kind == 'scalar':
+                        self._emit(buffer, i, completed)
+                    self.complete = True
+                    self._depth = 0
+                    break
+                self._depth -= 1
+                if self._depth == 1:
+                    self._emit(buffer, i + 1, completed)
+            elif ch == ',' and self._depth == 1 and self._element_kind == 'scalar':
+                self._emit(buffer, i, completed)
+            i += 1
+
+        # Drop everything before the element in progress
+        keep_from = self._element_start if self._element_start is not None else min(i, end)
+        self._buffer = buffer[keep_from:]
+        if self._element_start is not None:
+            self._element_start = 0
+        self._pos = i - keep_from
+        return completed
+
+    def _emit(self, buffer, stop, completed):
+        raw = buffer[self._element_start:stop]
+        self._element_start = None
+        self._element_kind = None
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            self.skipped += 1
+            return
+        self.items.append(value)
+        completed.append(value)
+
+    def finish(self):
+        truncated = not self.complete and self._depth > 0
+        trailing = self._buffer.strip() if truncated else ''
+        return ParseReport(self.items, self.complete, truncated, self.skipped, trailing)
+
+
+def iter_array_items(chunks):
+    """
+    Yield top-level array elements from an iterable of text chunks as they
+    complete. The generator's return value (`yield from`) is the ParseReport.
+    """
+    parser = ArrayStreamParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    report = parser.finish()
+    if report.truncated or report.skipped:
+        print(f"⚠️ Streamed JSON array: {report.summary()}")
+    return report
+
+
+_decoder = json.JSONDecoder()
+
+
+def parse_json_array(text):
+    """Parse a (possibly fenced or truncated) JSON array. Returns a ParseReport."""
+    text = text or ''
+    start = _ARRAY_START_RE.search(text)
+    if start is not None:
+        # Well-formed answers (the common case) go through the C decoder in one call
+        try:
+            items, _end = _decoder.raw_decode(text, start.start())
+            return ParseReport(items, True, False, 0, '')
+        except json.JSONDecodeError:
+            pass
+
+    parser = ArrayStreamParser()
+    parser.feed(text)
+    return parser.finish()
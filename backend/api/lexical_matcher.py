@@ -0,0 +1,134 @@
+"""
+lexical_matcher.py - Model-free issue matching (BM25 plus location overlap).
+
+Used when Gemini is unavailable or rate-limited, or when a request asks
+for engine='lexical'. Issues are tokenized on normalized Malayalam/English
+words with common Malayalam case and plural suffixes stripped, so റോഡിൽ,
+റോഡിന്റെ and റോഡുകൾ all count as റോഡ. Returns the same
+{new_index, existing_id, confidence} shape as match_issues_with_gemini.
+"""
+import math
+from collections import Counter
+
+from django.conf import settings
+
+from .issue_index import normalize_text
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Longest first; only stripped when at least two characters of stem remain
+_SUFFIXES = sorted([
+    'ിന്റെ', 'ന്റെ', 'ുടെ', 'യുടെ', 'ിലെ', 'ിലും', 'ിൽ', 'യിൽ', 'ത്തിൽ', 'ത്തിന്',
+    'ിന്', 'ിനു', 'ിനെ', 'യെ', 'ുകൾ', 'ുകളുടെ', 'ുകളിൽ', 'കൾ', 'ും', 'ോട്', 'ിലേക്ക്',
+    'ലേക്ക്', 'ായി', 'ിയ', '്',
+], key=len, reverse=True)
+
+
+def _stem(token):
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 2:
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text):
+    return [_stem(token) for token in normalize_text(text).split() if len(token) > 1]
+
+
+def _issue_tokens(issue):
+    return tokenize(' '.join([
+        str(issue.get('issue') or ''),
+        str(issue.get('issue_description') or ''),
+        str(issue.get('location') or ''),
+    ]))
+
+
+def _location_overlap(left, right):
+    left, right = set(tokenize(left)), set(tokenize(right))
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+def _thresholds():
+    return (
+        float(getattr(settings, 'LEXICAL_MATCH_HIGH', 0.55)),
+        float(getattr(settings, 'LEXICAL_MATCH_MEDIUM', 0.35)),
+        float(getattr(settings, 'LEXICAL_MATCH_LOCATION_WEIGHT', 0.2)),
+    )
+
+
+class BM25Index:
+    def __init__(self, documents):
+        """`documents` is a list of (doc_id, tokens)."""
+        self.doc_ids = [doc_id for doc_id, _tokens in documents]
+        self.term_freqs = [Counter(tokens) for _doc_id, tokens in documents]
+        self.lengths = [len(tokens) for _doc_id, tokens in documents]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        doc_freq = Counter()
+        for freqs in self.term_freqs:
+            doc_freq.update(freqs.keys())
+        count = len(documents)
+        self.idf = {term: math.log(1 + (count - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+        # Query terms no document has still count toward the ceiling, as the rarest kind of term
+        self.unseen_idf = math.log(1 + (count + 0.5) / 0.5)
+        self.postings = {}
+        for position, freqs in enumerate(self.term_freqs):
+            for term in freqs:
+                self.postings.setdefault(term, []).append(position)
+
+    def scores(self, query_tokens):
+        """
+        {position: score in [0, 1]}: BM25 divided by the score of an
+        average-length document containing every query term once, capped at 1.
+        """
+        terms = set(query_tokens)
+        ceiling = sum(self.idf.get(term, self.unseen_idf) for term in terms)
+        if not ceiling:
+            return {}
+        scores = {}
+        for term in terms:
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for position in self.postings[term]:
+                tf = self.term_freqs[position][term]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[position] / (self.avg_length or 1))
+                scores[position] = scores.get(position, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return {position: min(1.0, score / ceiling) for position, score in scores.items()}
+
+
+def lexical_match(new_issues, existing_issues):
+    """
+    Match each new issue to at most one existing issue by BM25 plus location
+    overlap. Honors "candidate_ids" like the Gemini matcher.
+    """
+    if not new_issues or not existing_issues:
+        return []
+
+    high, medium, location_weight = _thresholds()
+    index = BM25Index([(e.get('id'), _issue_tokens(e)) for e in existing_issues])
+
+    matches = []
+    for new in new_issues:
+        candidates = new.get('candidate_ids')
+        allowed = set(candidates) if candidates is not None else None
+        best_id, best_score = None, 0.0
+        for position, text_score in index.scores(_issue_tokens(new)).items():
+            existing = existing_issues[position]
+            if allowed is not None and existing.get('id') not in allowed:
+                continue
+            score = (1 - location_weight) * text_score + location_weight * _location_overlap(
+                new.get('location'), existing.get('location')
+            )
+            if score > best_score:
+                best_id, best_score = existing.get('id'), score
+        if best_id is not None and best_score >= medium:
+            matches.append({
+                'new_index': new.get('index'),
+                'existing_id': best_id,
+                'confidence': 'high' if best_score >= high else 'medium',
+            })
+    print(f"✅ Lexical matcher returned {len(matches)} matches")
+    return matches
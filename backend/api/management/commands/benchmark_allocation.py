@@ -0,0 +1,72 @@
+import json
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api.allocation import allocate_issues
+from api.department_utils import get_department_matcher
+from api.models import Department, Issue, Minutes, User
+
+
+def _draft(size, departments, parent_ids, edited=False):
+    """
+    A reviewed draft shaped like the DPO page sends it: two departments each,
+    some follow-ups. `edited` changes every description and deadline.
+    """
+    issues = []
+    for n in range(size):
+        names = [departments[n % len(departments)].dept_name, departments[(n * 7 + 3) % len(departments)].dept_name]
+        issues.append({
+            'issue_no': str(n + 1),
+            'issue': f"Benchmark issue {n + 1}",
+            'issue_description': f"{'Edited description' if edited else 'Description'} of benchmark issue {n + 1}",
+            'location': 'Kottayam',
+            'priority': 'Medium',
+            'department': json.dumps(sorted(set(names))),
+            'departments': sorted(set(names)),
+            'deadline': '15-01-2031' if edited else '31-12-2030',
+            'parent_issue_id': parent_ids[n % len(parent_ids)] if parent_ids and n % 3 == 0 else None,
+        })
+    return issues
+
+
+class Command(BaseCommand):
+    help = ("Count the queries allocate_issues runs per draft size, for a first allocation and an edited re-allocation. "
+            "Everything is rolled back afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50, 150])
+
+    def handle(self, *args, **options):
+        if Department.objects.count() < 2:
+            raise CommandError("Needs at least two departments in the master list.")
+        user = User.objects.filter(role__iexact='dpo').first() or User.objects.first()
+        if user is None:
+            raise CommandError("Needs a user to own the benchmark minutes.")
+
+        self.stdout.write(f"{'issues':>6} {'first':>14} {'edited re-allocation':>20}")
+        with transaction.atomic():
+            departments = list(Department.objects.order_by('id')[:20])
+            holder = Minutes.objects.create(title='benchmark parents', meeting_date=date.today(), uploaded_by=user, file_path='x')
+            root = Issue.objects.create(minutes=holder, issue_title='Benchmark root', location='', priority='Medium')
+            child = Issue.objects.create(minutes=holder, issue_title='Benchmark follow-up', location='', priority='Medium',
+                                         parent_issue=root)
+            for size in options['sizes']:
+                minute_obj = Minutes.objects.create(title=f'benchmark {size}', meeting_date=date.today(),
+                                                    uploaded_by=user, file_path='x')
+                results = []
+                for edited in (False, True):
+                    draft = _draft(size, departments, [root.pk, child.pk], edited=edited)
+                    resolution = get_department_matcher().resolution('benchmark')
+                    start = time.perf_counter()
+                    with CaptureQueriesContext(connection) as queries:
+                        allocate_issues(minute_obj, draft, user=user, resolution=resolution)
+                    results.append((len(queries), (time.perf_counter() - start) * 1000))
+                (first_q, first_ms), (again_q, again_ms) = results
+                self.stdout.write(
+                    f"{size:6d} {first_q:5d} q {first_ms:6.0f} ms {again_q:11d} q {again_ms:6.0f} ms"
+                )
+            transaction.set_rollback(True)
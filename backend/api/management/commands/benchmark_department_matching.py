@@ -0,0 +1,133 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.department_utils import _build_department_name_maps, _dept_key, _scan_containment, _scan_fuzzy
+from api.models import Department
+
+_OFFICES = [
+    'Executive Engineer', 'Assistant Executive Engineer', 'District Officer', 'Deputy Director',
+    'Superintendent', 'Secretary', 'Tahsildar', 'District Medical Officer', 'Project Officer',
+]
+_WORDS = [
+    'PWD', 'Roads', 'Buildings', 'Bridges', 'KWA', 'KSEB', 'Irrigation', 'Minor', 'Major', 'Health',
+    'Education', 'Agriculture', 'Fisheries', 'Revenue', 'Land', 'Survey', 'Forest', 'Tourism', 'Police',
+    'Excise', 'Panchayat', 'Municipality', 'Social', 'Justice', 'Welfare', 'Scheduled', 'Tribes',
+    'Animal', 'Husbandry', 'Dairy', 'Industries', 'Labour', 'Transport', 'Motor', 'Vehicles', 'Sports',
+    'Housing', 'Soil', 'Conservation', 'Ground', 'Water', 'Harbour', 'Engineering', 'Electrical', 'ANERT',
+]
+_PLACES = ['Kottayam', 'Pala', 'Vaikom', 'Changanassery', 'Ettumanoor', 'Kanjirappally', 'Meenachil']
+
+
+def _synthetic_departments(count, rng):
+    """Unsaved Department rows with unique names, shaped like the master list."""
+    seen, departments = set(), []
+    while len(departments) < count:
+        name = ' '.join(rng.sample(_WORDS, rng.randint(2, 4)))
+        if rng.random() < 0.6:
+            name += f" {rng.choice(_PLACES)}"
+        if rng.random() < 0.5:
+            name += f" Division {rng.randint(1, 999)}"
+        if _dept_key(name) in seen:
+            continue
+        seen.add(_dept_key(name))
+        departments.append(Department(dept_name=name, designation=rng.choice(_OFFICES) if rng.random() < 0.7 else ''))
+    return departments
+
+
+def _typo(key, rng):
+    chars = list(key)
+    for _ in range(rng.randint(1, 2)):
+        position = rng.randrange(len(chars))
+        action = rng.choice(['drop', 'swap', 'replace'])
+        if action == 'drop' and len(chars) > 4:
+            chars.pop(position)
+        elif action == 'swap' and position + 1 < len(chars):
+            chars[position], chars[position + 1] = chars[position + 1], chars[position]
+        else:
+            chars[position] = rng.choice(string.ascii_uppercase)
+    return ''.join(chars)
+
+
+def _queries(maps, count, rng):
+    """Normalized keys that reach the containment/fuzzy steps: fragments, padded keys, typos and unknown names."""
+    keys = maps['normalized_keys'] + list(maps['combined'])
+    queries = []
+    while len(queries) < count:
+        key = rng.choice(keys)
+        kind = rng.choice(['fragment', 'padded', 'typo', 'unknown'])
+        if kind == 'fragment' and len(key) > 6:
+            start = rng.randrange(len(key) - 5)
+            query = key[start:start + rng.randint(5, min(14, len(key) - start))]
+        elif kind == 'padded':
+            query = f"{rng.choice(_PLACES).upper()}{key}"
+        elif kind == 'typo':
+            query = _typo(key, rng)
+        else:
+            query = _dept_key(' '.join(rng.sample(_WORDS + _PLACES, 3)) + rng.choice(string.ascii_uppercase))
+        if query in maps['normalized'] or query in maps['combined'] or query in maps['designation']:
+            continue  # resolved by the dict lookups, never reaches the index
+        queries.append(query)
+    return queries
+
+
+def _resolve_linear(key, maps):
+    return _scan_containment(key, maps) or _scan_fuzzy(key, maps)
+
+
+def _resolve_indexed(key, maps):
+    index = maps['key_index']
+    return index.containment(key) or index.fuzzy(key)
+
+
+def _time(fn, queries, maps):
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        results.append(fn(query, maps))
+    return (time.perf_counter() - start) * 1000 / len(queries), results
+
+
+class Command(BaseCommand):
+    help = "Compare the trigram department key index with the linear containment/difflib scan (speed and results)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=11)
+        parser.add_argument('--from-db', action='store_true',
+                            help='Use the real Department table (size from the database) instead of synthetic lists.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        if options['from_db']:
+            lists = [list(Department.objects.all())]
+        else:
+            lists = [_synthetic_departments(size, rng) for size in options['sizes']]
+
+        for departments in lists:
+            start = time.perf_counter()
+            maps = _build_department_name_maps(departments)
+            build_ms = (time.perf_counter() - start) * 1000
+            queries = _queries(maps, options['queries'], rng)
+
+            linear_ms, golden = _time(_resolve_linear, queries, maps)
+            indexed_ms, results = _time(_resolve_indexed, queries, maps)
+            # Same names again: fuzzy answers (misses included) now come from the exact-key dict
+            repeat_ms, _results = _time(_resolve_indexed, queries, maps)
+            same = sum(1 for expected, got in zip(golden, results) if expected is got)
+            resolved = sum(1 for expected in golden if expected is not None)
+            self.stdout.write(
+                f"{len(departments):6d} departments: maps+index built in {build_ms:.0f} ms | "
+                f"linear {linear_ms:8.2f} ms/query | indexed {indexed_ms:6.2f} ms/query "
+                f"({linear_ms / indexed_ms if indexed_ms else 0:.0f}x) | repeated {repeat_ms:6.2f} ms/query | "
+                f"same result {same}/{len(queries)} ({resolved} resolved by the linear scan)"
+            )
+            for query, expected, got in zip(queries, golden, results):
+                if expected is not got:
+                    self.stdout.write(
+                        f"    differs: {query!r} linear={getattr(expected, 'dept_name', None)!r} "
+                        f"indexed={getattr(got, 'dept_name', None)!r}"
+                    )
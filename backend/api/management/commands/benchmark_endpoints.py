@@ -0,0 +1,116 @@
+import json
+import os
+import statistics
+import time
+import uuid
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from api.jobs import run_job
+from api.models import Department, ExtractionCacheEntry, ProcessingJob, User
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark upload_minutes (including the job pipeline), match_issues and allocate_all end to end. "
+        "Run with GEMINI_BACKEND=replay or GEMINI_BASE_URL pointing at run_gemini_stub for offline runs. "
+        "Everything is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='Minutes file (PDF/DOCX) to upload on every iteration.')
+        parser.add_argument('--iterations', type=int, default=3)
+        parser.add_argument('--warm', action='store_true', help='Keep extraction cache entries between iterations.')
+        parser.add_argument('--with-storage', action='store_true', help='Really upload to Supabase (off by default).')
+
+    def handle(self, *args, **options):
+        path = options['file']
+        if not os.path.exists(path):
+            raise CommandError(f"File not found: {path}")
+        with open(path, 'rb') as f:
+            file_bytes = f.read()
+
+        timings = {'upload_minutes': [], 'match_issues': [], 'allocate_all': []}
+        storage = mock.patch('api.jobs.upload_to_supabase', return_value=None)
+        if not options['with_storage']:
+            storage.start()
+
+        try:
+            with transaction.atomic():
+                self._run(path, file_bytes, options, timings)
+                transaction.set_rollback(True)
+        finally:
+            if not options['with_storage']:
+                storage.stop()
+
+        self.stdout.write(f"{'endpoint':16} {'n':>3} {'mean':>8} {'p50':>8} {'p95':>8}  (seconds)")
+        for name, values in timings.items():
+            if not values:
+                continue
+            self.stdout.write(
+                f"{name:16} {len(values):>3} {statistics.mean(values):>8.3f} "
+                f"{_percentile(values, 50):>8.3f} {_percentile(values, 95):>8.3f}"
+            )
+
+    def _run(self, path, file_bytes, options, timings):
+        user = User.objects.create_user(username=f"bench_{uuid.uuid4().hex[:8]}", password=uuid.uuid4().hex, role='dpo')
+        client = APIClient()
+        client.force_authenticate(user)
+        fallback_dept = Department.objects.order_by('id').values_list('dept_name', flat=True).first()
+
+        for i in range(options['iterations']):
+            if not options['warm']:
+                ExtractionCacheEntry.objects.all().delete()
+
+            started = time.perf_counter()
+            upload = SimpleUploadedFile(os.path.basename(path), file_bytes)
+            res = client.post('/upload-minutes', {'file': upload, 'meeting_date': '01-01-2025'}, format='multipart')
+            if res.status_code != 202:
+                raise CommandError(f"upload-minutes failed: {res.status_code} {res.data}")
+            job = ProcessingJob.objects.get(id=res.data['job_id'])
+            job.status = 'running'
+            job.save(update_fields=['status'])
+            run_job(job)
+            job.refresh_from_db()
+            timings['upload_minutes'].append(time.perf_counter() - started)
+            issues = job.clean_data or []
+
+            existing = client.get('/existing-issues').data
+            started = time.perf_counter()
+            client.post('/match-issues', {
+                'new_issues': [
+                    {'index': idx, 'issue': it.get('issue', ''), 'issue_description': it.get('issue_description', ''), 'location': it.get('location', '')}
+                    for idx, it in enumerate(issues)
+                ],
+                'existing_issues': [
+                    {'id': e['id'], 'issue': e['issue'], 'issue_description': e['issue_description'], 'minutes_title': e['minutes_title'], 'location': e['location']}
+                    for e in existing
+                ],
+            }, format='json')
+            timings['match_issues'].append(time.perf_counter() - started)
+
+            # Stand in for the DPO mapping unknown departments on the allocation page
+            if fallback_dept:
+                for it in issues:
+                    it['departments'] = [{'designation': '', 'department': fallback_dept}]
+                    # The page sends its selection as this JSON string, which allocation reads first
+                    it['department'] = json.dumps([fallback_dept])
+
+            started = time.perf_counter()
+            res = client.post('/assign-issues/allocate-all', {'issues': issues, 'minutes_id': job.minutes_id}, format='json')
+            timings['allocate_all'].append(time.perf_counter() - started)
+            self.stdout.write(
+                f"iteration {i + 1}: {len(issues)} issues, {len(existing)} existing, allocate status {res.status_code}"
+            )
@@ -0,0 +1,93 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.json_stream import ArrayStreamParser, parse_json_array
+
+
+def _synthetic_output(count):
+    """A fenced model answer with `count` issue objects shaped like the extraction schema."""
+    issues = [
+        {
+            'issue_no': str(i + 1),
+            'departments': [{'designation': 'Executive Engineer', 'department': 'PWD (Roads) "Division"'}],
+            'issue': f'റോഡ് അറ്റകുറ്റപ്പണി {i + 1}',
+            'issue_description': 'പൊതുമരാമത്ത് വകുപ്പ് റോഡ് {അടിയന്തിരമായി} [നന്നാക്കണം] \\ ' * 8,
+            'location': 'കോട്ടയം',
+            'priority': 'High',
+            'deadline': '',
+        }
+        for i in range(count)
+    ]
+    return '```json\n' + json.dumps(issues, ensure_ascii=False, indent=2) + '\n```'
+
+
+def _best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _naive_full(text):
+    try:
+        return json.loads(text.replace("```json", "").replace("```", "").strip())
+    except json.JSONDecodeError:
+        return []
+
+
+def _naive_stream(chunks):
+    # Re-parse everything received so far after each chunk
+    buffer, items = '', []
+    for chunk in chunks:
+        buffer += chunk
+        items = _naive_full(buffer) or items
+    return items
+
+
+def _incremental_stream(chunks):
+    parser = ArrayStreamParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.finish().items
+
+
+class Command(BaseCommand):
+    help = "Benchmark api.json_stream against json.loads on large (and truncated) model outputs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--issues', type=int, nargs='+', default=[100, 1000, 5000])
+        parser.add_argument('--chunk-size', type=int, default=200, help='Characters per simulated stream chunk.')
+        parser.add_argument('--repeat', type=int, default=3, help='Best of N runs per measurement.')
+        parser.add_argument('--skip-naive-stream', action='store_true', help='Skip the quadratic re-parse baseline.')
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        size = options['chunk_size']
+
+        for count in options['issues']:
+            text = _synthetic_output(count)
+            chunks = [text[i:i + size] for i in range(0, len(text), size)]
+            # Cut the answer in the middle of the last object, as the output-token limit does
+            truncated = text[:text.rfind('"issue_description"')]
+            self.stdout.write(f"--- {count} issues, {len(text) / 1024:.0f} KiB, {len(chunks)} chunks ---")
+
+            t, result = _best_of(repeat, lambda: _naive_full(text))
+            self.stdout.write(f"  full text    json.loads       {t * 1000:9.1f} ms  {len(result)} items")
+            t, report = _best_of(repeat, lambda: parse_json_array(text))
+            self.stdout.write(f"  full text    parse_json_array {t * 1000:9.1f} ms  {len(report.items)} items")
+
+            t, result = _best_of(repeat, lambda: _naive_full(truncated))
+            self.stdout.write(f"  truncated    json.loads       {t * 1000:9.1f} ms  {len(result)} items")
+            t, report = _best_of(repeat, lambda: parse_json_array(truncated))
+            self.stdout.write(f"  truncated    parse_json_array {t * 1000:9.1f} ms  {len(report.items)} items ({report.summary()})")
+
+            if not options['skip_naive_stream']:
+                t, result = _best_of(1, lambda: _naive_stream(chunks))
+                self.stdout.write(f"  streamed     re-parse/chunk   {t * 1000:9.1f} ms  {len(result)} items")
+            t, items = _best_of(repeat, lambda: _incremental_stream(chunks))
+            self.stdout.write(f"  streamed     ArrayStreamParser{t * 1000:9.1f} ms  {len(items)} items")
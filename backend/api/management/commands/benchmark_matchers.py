@@ -0,0 +1,105 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from api.issue_matching import MATCH_ENGINES, match_new_issues
+from api.models import Issue
+
+
+def _reworded(text, rng):
+    """Drop about a third of the words and inflect a few, as a later meeting would restate an issue."""
+    words = [w for w in text.split() if rng.random() > 0.35] or text.split()[:1]
+    return ' '.join(w + rng.choice(['ിൽ', 'ിന്റെ', 'ും']) if rng.random() < 0.15 else w for w in words)
+
+
+def _sample_from_db(size, seed):
+    """
+    Labelled sample from the Issue table: `size` existing issues, half of
+    them restated as new issues (labelled), plus as many unrelated new
+    issues taken from outside the existing set (no match expected).
+    """
+    rng = random.Random(seed)
+    issues = list(Issue.objects.only('id', 'issue_title', 'issue_description', 'location').order_by('id'))
+    if len(issues) < size + size // 2:
+        raise CommandError(f"Need at least {size + size // 2} issues in the database, found {len(issues)}.")
+    rng.shuffle(issues)
+    existing, outside = issues[:size], issues[size:size + size // 2]
+
+    existing_issues = [
+        {'id': i.id, 'issue': i.issue_title, 'issue_description': i.issue_description, 'location': i.location}
+        for i in existing
+    ]
+    new_issues, labels = [], []
+    for issue in existing[:size // 2]:
+        index = len(new_issues)
+        new_issues.append({
+            'index': index,
+            'issue': _reworded(issue.issue_title, rng),
+            'issue_description': _reworded(issue.issue_description, rng),
+            'location': issue.location,
+        })
+        labels.append({'new_index': index, 'existing_id': issue.id})
+    for issue in outside:
+        new_issues.append({
+            'index': len(new_issues),
+            'issue': issue.issue_title,
+            'issue_description': issue.issue_description,
+            'location': issue.location,
+        })
+    return {'new_issues': new_issues, 'existing_issues': existing_issues, 'labels': labels}
+
+
+def _score(matches, labels):
+    expected = {(l['new_index'], l['existing_id']) for l in labels}
+    found = {(m['new_index'], m['existing_id']) for m in matches}
+    correct = len(found & expected)
+    precision = correct / len(found) if found else 0.0
+    recall = correct / len(expected) if expected else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
+
+
+class Command(BaseCommand):
+    help = "Measure precision/recall and latency of the issue matching engines on a labelled sample."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sample', help='JSON file with new_issues, existing_issues and labels '
+                                             '([{new_index, existing_id}, ...]). Default: built from the Issue table.')
+        parser.add_argument('--size', type=int, default=200, help='Existing issues in a sample built from the database.')
+        parser.add_argument('--seed', type=int, default=7)
+        parser.add_argument('--engines', nargs='+', default=['lexical'], choices=[e for e in MATCH_ENGINES])
+        parser.add_argument('--sweep', action='store_true',
+                            help='Also report the lexical engine at a range of LEXICAL_MATCH_MEDIUM thresholds.')
+
+    def handle(self, *args, **options):
+        if options['sample']:
+            with open(options['sample'], encoding='utf-8') as f:
+                sample = json.load(f)
+        else:
+            sample = _sample_from_db(options['size'], options['seed'])
+        new_issues, existing_issues, labels = sample['new_issues'], sample['existing_issues'], sample['labels']
+        self.stdout.write(
+            f"Sample: {len(new_issues)} new, {len(existing_issues)} existing, {len(labels)} labelled match(es)"
+        )
+
+        for engine in options['engines']:
+            start = time.perf_counter()
+            matches = match_new_issues(new_issues, existing_issues, engine=engine)
+            elapsed = time.perf_counter() - start
+            precision, recall, f1 = _score(matches, labels)
+            high = sum(1 for m in matches if m.get('confidence') == 'high')
+            self.stdout.write(
+                f"  {engine:8s} P {precision:.2f}  R {recall:.2f}  F1 {f1:.2f}  "
+                f"{len(matches)} match(es) ({high} high)  {elapsed * 1000:.0f} ms"
+            )
+
+        if options['sweep']:
+            self.stdout.write("  lexical threshold sweep (LEXICAL_MATCH_MEDIUM):")
+            for threshold in (0.2, 0.25, 0.3, 0.35, 0.4, 0.45, 0.5, 0.6):
+                with override_settings(LEXICAL_MATCH_MEDIUM=threshold):
+                    matches = match_new_issues(new_issues, existing_issues, engine='lexical')
+                precision, recall, f1 = _score(matches, labels)
+                self.stdout.write(f"    {threshold:.2f}  P {precision:.2f}  R {recall:.2f}  F1 {f1:.2f}")
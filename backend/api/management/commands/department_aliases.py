@@ -0,0 +1,40 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.department_utils import export_department_aliases, import_department_aliases
+
+CSV_FIELDS = ['alias', 'department', 'designation', 'source', 'use_count']
+
+
+class Command(BaseCommand):
+    help = "Export or bulk-import learned department aliases (CSV or JSON, chosen by file extension)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['export', 'import'])
+        parser.add_argument('path', help='.csv or .json file. Import needs the columns alias and department (exact dept_name).')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not path.lower().endswith(('.csv', '.json')):
+            raise CommandError("path must end in .csv or .json")
+
+        if options['action'] == 'export':
+            rows = export_department_aliases()
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                if path.lower().endswith('.json'):
+                    json.dump(rows, f, ensure_ascii=False, indent=2)
+                else:
+                    writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+                    writer.writeheader()
+                    writer.writerows(rows)
+            self.stdout.write(self.style.SUCCESS(f"Exported {len(rows)} alias(es) to {path}"))
+            return
+
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            rows = json.load(f) if path.lower().endswith('.json') else list(csv.DictReader(f))
+        imported, errors = import_department_aliases(rows)
+        for error in errors:
+            self.stdout.write(self.style.WARNING(error))
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported} alias(es), {len(errors)} row(s) skipped"))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q, Sum
+
+from api.extraction_cache import purge_expired
+from api.models import ExtractionCacheEntry
+
+
+class Command(BaseCommand):
+    help = "Inspect or purge the Gemini extraction result cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['stats', 'list', 'purge'])
+        parser.add_argument('--all', action='store_true', help='With purge: delete every entry, not only expired ones.')
+        parser.add_argument('--key', help='With purge: delete a single entry by cache key or file SHA-256.')
+
+    def handle(self, *args, **options):
+        action = options['action']
+
+        if action == 'stats':
+            entries = ExtractionCacheEntry.objects.all()
+            self.stdout.write(f"Entries: {entries.count()}")
+            self.stdout.write(f"Total hits: {entries.aggregate(total=Sum('hit_count'))['total'] or 0}")
+            return
+
+        if action == 'list':
+            for entry in ExtractionCacheEntry.objects.order_by('-last_accessed_at'):
+                self.stdout.write(
+                    f"{entry.cache_key[:12]}  v{entry.prompt_version}  hits={entry.hit_count}  "
+                    f"issues={len(entry.result or [])}  last={entry.last_accessed_at:%Y-%m-%d %H:%M}  "
+                    f"{entry.original_filename}"
+                )
+            return
+
+        if options['key'] and options['all']:
+            raise CommandError("Use either --key or --all, not both.")
+
+        if options['key']:
+            key = options['key']
+            if len(key) < 8:
+                raise CommandError("--key needs at least 8 characters.")
+            deleted, _ = ExtractionCacheEntry.objects.filter(
+                Q(cache_key__startswith=key) | Q(file_sha256=key)
+            ).delete()
+        elif options['all']:
+            deleted, _ = ExtractionCacheEntry.objects.all().delete()
+        else:
+            deleted = purge_expired()
+
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} cache entr{'y' if deleted == 1 else 'ies'}."))
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bulk_ingest import default_worker_count, ingest_zip
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = "Bulk-ingest a ZIP of PDF/DOCX minutes using a process pool and write a per-file manifest."
+
+    def add_arguments(self, parser):
+        parser.add_argument('zip_path')
+        parser.add_argument('--user', required=True, help='Username recorded as uploader (normally the DPO).')
+        parser.add_argument('--workers', type=int, default=0, help='Process pool size (default: BULK_INGEST_MAX_WORKERS or min(4, CPUs)).')
+        parser.add_argument('--meeting-date', help='DD-MM-YYYY date for files whose name has no date.')
+        parser.add_argument('--manifest', help='Where to write the JSON manifest (default: next to the ZIP).')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' not found")
+
+        default_meeting_date = None
+        if options['meeting_date']:
+            try:
+                default_meeting_date = datetime.strptime(options['meeting_date'], '%d-%m-%Y').date()
+            except ValueError:
+                raise CommandError("--meeting-date must be DD-MM-YYYY")
+
+        manifest = ingest_zip(
+            options['zip_path'],
+            user,
+            default_meeting_date=default_meeting_date,
+            max_workers=options['workers'] or default_worker_count(),
+            manifest_path=options['manifest'],
+        )
+
+        for entry in manifest:
+            line = f"{entry['status']:7}  {entry['filename']}  minutes_id={entry['minutes_id']}  issues={entry['issue_count']}"
+            if entry['error']:
+                line += f"  error={entry['error']}"
+            self.stdout.write(line)
@@ -0,0 +1,90 @@
+import json
+import re
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from api.department_utils import _build_department_name_maps, _department_label, _resolve_department
+from api.models import Department, ExtractionCacheEntry
+
+# Steps answered by a dict lookup; the rest scan the key index
+O1_STEPS = ('exact', 'combined', 'name', 'designation', 'phonetic')
+STEPS = O1_STEPS + ('containment', 'fuzzy', None)
+
+
+def _legacy_key(value):
+    """_dept_key before department_keys: upper-case and strip non-word characters."""
+    return re.sub(r'[^\w]+', '', (value or '').strip().upper())
+
+
+def _department_inputs(issues):
+    for item in issues:
+        if not isinstance(item, dict):
+            continue
+        values = item.get('departments')
+        if not isinstance(values, list):
+            values = [d.strip() for d in str(item.get('department') or '').split(',') if d.strip()]
+        for value in values:
+            if value:
+                yield value
+
+
+def _label(step):
+    return step or 'unresolved'
+
+
+class Command(BaseCommand):
+    help = ("Compare how extracted stakeholder strings resolve with the legacy department keys and the "
+            "Unicode/transliteration-aware keys (exact-hit rate per matching step).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help='JSON list of extracted issues instead of the extraction cache.')
+        parser.add_argument('--show', type=int, default=20, help='Inputs to list that moved to an O(1) step.')
+
+    def handle(self, *args, **options):
+        if options['file']:
+            with open(options['file'], encoding='utf-8') as f:
+                issues = json.load(f)
+            source = options['file']
+        else:
+            issues = [item for entry in ExtractionCacheEntry.objects.only('result') for item in (entry.result or [])]
+            source = 'extraction cache'
+
+        inputs = Counter(
+            json.dumps(value, ensure_ascii=False, sort_keys=True) if isinstance(value, dict) else str(value)
+            for value in _department_inputs(issues)
+        )
+        self.stdout.write(f"{sum(inputs.values())} department string(s), {len(inputs)} distinct, from {source}")
+        if not inputs:
+            return
+
+        departments = list(Department.objects.all())
+        # Aliases are left out of both runs so the difference is the normalization alone
+        legacy_maps = _build_department_name_maps(departments, key=_legacy_key)
+        maps = _build_department_name_maps(departments)
+
+        legacy_steps, steps, moved = Counter(), Counter(), []
+        for text, count in inputs.items():
+            value = json.loads(text) if text.startswith('{') else text
+            legacy_dept, legacy_step = _resolve_department(value, legacy_maps)
+            dept, step = _resolve_department(value, maps)
+            legacy_steps[legacy_step] += count
+            steps[step] += count
+            if step in O1_STEPS and legacy_step not in O1_STEPS:
+                moved.append((count, _department_label(value), _label(legacy_step), step, dept.dept_name,
+                              getattr(legacy_dept, 'dept_name', None)))
+
+        total = sum(inputs.values())
+        self.stdout.write(f"  {'step':12s} {'legacy':>8s} {'new':>8s}")
+        for step in STEPS:
+            self.stdout.write(f"  {_label(step):12s} {legacy_steps[step]:8d} {steps[step]:8d}")
+        legacy_o1 = sum(legacy_steps[s] for s in O1_STEPS)
+        new_o1 = sum(steps[s] for s in O1_STEPS)
+        self.stdout.write(
+            f"  O(1) hit rate: {legacy_o1 / total:.1%} -> {new_o1 / total:.1%} "
+            f"({new_o1 - legacy_o1:+d} string(s)), unresolved {legacy_steps[None]} -> {steps[None]}"
+        )
+
+        for count, label, before, step, dept_name, before_name in sorted(moved, reverse=True)[:options['show']]:
+            changed = '' if before_name == dept_name else f" (was {before_name!r})"
+            self.stdout.write(f"    {count:4d}x {label!r}: {before} -> {step} {dept_name!r}{changed}")
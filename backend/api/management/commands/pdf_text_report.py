@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from api.gemini_utils import assess_pdf_text, read_pdf_pages
+
+
+class Command(BaseCommand):
+    help = (
+        "Show the PDF text-layer quality checks for minutes files and whether each one "
+        "would be sent to Gemini as text or uploaded through the Files API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='PDF minutes files.')
+
+    def handle(self, *args, **options):
+        as_text = 0
+        for path in options['paths']:
+            pages = read_pdf_pages(path)
+            if pages is None:
+                self.stdout.write(self.style.WARNING(f"{path}: unreadable"))
+                continue
+
+            stats = assess_pdf_text(pages)
+            as_text += stats['ok']
+            verdict = 'text' if stats['ok'] else f"upload ({stats['reason']})"
+            self.stdout.write(
+                f"{path}: {verdict} - {stats['pages']} page(s), {stats['chars_per_page']} chars/page, "
+                f"coverage {stats['page_coverage']}, Malayalam {stats['malayalam_ratio']}, "
+                f"orphan signs {stats['orphan_sign_ratio']}"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"{as_text}/{len(options['paths'])} file(s) would be sent as text"))
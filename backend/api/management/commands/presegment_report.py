@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from api.gemini_utils import extract_document_text, presegment_action_items
+
+
+class Command(BaseCommand):
+    help = "Report how much text the local (നടപടി pre-segmenter removes from minutes files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='DOCX or PDF minutes files.')
+
+    def handle(self, *args, **options):
+        totals = {'original_chars': 0, 'kept_chars': 0, 'removed_tokens_est': 0}
+
+        for path in options['paths']:
+            text = extract_document_text(path)
+            if not text:
+                self.stdout.write(self.style.WARNING(f"{path}: no text layer, skipped"))
+                continue
+
+            _, stats = presegment_action_items(text)
+            for key in totals:
+                totals[key] += stats[key]
+            self.stdout.write(
+                f"{path}: {stats['original_chars']} -> {stats['kept_chars']} chars, "
+                f"{stats['segments']} segment(s), ~{stats['removed_tokens_est']} tokens removed"
+            )
+
+        if totals['original_chars']:
+            removed = totals['original_chars'] - totals['kept_chars']
+            self.stdout.write(self.style.SUCCESS(
+                f"Total: removed {removed} of {totals['original_chars']} chars "
+                f"({100 * removed / totals['original_chars']:.1f}%), ~{totals['removed_tokens_est']} tokens"
+            ))
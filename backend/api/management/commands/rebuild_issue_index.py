@@ -0,0 +1,42 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.issue_index_store import get_issue_index, rebuild_index
+from api.issue_index import issue_fields, issue_text
+from api.models import Issue
+
+
+class Command(BaseCommand):
+    help = "Rebuild the persistent issue similarity index (vocabulary and every entry) from the Issue table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--benchmark', type=int, default=0, metavar='N',
+                            help='Afterwards, time N top-k lookups using random existing issues as queries.')
+        parser.add_argument('--top-k', type=int, default=5)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} issue(s) in {time.perf_counter() - started:.1f}s"))
+
+        if options['benchmark'] and count:
+            index = get_issue_index()
+            ids = list(Issue.objects.values_list('id', flat=True))
+            queries = [
+                issue_text(issue_fields(issue))
+                for issue in Issue.objects.filter(id__in=random.sample(ids, min(options['benchmark'], len(ids))))
+            ]
+            timings = []
+            for text in queries:
+                start = time.perf_counter()
+                index.search(text, top_k=options['top_k'])
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f"{len(timings)} lookup(s): mean {statistics.mean(timings):.1f} ms, "
+                f"p50 {timings[len(timings) // 2]:.1f} ms, p95 {timings[int(len(timings) * 0.95) - 1 if len(timings) > 1 else 0]:.1f} ms"
+            )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from api.department_keys import KEY_VERSION
+from api.department_utils import recompute_department_keys
+
+
+class Command(BaseCommand):
+    help = "Recompute the lookup keys stored on Department and DepartmentAlias after department_keys changes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Recompute even if the stored keys are already at KEY_VERSION.')
+
+    def handle(self, *args, **options):
+        result = recompute_department_keys(force=options['force'])
+        if result is None:
+            self.stdout.write(f"Department keys are already at version {KEY_VERSION}.")
+            return
+        departments, aliases = result
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed keys at version {KEY_VERSION}: {departments} department(s), {aliases} alias(es) changed"
+        ))
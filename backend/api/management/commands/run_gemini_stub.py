@@ -0,0 +1,127 @@
+import json
+import math
+import os
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from api.model_backends import STREAM_CHUNK_CHARS, fixture_key, synthetic_response_text
+
+GENERATE_PATH_RE = re.compile(r'^/[^/]+/models/([^/:]+):(generateContent|streamGenerateContent)$')
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local HTTP stand-in for Gemini generateContent/streamGenerateContent with a log-normal latency "
+        "distribution. Point the app at it with GEMINI_BASE_URL=http://127.0.0.1:<port>."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--median-ms', type=float, default=1500, help='Median simulated model latency.')
+        parser.add_argument('--sigma', type=float, default=0.5, help='Log-normal shape; 0 gives a constant latency.')
+        parser.add_argument('--fixtures', help='Directory of recorded fixtures to answer from before falling back to synthetic output.')
+        parser.add_argument('--seed', type=int, help='Seed the latency generator for repeatable runs.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        mu = math.log(max(options['median_ms'], 1) / 1000)
+        sigma = options['sigma']
+        fixtures_dir = options['fixtures']
+        stdout = self.stdout
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _send(self, status, payload):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_stream(self, payload, text, delay):
+                """SSE answer in STREAM_CHUNK_CHARS pieces; the latency is spread across them."""
+                chunks = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)] or ['']
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+                for i, chunk in enumerate(chunks):
+                    time.sleep(delay / len(chunks))
+                    event = dict(payload, candidates=[{
+                        'content': {'role': 'model', 'parts': [{'text': chunk}]},
+                        'index': 0,
+                        **({'finishReason': 'STOP'} if i == len(chunks) - 1 else {}),
+                    }])
+                    if i < len(chunks) - 1:
+                        event.pop('usageMetadata', None)
+                    self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\r\n\r\n".encode('utf-8'))
+                    self.wfile.flush()
+
+            def do_POST(self):
+                path = self.path.split('?', 1)[0]
+                match = GENERATE_PATH_RE.match(path)
+                length = int(self.headers.get('Content-Length') or 0)
+                request = json.loads(self.rfile.read(length) or b'{}')
+                if not match:
+                    self._send(404, {'error': {'code': 404, 'message': f'Stub does not implement {path}'}})
+                    return
+
+                texts = [
+                    part['text']
+                    for content in request.get('contents', [])
+                    for part in content.get('parts', [])
+                    if 'text' in part
+                ]
+                text = None
+                if fixtures_dir:
+                    fixture_path = os.path.join(fixtures_dir, f"{fixture_key(texts)}.json")
+                    if os.path.exists(fixture_path):
+                        with open(fixture_path, encoding='utf-8') as f:
+                            text = json.load(f)['text']
+                if text is None:
+                    text = synthetic_response_text(texts)
+
+                delay = rng.lognormvariate(mu, sigma) if sigma > 0 else math.exp(mu)
+                prompt_chars = sum(len(t) for t in texts)
+                payload = {
+                    'candidates': [{
+                        'content': {'role': 'model', 'parts': [{'text': text}]},
+                        'finishReason': 'STOP',
+                        'index': 0,
+                    }],
+                    'usageMetadata': {
+                        'promptTokenCount': prompt_chars // 3 + 1,
+                        'candidatesTokenCount': len(text) // 3 + 1,
+                        'totalTokenCount': (prompt_chars + len(text)) // 3 + 2,
+                    },
+                    'modelVersion': match.group(1),
+                }
+                if match.group(2) == 'streamGenerateContent':
+                    self._send_stream(payload, text, delay)
+                    return
+
+                time.sleep(delay)
+                self._send(200, payload)
+
+            def log_message(self, fmt, *log_args):
+                stdout.write(f"stub: {fmt % log_args}")
+
+        server = ThreadingHTTPServer((options['host'], options['port']), Handler)
+        self.stdout.write(
+            f"Gemini stub listening on http://{options['host']}:{options['port']} "
+            f"(median {options['median_ms']:.0f} ms, sigma {sigma})"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
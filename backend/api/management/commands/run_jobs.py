@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.department_utils import recompute_department_keys
+from api.issue_index_store import ensure_index_built
+from api.jobs import claim_next_job, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Worker loop: run queued background jobs (minutes extraction, normalization and storage)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit instead of polling.')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait when the queue is empty.')
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s).")
+        # Stored department keys must match the running department_keys code
+        recompute_department_keys()
+        # Issues that predate the similarity index are indexed here rather than in a request
+        indexed = ensure_index_built()
+        if indexed is not None:
+            self.stdout.write(f"Indexed {indexed} existing issue(s).")
+
+        self.stdout.write("Job worker started.")
+        try:
+            while True:
+                close_old_connections()
+                job = claim_next_job()
+                if job is not None:
+                    run_job(job)
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Job worker stopped.")
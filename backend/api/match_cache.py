@@ -0,0 +1,97 @@
+"""
+match_cache.py - Persistent cache of Gemini match verdicts per issue pair.
+
+DPOs often press "match" several times while editing a draft, re-sending
+the same pairs. Every match the model makes is stored as a verdict with its
+confidence, keyed by the new issue's text, the existing issue's id and a
+hash of its current content, and the matching prompt version. New issues
+with a cached match are not sent to the model again.
+
+"Not matched" is not cached: the model picks at most one existing issue per
+new issue, so an unchosen pair only lost to the other candidates it was
+shown with and may match when those change.
+
+Editing an existing issue changes its content hash, so old verdicts stop
+matching; the Issue post_save signal also deletes them.
+"""
+import hashlib
+import json
+
+from django.db.models import F
+
+from .gemini_utils import MATCH_PROMPT_VERSION
+from .issue_index import issue_fields
+from .models import Issue, MatchVerdict
+
+
+def content_hash(item):
+    """Hash of the fields the matcher reads, in the API's issue shape."""
+    fields = [str(item.get(key) or '').strip() for key in ('issue', 'issue_description', 'location')]
+    return hashlib.sha256(json.dumps(fields, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def existing_hashes(existing_ids):
+    """{issue_id: content_hash} from the database; ids that no longer exist are left out."""
+    issues = Issue.objects.filter(id__in=existing_ids).only('id', 'issue_title', 'issue_description', 'location')
+    return {issue.id: content_hash(issue_fields(issue)) for issue in issues}
+
+
+def verdict_key(new_hash, existing_id, existing_hash):
+    return hashlib.sha256(
+        f"{new_hash}:{existing_id}:{existing_hash}:{MATCH_PROMPT_VERSION}".encode('utf-8')
+    ).hexdigest()
+
+
+def lookup_verdicts(keys):
+    """{cache_key: (matched, confidence)} for the keys that have a positive verdict."""
+    if not keys:
+        return {}
+    rows = list(
+        MatchVerdict.objects.filter(cache_key__in=keys, matched=True).values_list('id', 'cache_key', 'matched', 'confidence')
+    )
+    if rows:
+        MatchVerdict.objects.filter(id__in=[row[0] for row in rows]).update(hit_count=F('hit_count') + 1)
+    return {key: (matched, confidence) for _id, key, matched, confidence in rows}
+
+
+def store_verdicts(verdicts):
+    """`verdicts`: iterable of (cache_key, existing_id, existing_hash, matched, confidence)."""
+    rows = [
+        MatchVerdict(
+            cache_key=key,
+            existing_issue_id=existing_id,
+            existing_hash=existing_hash,
+            matched=matched,
+            confidence=confidence or '',
+        )
+        for key, existing_id, existing_hash, matched, confidence in verdicts
+    ]
+    # Two concurrent presses may judge the same pair; the first verdict stays
+    MatchVerdict.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+def invalidate_issue(issue):
+    """Drop verdicts recorded against older content of `issue`. Returns the number deleted."""
+    deleted, _ = (
+        MatchVerdict.objects.filter(existing_issue_id=issue.pk)
+        .exclude(existing_hash=content_hash(issue_fields(issue)))
+        .delete()
+    )
+    return deleted
+
+
+def invalidate_issues(issues):
+    """invalidate_issue for many issues in two queries. Returns the number deleted."""
+    current = {issue.pk: content_hash(issue_fields(issue)) for issue in issues if issue.pk}
+    if not current:
+        return 0
+    stale = [
+        verdict_id
+        for verdict_id, issue_id, existing_hash in MatchVerdict.objects.filter(existing_issue_id__in=list(current))
+        .values_list('id', 'existing_issue_id', 'existing_hash')
+        if existing_hash != current[issue_id]
+    ]
+    if not stale:
+        return 0
+    deleted, _ = MatchVerdict.objects.filter(id__in=stale).delete()
+    return deleted
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_processingjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractionCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cache_key', models.CharField(max_length=64, unique=True)),
+                ('file_sha256', models.CharField(db_index=True, max_length=64)),
+                ('prompt_version', models.CharField(max_length=20)),
+                ('original_filename', models.CharField(blank=True, default='', max_length=255)),
+                ('result', models.JSONField(default=list)),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_accessed_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_processingjob_timings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processingjob',
+            name='manifest',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AlterField(
+            model_name='processingjob',
+            name='job_type',
+            field=models.CharField(choices=[('minutes_upload', 'Minutes Upload'), ('bulk_ingest', 'Bulk Minutes Ingest')], default='minutes_upload', max_length=30),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_processingjob_bulk_ingest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModelCallMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('call_type', models.CharField(choices=[('generate_content', 'Generate Content'), ('files_upload', 'Files Upload'), ('extraction_cache', 'Extraction Cache')], max_length=30)),
+                ('model_name', models.CharField(blank=True, default='', max_length=100)),
+                ('endpoint', models.CharField(blank=True, db_index=True, default='', max_length=100)),
+                ('outcome', models.CharField(choices=[('success', 'Success'), ('error', 'Error'), ('cache_hit', 'Cache Hit')], default='success', max_length=20)),
+                ('latency_ms', models.PositiveIntegerField(default=0)),
+                ('prompt_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('response_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_modelcallmetric'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IssueIndexEntry',
+            fields=[
+                ('issue', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='index_entry', serialize=False, to='api.issue')),
+                ('terms', models.JSONField(default=list)),
+                ('text_hash', models.CharField(max_length=64)),
+                ('is_open', models.BooleanField(db_index=True, default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='IssueIndexVocabulary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('doc_count', models.PositiveIntegerField(default=0)),
+                ('doc_freq', models.JSONField(default=dict)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_issue_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchVerdict',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cache_key', models.CharField(max_length=64, unique=True)),
+                ('existing_hash', models.CharField(max_length=64)),
+                ('matched', models.BooleanField(default=False)),
+                ('confidence', models.CharField(blank=True, default='', max_length=10)),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('existing_issue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_verdicts', to='api.issue')),
+            ],
+        ),
+    ]
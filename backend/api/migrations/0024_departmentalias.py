@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_cacheversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartmentAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=255)),
+                ('alias_key', models.CharField(max_length=255, unique=True)),
+                ('source', models.CharField(choices=[('dpo', 'DPO Mapping'), ('import', 'Import')], default='dpo', max_length=20)),
+                ('use_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='department_aliases', to=settings.AUTH_USER_MODEL)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='api.department')),
+            ],
+        ),
+    ]
@@ -0,0 +1,200 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:12
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Frozen copy of api.department_keys at KEY_VERSION 1. Replaying this migration
+# must produce the keys it stored originally, whatever that module does later;
+# newer key versions are applied by `manage.py recompute_department_keys`.
+KEY_VERSION = 1
+
+_ZERO_WIDTH_RE = re.compile('[\u200b-\u200d\u2060\ufeff]')
+# Letters, digits and Malayalam signs; \w alone drops vowel signs and virama (category M)
+_KEY_DROP_RE = re.compile(r'[^\w\u0d00-\u0d7f]+|_')
+
+VIRAMA = '\u0d4d'
+
+# Atomic chillu -> base consonant + virama (the pre-Unicode 5.1 spelling minus its ZWJ)
+_CHILLU = {
+    '\u0d7a': '\u0d23' + VIRAMA,  # ൺ
+    '\u0d7b': '\u0d28' + VIRAMA,  # ൻ
+    '\u0d7c': '\u0d30' + VIRAMA,  # ർ
+    '\u0d7d': '\u0d32' + VIRAMA,  # ൽ
+    '\u0d7e': '\u0d33' + VIRAMA,  # ൾ
+    '\u0d7f': '\u0d15' + VIRAMA,  # ൿ
+    '\u0d54': '\u0d2e' + VIRAMA,  # ൔ
+    '\u0d55': '\u0d2f' + VIRAMA,  # ൕ
+    '\u0d56': '\u0d34' + VIRAMA,  # ൖ
+    '\u0d4e': '\u0d30' + VIRAMA,  # dot reph
+}
+_CHILLU_TABLE = str.maketrans(_CHILLU)
+
+
+def canonical_text(value):
+    """NFKC, zero-width characters removed, chillus folded. Case and spacing untouched."""
+    text = unicodedata.normalize('NFKC', value or '')
+    text = _ZERO_WIDTH_RE.sub('', text).translate(_CHILLU_TABLE)
+    # The old two-part AU sign (ൌ) and the modern length mark (ൗ) are read alike
+    return text.replace('\u0d4c', '\u0d57')
+
+
+def canonical_key(value):
+    return _KEY_DROP_RE.sub('', canonical_text(value).strip().upper())
+
+
+_VOWELS = {
+    'അ': 'a', 'ആ': 'aa', 'ഇ': 'i', 'ഈ': 'ii', 'ഉ': 'u', 'ഊ': 'uu', 'ഋ': 'ru',
+    'എ': 'e', 'ഏ': 'ee', 'ഐ': 'ai', 'ഒ': 'o', 'ഓ': 'oo', 'ഔ': 'au',
+}
+_SIGNS = {
+    'ാ': 'aa', 'ി': 'i', 'ീ': 'ii', 'ു': 'u', 'ൂ': 'uu', 'ൃ': 'ru', 'െ': 'e',
+    'േ': 'ee', 'ൈ': 'ai', 'ൊ': 'o', 'ോ': 'oo', 'ൗ': 'au',
+}
+_CONSONANTS = {
+    'ക': 'k', 'ഖ': 'kh', 'ഗ': 'g', 'ഘ': 'gh', 'ങ': 'ng', 'ച': 'ch', 'ഛ': 'chh',
+    'ജ': 'j', 'ഝ': 'jh', 'ഞ': 'nj', 'ട': 't', 'ഠ': 'th', 'ഡ': 'd', 'ഢ': 'dh',
+    'ണ': 'n', 'ത': 'th', 'ഥ': 'th', 'ദ': 'd', 'ധ': 'dh', 'ന': 'n', 'പ': 'p',
+    'ഫ': 'ph', 'ബ': 'b', 'ഭ': 'bh', 'മ': 'm', 'യ': 'y', 'ര': 'r', 'ല': 'l',
+    'വ': 'v', 'ശ': 'sh', 'ഷ': 'sh', 'സ': 's', 'ഹ': 'h', 'ള': 'l', 'ഴ': 'zh', 'റ': 'r',
+}
+_OTHER = {'ം': 'm', 'ഃ': 'h'}
+# Clusters English spellings write by sound: റ്റ is "tt", ന്റ is "nt"
+_CLUSTERS = (
+    ('റ' + VIRAMA + 'റ', 'ട' + VIRAMA + 'ട'),
+    ('ന' + VIRAMA + 'റ', 'ന' + VIRAMA + 'ട'),
+)
+
+
+def transliterate(value):
+    """Rough Latin spelling of Malayalam text (lower case); other characters pass through."""
+    text = canonical_text(value)
+    for cluster, spoken in _CLUSTERS:
+        text = text.replace(cluster, spoken)
+    out = []
+    for position, char in enumerate(text):
+        if char in _CONSONANTS:
+            out.append(_CONSONANTS[char])
+            following = text[position + 1] if position + 1 < len(text) else ''
+            if following not in _SIGNS and following != VIRAMA:
+                out.append('a')
+        elif char in _SIGNS:
+            out.append(_SIGNS[char])
+        elif char in _VOWELS:
+            out.append(_VOWELS[char])
+        elif char in _OTHER:
+            out.append(_OTHER[char])
+        elif char == VIRAMA:
+            continue
+        else:
+            out.append(char)
+    return ''.join(out).lower()
+
+
+# Applied in order on lower-case Latin, before and after doubled letters collapse
+_FOLDS = (
+    ('tion', 'shan'), ('ture', 'char'), ('chh', 'j'), ('ch', 'j'), ('ngi', 'nji'), ('nge', 'nje'),
+    ('sh', 's'), ('zh', 'l'), ('ph', 'f'), ('th', 't'), ('dh', 'd'), ('kh', 'k'), ('gh', 'g'),
+    ('bh', 'b'), ('jh', 'j'), ('ck', 'k'), ('q', 'k'), ('x', 'ks'), ('w', 'v'), ('z', 's'),
+)
+_LATE_FOLDS = (('nj', 'n'), ('ng', 'n'))
+_SOFT_C_RE = re.compile(r'c(?=[eiy])')
+_SOFT_G_RE = re.compile(r'g(?=e$)')
+# Glide y that Malayalam writes after i/e (എഞ്ചിനീയർ) or as a conjunct (എഡ്യൂക്കേഷൻ)
+_GLIDE_RE = re.compile(r'(?<=[ie])y(?=[aeiou])|(?<=[^aeiouy])y')
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def _skeleton(word):
+    for spelling, sound in _FOLDS:
+        word = word.replace(spelling, sound)
+    word = _SOFT_C_RE.sub('s', word).replace('c', 'k')
+    word = _SOFT_G_RE.sub('j', word)
+    word = re.sub(r'(.)\1+', r'\1', word)
+    for spelling, sound in _LATE_FOLDS:
+        word = word.replace(spelling, sound)
+    word = _GLIDE_RE.sub('', word)
+    if not word:
+        return ''
+    head, tail = word[0], word[1:]
+    if head in 'aeiou':
+        head = 'a'
+    # Word-final y is a vowel (Authority / അതോറിറ്റി)
+    tail = re.sub(r'[aeiouh]', '', tail.rstrip('y') if len(tail) > 1 else tail)
+    return head + tail
+
+
+def phonetic_key(value):
+    """Upper-case consonant skeleton of the transliterated string; '' when nothing remains."""
+    words = _WORD_RE.findall(unicodedata.normalize('NFKD', transliterate(value)).encode('ascii', 'ignore').decode())
+    return ''.join(_skeleton(word) for word in words).upper()
+
+
+def department_keys(dept_name, designation=''):
+    """The keys stored on Department: {'name_key', 'combined_key', 'phonetic_key'}."""
+    name = (dept_name or '').strip()
+    desig = (designation or '').strip()
+    return {
+        'name_key': canonical_key(name),
+        'combined_key': canonical_key(f"{desig}{name}") if desig else '',
+        'phonetic_key': phonetic_key(name),
+    }
+
+
+
+def fill_department_keys(apps, schema_editor):
+    Department = apps.get_model('api', 'Department')
+    departments = list(Department.objects.all())
+    for dept in departments:
+        for field, value in department_keys(dept.dept_name, dept.designation).items():
+            setattr(dept, field, value)
+    Department.objects.bulk_update(departments, ['name_key', 'combined_key', 'phonetic_key'], batch_size=500)
+
+    # Alias keys were built with the old upper-case/strip key; re-key them, keeping the first on a clash
+    DepartmentAlias = apps.get_model('api', 'DepartmentAlias')
+    seen, changed = set(), []
+    for alias in DepartmentAlias.objects.order_by('id'):
+        key = canonical_key(alias.alias)
+        if not key or key in seen:
+            alias.delete()
+            continue
+        seen.add(key)
+        if key != alias.alias_key:
+            changed.append((alias, key))
+    # Two passes so a new key never collides with an old key not yet rewritten
+    for alias, _key in changed:
+        alias.alias_key = f"~{alias.pk}"
+        alias.save(update_fields=['alias_key'])
+    for alias, key in changed:
+        alias.alias_key = key
+        alias.save(update_fields=['alias_key'])
+
+    CacheVersion = apps.get_model('api', 'CacheVersion')
+    CacheVersion.objects.update_or_create(key='department_keys', defaults={'version': KEY_VERSION})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_departmentalias'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='combined_key',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='department',
+            name='name_key',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='department',
+            name='phonetic_key',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=255),
+        ),
+        migrations.RunPython(fill_department_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def drop_negative_verdicts(apps, schema_editor):
+    # Only positive verdicts are cached now; a stored "not matched" row would
+    # also block a later positive verdict for the same pair (ignore_conflicts)
+    MatchVerdict = apps.get_model('api', 'MatchVerdict')
+    MatchVerdict.objects.filter(matched=False).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_department_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_negative_verdicts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,239 @@
+"""
+model_backends.py - Stand-ins for the Gemini client used in offline runs and benchmarks.
+
+`get_client()` in gemini_utils returns one of these instead of a live
+genai.Client when GEMINI_BACKEND is 'replay' or 'record':
+
+- ReplayClient serves responses recorded as JSON fixtures, keyed by a hash
+  of the request contents. Without a matching fixture it answers with a
+  synthetic response derived from the (നടപടി markers in the input, unless
+  GEMINI_REPLAY_STRICT is set.
+- RecordingClient wraps a live client and writes every response (and its
+  latency) to the fixtures directory so it can be replayed later.
+
+Both only implement the surface gemini_utils uses: models.generate_content,
+models.generate_content_stream, files.upload and files.get.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from types import SimpleNamespace
+
+_ZW = '[\u200c\u200d]*'
+_MARKER_RE = re.compile(r'\(\s*' + _ZW.join('നടപടി') + r'\s*[:\-–]?\s*([^)]*)\)?')
+
+
+# Size of the pieces a replayed answer is split into for streaming calls
+STREAM_CHUNK_CHARS = 200
+
+
+class ReplayMissError(LookupError):
+    pass
+
+
+def _content_parts(contents, file_hashes):
+    if not isinstance(contents, (list, tuple)):
+        contents = [contents]
+    parts = []
+    for item in contents:
+        if isinstance(item, str):
+            parts.append(item)
+        elif getattr(item, 'text', None):
+            parts.append(item.text)
+        elif getattr(item, 'name', None):
+            parts.append('file:' + file_hashes.get(item.name, item.name))
+        else:
+            parts.append(repr(item))
+    return parts
+
+
+def fixture_key(contents, file_hashes=None):
+    """Stable key for a request: SHA-256 over its text parts and uploaded file hashes."""
+    digest = hashlib.sha256()
+    for part in _content_parts(contents, file_hashes or {}):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+def synthetic_response_text(contents):
+    """
+    Deterministic stand-in answer: an empty match list for matching prompts,
+    otherwise one extracted issue per (നടപടി marker in the text parts.
+    """
+    text = '\n'.join(p for p in _content_parts(contents, {}) if not p.startswith('file:'))
+    if 'NEW ISSUES:' in text and 'EXISTING ISSUES:' in text:
+        return '[]'
+
+    issues = []
+    lines = [line for line in text.split('\n') if line.strip()]
+    body = []
+    for line in lines:
+        match = _MARKER_RE.search(line)
+        if not match:
+            body.append(line.strip())
+            continue
+        description = ' '.join(body[-5:]) or line.strip()
+        issues.append({
+            'issue_no': str(len(issues) + 1),
+            'departments': [{'designation': '', 'department': match.group(1).strip(' ,')}],
+            'issue': description[:120],
+            'issue_description': description,
+            'location': '',
+            'priority': 'Medium',
+            'deadline': '',
+        })
+        body = []
+    return json.dumps(issues, ensure_ascii=False)
+
+
+def _response(text, usage=None):
+    return SimpleNamespace(text=text, usage_metadata=SimpleNamespace(**usage) if usage else None)
+
+
+class _ReplayFiles:
+    def __init__(self, client):
+        self._client = client
+
+    def upload(self, file, config=None):
+        if hasattr(file, 'read'):
+            data = file.read()
+        else:
+            with open(file, 'rb') as f:
+                data = f.read()
+        sha = hashlib.sha256(data).hexdigest()
+        name = f"files/replay-{sha[:16]}"
+        self._client.file_hashes[name] = sha
+        return SimpleNamespace(name=name, state=SimpleNamespace(name='ACTIVE'))
+
+    def get(self, name):
+        return SimpleNamespace(name=name, state=SimpleNamespace(name='ACTIVE'))
+
+
+class _ReplayModels:
+    def __init__(self, client):
+        self._client = client
+
+    def generate_content(self, model, contents, config=None):
+        fixture = self._client.load(contents)
+        if fixture is None:
+            return _response(synthetic_response_text(contents))
+        if self._client.simulate_latency and fixture.get('latency_ms'):
+            time.sleep(fixture['latency_ms'] / 1000)
+        return _response(fixture['text'], fixture.get('usage'))
+
+    def generate_content_stream(self, model, contents, config=None):
+        """Replay the answer in STREAM_CHUNK_CHARS pieces, spreading any recorded latency across them."""
+        fixture = self._client.load(contents)
+        text = fixture['text'] if fixture else synthetic_response_text(contents)
+        chunks = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)] or ['']
+        delay = 0.0
+        if fixture and self._client.simulate_latency and fixture.get('latency_ms'):
+            delay = fixture['latency_ms'] / 1000 / len(chunks)
+        for i, chunk in enumerate(chunks):
+            if delay:
+                time.sleep(delay)
+            last = i == len(chunks) - 1
+            yield _response(chunk, fixture.get('usage') if fixture and last else None)
+
+
+class ReplayClient:
+    def __init__(self, fixtures_dir, strict=False, simulate_latency=False):
+        self.fixtures_dir = fixtures_dir
+        self.strict = strict
+        self.simulate_latency = simulate_latency
+        self.file_hashes = {}
+        self.models = _ReplayModels(self)
+        self.files = _ReplayFiles(self)
+
+    def load(self, contents):
+        key = fixture_key(contents, self.file_hashes)
+        path = os.path.join(self.fixtures_dir, f"{key}.json")
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        if self.strict:
+            raise ReplayMissError(f"No Gemini fixture {key}.json in {self.fixtures_dir}")
+        return None
+
+    def close(self):
+        pass
+
+
+class _RecordingFiles:
+    def __init__(self, client):
+        self._client = client
+
+    def upload(self, file, config=None):
+        if not hasattr(file, 'read'):
+            with open(file, 'rb') as f:
+                sha = hashlib.sha256(f.read()).hexdigest()
+        else:
+            position = file.tell()
+            sha = hashlib.sha256(file.read()).hexdigest()
+            file.seek(position)
+        uploaded = self._client.live.files.upload(file=file, config=config)
+        self._client.file_hashes[uploaded.name] = sha
+        return uploaded
+
+    def get(self, name):
+        return self._client.live.files.get(name=name)
+
+
+class _RecordingModels:
+    def __init__(self, client):
+        self._client = client
+
+    def generate_content(self, model, contents, config=None):
+        started = time.perf_counter()
+        response = self._client.live.models.generate_content(model=model, contents=contents, config=config)
+        latency_ms = int((time.perf_counter() - started) * 1000)
+        usage = getattr(response, 'usage_metadata', None)
+        self._client.save(contents, {
+            'model': model,
+            'text': response.text,
+            'latency_ms': latency_ms,
+            'usage': {
+                'prompt_token_count': getattr(usage, 'prompt_token_count', None),
+                'candidates_token_count': getattr(usage, 'candidates_token_count', None),
+            } if usage else None,
+        })
+        return response
+
+    def generate_content_stream(self, model, contents, config=None):
+        """Pass chunks through as they arrive; the joined text is saved once the stream ends."""
+        started = time.perf_counter()
+        parts, usage = [], None
+        for chunk in self._client.live.models.generate_content_stream(model=model, contents=contents, config=config):
+            parts.append(chunk.text or '')
+            usage = getattr(chunk, 'usage_metadata', None) or usage
+            yield chunk
+        self._client.save(contents, {
+            'model': model,
+            'text': ''.join(parts),
+            'latency_ms': int((time.perf_counter() - started) * 1000),
+            'usage': {
+                'prompt_token_count': getattr(usage, 'prompt_token_count', None),
+                'candidates_token_count': getattr(usage, 'candidates_token_count', None),
+            } if usage else None,
+        })
+
+
+class RecordingClient:
+    def __init__(self, live_client, fixtures_dir):
+        self.live = live_client
+        self.fixtures_dir = fixtures_dir
+        self.file_hashes = {}
+        self.models = _RecordingModels(self)
+        self.files = _RecordingFiles(self)
+
+    def save(self, contents, payload):
+        os.makedirs(self.fixtures_dir, exist_ok=True)
+        key = fixture_key(contents, self.file_hashes)
+        with open(os.path.join(self.fixtures_dir, f"{key}.json"), 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+
+    def close(self):
+        self.live.close()
@@ -0,0 +1,220 @@
+"""
+model_metrics.py - Per-call instrumentation for Gemini.
+
+`get_client()` wraps whatever client it builds in InstrumentedClient, which
+writes one ModelCallMetric row per generate_content(_stream) / files.upload call
+(wall time, token counts from usage_metadata, model, outcome and the
+calling endpoint). Extraction cache hits are recorded too, so the summary
+shows how many model calls the cache saved.
+
+The calling endpoint comes from a context variable set with
+`metrics_endpoint(...)`. Thread pools do not inherit it on their own, so
+work submitted to a pool should go through `contextvars.copy_context().run`.
+
+Inside a `metrics_endpoint` block rows are only collected in memory (pool
+threads append to the block's list through the copied context) and are
+written in one bulk insert when the outermost block exits, on the thread
+that opened it. Pool threads and worker processes therefore never open a
+database connection for metrics. Worker processes collect their rows with
+`collect_metrics()` and hand them back to the parent for `merge_metrics()`.
+"""
+import contextvars
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+_endpoint = contextvars.ContextVar('model_metrics_endpoint', default='')
+_pending = contextvars.ContextVar('model_metrics_pending', default=None)
+
+
+@contextmanager
+def collect_metrics():
+    """Collect the rows recorded inside this block into the yielded list instead of writing them."""
+    rows = []
+    token = _pending.set(rows)
+    try:
+        yield rows
+    finally:
+        _pending.reset(token)
+
+
+@contextmanager
+def metrics_endpoint(name):
+    """
+    Attribute model calls made inside this block to `name`. The outermost
+    block writes the collected rows when it exits.
+    """
+    token = _endpoint.set(name)
+    try:
+        if _pending.get() is not None:
+            yield
+        else:
+            with collect_metrics() as rows:
+                try:
+                    yield
+                finally:
+                    _write_rows(rows)
+    finally:
+        _endpoint.reset(token)
+
+
+def current_endpoint():
+    return _endpoint.get()
+
+
+def _write_rows(rows):
+    """Bulk-insert collected rows. Never raises: metrics must not break extraction."""
+    if not rows:
+        return
+    from .models import ModelCallMetric
+    try:
+        ModelCallMetric.objects.bulk_create([ModelCallMetric(**row) for row in rows])
+    except Exception as e:
+        print(f"⚠️ Could not record {len(rows)} model call metric(s): {e}")
+
+
+def merge_metrics(rows):
+    """Add rows collected elsewhere (a worker process) to the current block, or write them now."""
+    pending = _pending.get()
+    if pending is not None:
+        pending.extend(rows or [])
+    else:
+        _write_rows(rows)
+
+
+def record_call(call_type, model_name='', outcome='success', latency_ms=0, usage=None, error=''):
+    """
+    Record one ModelCallMetric row: collected if inside a metrics block,
+    otherwise written right away.
+    """
+    if not getattr(settings, 'MODEL_METRICS_ENABLED', True):
+        return
+    merge_metrics([{
+        'call_type': call_type,
+        'model_name': (model_name or '')[:100],
+        'endpoint': current_endpoint()[:100],
+        'outcome': outcome,
+        'latency_ms': max(0, int(latency_ms)),
+        'prompt_tokens': getattr(usage, 'prompt_token_count', None),
+        'response_tokens': getattr(usage, 'candidates_token_count', None),
+        'error': (error or '')[:2000],
+    }])
+
+
+class _InstrumentedModels:
+    def __init__(self, inner):
+        self._inner = inner
+
+    def generate_content(self, model, contents, config=None):
+        started = time.perf_counter()
+        try:
+            response = self._inner.generate_content(model=model, contents=contents, config=config)
+        except Exception as e:
+            record_call('generate_content', model, 'error', (time.perf_counter() - started) * 1000, error=str(e))
+            raise
+        record_call(
+            'generate_content', model, 'success', (time.perf_counter() - started) * 1000,
+            usage=getattr(response, 'usage_metadata', None),
+        )
+        return response
+
+    def generate_content_stream(self, model, contents, config=None):
+        """Recorded once the stream is exhausted; latency covers the whole stream."""
+        started = time.perf_counter()
+        usage = None
+        try:
+            for chunk in self._inner.generate_content_stream(model=model, contents=contents, config=config):
+                usage = getattr(chunk, 'usage_metadata', None) or usage
+                yield chunk
+        except Exception as e:
+            record_call('generate_content', model, 'error', (time.perf_counter() - started) * 1000, error=str(e))
+            raise
+        record_call('generate_content', model, 'success', (time.perf_counter() - started) * 1000, usage=usage)
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+class _InstrumentedFiles:
+    def __init__(self, inner):
+        self._inner = inner
+
+    def upload(self, file, config=None):
+        started = time.perf_counter()
+        try:
+            uploaded = self._inner.upload(file=file, config=config)
+        except Exception as e:
+            record_call('files_upload', outcome='error', latency_ms=(time.perf_counter() - started) * 1000, error=str(e))
+            raise
+        record_call('files_upload', latency_ms=(time.perf_counter() - started) * 1000)
+        return uploaded
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+class InstrumentedClient:
+    """Thin wrapper around a genai.Client (or a replay/record stand-in)."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.models = _InstrumentedModels(inner.models)
+        self.files = _InstrumentedFiles(inner.files)
+
+    def close(self):
+        self.inner.close()
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return round(statistics.quantiles(values, n=100, method='inclusive')[pct - 1], 1)
+
+
+def summarize(days=7):
+    """Latency percentiles per call type/endpoint and daily token totals for the last `days` days."""
+    from .models import ModelCallMetric
+    since = timezone.now() - timedelta(days=days)
+    rows = ModelCallMetric.objects.filter(created_at__gte=since)
+
+    latency = []
+    groups = rows.values('call_type', 'endpoint').annotate(calls=Count('id')).order_by('call_type', 'endpoint')
+    for group in groups:
+        group_rows = rows.filter(call_type=group['call_type'], endpoint=group['endpoint'])
+        values = sorted(group_rows.exclude(outcome='cache_hit').values_list('latency_ms', flat=True))
+        latency.append({
+            'call_type': group['call_type'],
+            'endpoint': group['endpoint'],
+            'calls': group['calls'],
+            'errors': group_rows.filter(outcome='error').count(),
+            'cache_hits': group_rows.filter(outcome='cache_hit').count(),
+            'p50_ms': _percentile(values, 50),
+            'p95_ms': _percentile(values, 95),
+        })
+
+    daily_tokens = [
+        {
+            'date': row['day'].isoformat(),
+            'calls': row['calls'],
+            'prompt_tokens': row['prompt_tokens'] or 0,
+            'response_tokens': row['response_tokens'] or 0,
+        }
+        for row in rows.filter(call_type='generate_content')
+        .annotate(day=TruncDate('created_at'))
+        .values('day')
+        .annotate(calls=Count('id'), prompt_tokens=Sum('prompt_tokens'), response_tokens=Sum('response_tokens'))
+        .order_by('day')
+    ]
+
+    return {'days': days, 'latency': latency, 'daily_tokens': daily_tokens}
@@ -20,6 +20,10 @@ class Department(models.Model):
     designation = models.CharField(max_length=150, blank=True, default='')
     category = models.CharField(max_length=30, blank=True, default='')
     email = models.CharField(max_length=320, blank=True, default='')
+    # Lookup keys from department_keys, filled on save (see signals.fill_department_keys)
+    name_key = models.CharField(max_length=255, blank=True, default='', db_index=True)
+    combined_key = models.CharField(max_length=255, blank=True, default='')
+    phonetic_key = models.CharField(max_length=255, blank=True, default='', db_index=True)
 
     def __str__(self):
         return self.dept_name
@@ -89,3 +93,136 @@ class Notification(models.Model):
     message = models.TextField()
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+
+
+class ProcessingJob(models.Model):
+    TYPE_CHOICES = [
+        ('minutes_upload', 'Minutes Upload'),
+        ('bulk_ingest', 'Bulk Minutes Ingest'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    job_type = models.CharField(max_length=30, choices=TYPE_CHOICES, default='minutes_upload')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+    stage = models.CharField(max_length=50, blank=True, default='queued')
+    progress = models.PositiveSmallIntegerField(default=0)
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='processing_jobs'
+    )
+    file_path = models.CharField(max_length=500)
+    original_filename = models.CharField(max_length=255)
+    meeting_date = models.DateField()
+    minutes = models.ForeignKey(
+        Minutes,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs'
+    )
+    clean_data = models.JSONField(default=list, blank=True)
+    timings = models.JSONField(default=dict, blank=True)
+    manifest = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+
+class ExtractionCacheEntry(models.Model):
+    cache_key = models.CharField(max_length=64, unique=True)
+    file_sha256 = models.CharField(max_length=64, db_index=True)
+    prompt_version = models.CharField(max_length=20)
+    original_filename = models.CharField(max_length=255, blank=True, default='')
+    result = models.JSONField(default=list)
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+
+class ModelCallMetric(models.Model):
+    CALL_TYPE_CHOICES = [
+        ('generate_content', 'Generate Content'),
+        ('files_upload', 'Files Upload'),
+        ('extraction_cache', 'Extraction Cache'),
+    ]
+    OUTCOME_CHOICES = [
+        ('success', 'Success'),
+        ('error', 'Error'),
+        ('cache_hit', 'Cache Hit'),
+    ]
+
+    call_type = models.CharField(max_length=30, choices=CALL_TYPE_CHOICES)
+    model_name = models.CharField(max_length=100, blank=True, default='')
+    endpoint = models.CharField(max_length=100, blank=True, default='', db_index=True)
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES, default='success')
+    latency_ms = models.PositiveIntegerField(default=0)
+    prompt_tokens = models.PositiveIntegerField(null=True, blank=True)
+    response_tokens = models.PositiveIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+
+class IssueIndexEntry(models.Model):
+    """Pruned character n-gram vector of one issue for the persistent similarity index."""
+    issue = models.OneToOneField(Issue, on_delete=models.CASCADE, primary_key=True, related_name='index_entry')
+    # [[gram, weight], ...] normalized TF-IDF weights of the issue's most distinctive n-grams
+    terms = models.JSONField(default=list)
+    text_hash = models.CharField(max_length=64)
+    is_open = models.BooleanField(default=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+
+class IssueIndexVocabulary(models.Model):
+    """Document frequencies of every n-gram at the last full rebuild (single row)."""
+    doc_count = models.PositiveIntegerField(default=0)
+    doc_freq = models.JSONField(default=dict)
+    built_at = models.DateTimeField(auto_now=True)
+
+
+class MatchVerdict(models.Model):
+    """Cached Gemini verdict for one (new issue text, existing issue version) pair."""
+    # sha256 of new issue text hash, existing issue id, existing content hash and prompt version
+    cache_key = models.CharField(max_length=64, unique=True)
+    existing_issue = models.ForeignKey(Issue, on_delete=models.CASCADE, related_name='match_verdicts')
+    existing_hash = models.CharField(max_length=64)
+    matched = models.BooleanField(default=False)
+    confidence = models.CharField(max_length=10, blank=True, default='')
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+
+class CacheVersion(models.Model):
+    """Version stamp of a process-local cache; bumped on every change to its source rows."""
+    key = models.CharField(max_length=50, unique=True)
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class DepartmentAlias(models.Model):
+    """A stakeholder string (e.g. a Malayalam spelling) that always resolves to one Department."""
+    SOURCE_CHOICES = [
+        ('dpo', 'DPO Mapping'),
+        ('import', 'Import'),
+    ]
+
+    alias = models.CharField(max_length=255)
+    # _dept_key(alias): what _match_department looks up
+    alias_key = models.CharField(max_length=255, unique=True)
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='aliases')
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='dpo')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='department_aliases')
+    use_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.alias} -> {self.department.dept_name}"
+
@@ -0,0 +1,213 @@
+"""
+near_duplicates.py - Near-duplicate issues within one minutes upload.
+
+Gemini sometimes returns the same action item twice, e.g. once under each
+department paragraph, with slightly different wording. Comparing every pair
+of descriptions is quadratic, so each description gets a MinHash signature
+and signatures are bucketed band by band (LSH): only issues sharing a bucket
+are compared, and only pairs whose shingle sets really overlap by at least
+NEAR_DUPLICATE_THRESHOLD (Jaccard) are grouped.
+
+Depending on NEAR_DUPLICATE_MODE the duplicates are only marked for the DPO
+('flag', the default), merged into the first issue of their group ('merge',
+opt-in: a false-positive match drops a real action item), or left alone ('off').
+"""
+import json
+import operator
+import zlib
+from collections import defaultdict
+
+from django.conf import settings
+
+from .issue_index import normalize_text
+
+_EMPTY_BIN = 1 << 32
+# Added per bin of distance when an empty bin borrows a neighbour's value
+_ROTATION_STEP = 1 << 33
+# Candidates whose signature estimate is this far below the threshold are not
+# worth an exact comparison (the estimate's std. error is ~0.06 at 64 hashes)
+_ESTIMATE_SLACK = 0.15
+
+
+def _config():
+    return {
+        'mode': getattr(settings, 'NEAR_DUPLICATE_MODE', 'flag'),
+        'threshold': float(getattr(settings, 'NEAR_DUPLICATE_THRESHOLD', 0.7)),
+        'num_perm': int(getattr(settings, 'NEAR_DUPLICATE_NUM_PERM', 64)),
+        'bands': int(getattr(settings, 'NEAR_DUPLICATE_BANDS', 16)),
+        'shingle_size': int(getattr(settings, 'NEAR_DUPLICATE_SHINGLE_SIZE', 5)),
+    }
+
+
+def shingles(text, size=5):
+    """Set of hashed character shingles of the normalized text."""
+    text = normalize_text(text)
+    if len(text) <= size:
+        return {zlib.crc32(text.encode('utf-8'))} if text else set()
+    return {zlib.crc32(text[i:i + size].encode('utf-8')) for i in range(len(text) - size + 1)}
+
+
+def minhash(shingle_set, num_perm):
+    """
+    One-permutation MinHash: each shingle hash falls into one of `num_perm`
+    bins and each bin keeps its minimum, so a signature costs one pass over
+    the shingles instead of one pass per hash function. Empty bins borrow
+    from the next filled bin (rotation densification) so that short texts
+    still get comparable signatures. Equal positions estimate the Jaccard
+    similarity.
+    """
+    if not shingle_set:
+        return None
+    empty = _EMPTY_BIN
+    signature = [empty] * num_perm
+    for h in shingle_set:
+        # Multiplicative mixing; crc32's low bits alone would bin poorly
+        h = (h * 0x9E3779B1) & 0xFFFFFFFF
+        slot, value = h % num_perm, h // num_perm
+        if value < signature[slot]:
+            signature[slot] = value
+    if empty in signature:
+        binned = signature[:]
+        for i in range(num_perm):
+            if binned[i] == empty:
+                offset = 1
+                while binned[(i + offset) % num_perm] == empty:
+                    offset += 1
+                signature[i] = binned[(i + offset) % num_perm] + offset * _ROTATION_STEP
+    return tuple(signature)
+
+
+def _estimate(left, right):
+    return sum(map(operator.eq, left, right)) / len(left)
+
+
+def _jaccard(left, right):
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+def _issue_text(item):
+    # Short or missing descriptions fall back to the title so they are still compared
+    return str(item.get('issue_description') or '') or str(item.get('issue') or '')
+
+
+def find_near_duplicates(items, threshold=None, num_perm=None, bands=None, shingle_size=None):
+    """
+    Group near-duplicate issues. Returns a list of index lists, each sorted
+    and holding at least two positions in `items`.
+    """
+    config = _config()
+    threshold = config['threshold'] if threshold is None else threshold
+    num_perm = num_perm or config['num_perm']
+    bands = bands or config['bands']
+    shingle_size = shingle_size or config['shingle_size']
+    rows = max(1, num_perm // bands)
+
+    sets = [shingles(_issue_text(item), shingle_size) for item in items]
+    signatures = [minhash(shingle_set, rows * bands) for shingle_set in sets]
+
+    buckets = defaultdict(list)
+    for position, signature in enumerate(signatures):
+        if signature is None:
+            continue
+        for band in range(bands):
+            buckets[(band, signature[band * rows:(band + 1) * rows])].append(position)
+
+    parent = list(range(len(items)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    checked = set()
+    for members in buckets.values():
+        for i, left in enumerate(members):
+            for right in members[i + 1:]:
+                if (left, right) in checked:
+                    continue
+                checked.add((left, right))
+                if _estimate(signatures[left], signatures[right]) < threshold - _ESTIMATE_SLACK:
+                    continue
+                if _jaccard(sets[left], sets[right]) >= threshold:
+                    root_left, root_right = find(left), find(right)
+                    if root_left != root_right:
+                        parent[max(root_left, root_right)] = min(root_left, root_right)
+
+    groups = defaultdict(list)
+    for position in range(len(items)):
+        groups[find(position)].append(position)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def _union(*lists):
+    merged, seen = [], set()
+    for values in lists:
+        for value in values:
+            key = json.dumps(value, sort_keys=True, ensure_ascii=False)
+            if key not in seen:
+                seen.add(key)
+                merged.append(value)
+    return merged
+
+
+def _resolved_departments(item):
+    # Normalization lists the unresolved strings as `departments` only when nothing resolved
+    departments = item.get('departments') if isinstance(item.get('departments'), list) else []
+    unresolved = item.get('unresolved_departments') or []
+    return [] if unresolved and departments == unresolved else departments
+
+
+def _merge_departments(target, duplicate):
+    """
+    Add the duplicate's departments to the target. The `department` string
+    is rebuilt too: allocation and the DepartmentSelector read it before the
+    `departments` list.
+    """
+    if not isinstance(target.get('departments'), list) and not isinstance(duplicate.get('departments'), list):
+        return
+    resolved = _union(_resolved_departments(target), _resolved_departments(duplicate))
+    unresolved = _union(target.get('unresolved_departments') or [], duplicate.get('unresolved_departments') or [])
+    # Same rule as department normalization: resolved names, else the strings that did not resolve
+    departments = resolved or unresolved
+    target['departments'] = departments
+    target['department'] = json.dumps(departments)
+    if 'unresolved_departments' in target or 'unresolved_departments' in duplicate:
+        target['unresolved_departments'] = unresolved
+
+
+def resolve_near_duplicates(items, mode=None):
+    """
+    Apply NEAR_DUPLICATE_MODE to the issues of one upload and return the new list.
+
+    'merge': duplicates are dropped; their departments are added to the first
+    issue of the group, which lists their numbers in `merged_issue_nos`.
+    'flag': every issue is kept and duplicates get `near_duplicate_of` set to
+    the issue_no of the first issue of their group.
+    """
+    mode = mode or _config()['mode']
+    if mode == 'off' or len(items) < 2:
+        return items
+
+    groups = find_near_duplicates(items)
+    if not groups:
+        return items
+
+    items = [dict(item) for item in items]
+    dropped = set()
+    for members in groups:
+        keeper = items[members[0]]
+        for position in members[1:]:
+            duplicate = items[position]
+            if mode == 'flag':
+                duplicate['near_duplicate_of'] = keeper.get('issue_no')
+                continue
+            _merge_departments(keeper, duplicate)
+            keeper.setdefault('merged_issue_nos', []).append(duplicate.get('issue_no'))
+            dropped.add(position)
+
+    action = 'merged' if mode == 'merge' else 'flagged'
+    print(f"🧬 Near-duplicates: {sum(len(g) - 1 for g in groups)} issue(s) {action} in {len(groups)} group(s)")
+    return [item for position, item in enumerate(items) if position not in dropped]
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import IssueDepartment, Notification, Issue
+from .models import IssueDepartment, Notification, Issue, ProcessingJob
 
 class IssueDepartmentSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(read_only=True)
@@ -174,3 +174,30 @@ class NotificationSerializer(serializers.ModelSerializer):
         if "assigned" in msg or "action required" in msg: return "assign"
         if "deadline" in msg or "overdue" in msg: return "deadline"
         return "general"
+
+class ProcessingJobSerializer(serializers.ModelSerializer):
+    minutes_id = serializers.IntegerField(read_only=True)
+    clean_data = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProcessingJob
+        fields = [
+            'id',
+            'job_type',
+            'status',
+            'stage',
+            'progress',
+            'original_filename',
+            'minutes_id',
+            'clean_data',
+            'timings',
+            'manifest',
+            'error',
+            'created_at',
+            'started_at',
+            'finished_at',
+        ]
+
+    def get_clean_data(self, obj):
+        # Only expose the extracted issues once the pipeline has finished
+        return obj.clean_data if obj.status == 'completed' else None
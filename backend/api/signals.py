@@ -1,8 +1,12 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from rest_framework.authtoken.models import Token
 
-from .models import User
+from .department_keys import department_keys
+from .department_utils import bump_departments_version
+from .models import Department, DepartmentAlias, Issue, User
+from .issue_index_store import bump_index_version, get_issue_index, index_issue
+from .match_cache import invalidate_issue
 
 
 @receiver(pre_save, sender=User)
@@ -24,3 +28,40 @@ def mark_password_change(sender, instance, **kwargs):
 def revoke_tokens_on_user_change(sender, instance, **kwargs):
     if not instance.is_active or getattr(instance, '_password_changed', False):
         Token.objects.filter(user=instance).delete()
+
+
+@receiver(post_save, sender=Issue)
+def update_issue_index(sender, instance, **kwargs):
+    # The similarity index is an optimization; never fail the save because of it
+    try:
+        index_issue(instance)
+    except Exception as e:
+        print(f"⚠️ Issue index update failed for issue {instance.pk}: {e}")
+
+
+@receiver(post_save, sender=Issue)
+def invalidate_match_verdicts(sender, instance, created, **kwargs):
+    # A new issue has no verdicts yet; an edited one must not reuse verdicts on its old text
+    if not created:
+        invalidate_issue(instance)
+
+
+@receiver(post_delete, sender=Issue)
+def drop_from_issue_index(sender, instance, **kwargs):
+    # The entry row cascades away, so other processes only learn of it through the stamp
+    get_issue_index().forget(instance.pk)
+    bump_index_version()
+
+
+@receiver(pre_save, sender=Department)
+def fill_department_keys(sender, instance, **kwargs):
+    for field, value in department_keys(instance.dept_name, instance.designation).items():
+        setattr(instance, field, value)
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=DepartmentAlias)
+@receiver(post_delete, sender=DepartmentAlias)
+def invalidate_department_matcher(sender, instance, **kwargs):
+    bump_departments_version()
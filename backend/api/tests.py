@@ -0,0 +1,768 @@
+import contextvars
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import bulk_ingest, gemini_utils, jobs, views
+from .extraction_cache import compute_cache_key
+from . import issue_matching
+from .allocation import allocate_issues
+from .department_keys import KEY_VERSION, canonical_key, department_keys, phonetic_key
+from .department_utils import (
+    DepartmentKeyIndex, _build_department_name_maps, _scan_containment, _scan_fuzzy, departments_version,
+    get_department_matcher, learn_department_aliases, recompute_department_keys,
+)
+from .issue_index_store import PersistentIssueIndex, ensure_index_built
+from .json_stream import ArrayStreamParser, parse_json_array
+from .lexical_matcher import BM25Index, lexical_match, tokenize
+from .model_metrics import collect_metrics, merge_metrics, metrics_endpoint, record_call
+from .models import (
+    CacheVersion, Department, DepartmentAlias, Issue, IssueDepartment, IssueIndexEntry, IssueIndexVocabulary, MatchVerdict, Minutes,
+    ModelCallMetric, ProcessingJob, User,
+)
+from .management.commands.benchmark_allocation import _draft
+from .management.commands.benchmark_department_matching import _queries, _synthetic_departments
+from .near_duplicates import resolve_near_duplicates
+
+
+class _FakeModels:
+    """
+    Answers per section text. generate_content gets `answers[text]`;
+    generate_content_stream yields `streams[text]` chunk by chunk (callables
+    are called first). An Exception value is raised.
+    """
+
+    def __init__(self, answers, streams=None):
+        self.answers = answers
+        self.streams = streams or {}
+
+    def generate_content(self, model, contents, config):
+        answer = self.answers[contents[0].text]
+        if isinstance(answer, Exception):
+            raise answer
+        return SimpleNamespace(text=answer)
+
+    def generate_content_stream(self, model, contents, config):
+        for chunk in self.streams[contents[0].text]:
+            if callable(chunk):
+                chunk = chunk()
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield SimpleNamespace(text=chunk)
+
+
+def _fake_client(answers, streams=None):
+    return SimpleNamespace(models=_FakeModels(answers, streams))
+
+
+def _dpo():
+    return User.objects.filter(username='dpo').first() or User.objects.create_user(username='dpo', password='x', role='DPO')
+
+
+def _minutes(title='Minutes'):
+    return Minutes.objects.create(title=title, meeting_date=date(2025, 1, 1), uploaded_by=_dpo(), file_path='x')
+
+
+class ArrayStreamParserTests(SimpleTestCase):
+    ITEMS = [
+        {'issue_no': '1', 'issue': 'Road "repair" {urgent}', 'note': 'path C:\\minutes\\ [draft]'},
+        {'issue_no': '2', 'issue': 'കുടിവെള്ളം', 'departments': ['PWD', 'Water Authority'], 'count': 3},
+        {'issue_no': '3', 'issue': 'Close bracket ] and brace } in text', 'nested': {'a': [1, {'b': None}]}},
+    ]
+
+    def _feed(self, chunks):
+        parser = ArrayStreamParser()
+        streamed = []
+        for chunk in chunks:
+            streamed.extend(parser.feed(chunk))
+        report = parser.finish()
+        self.assertEqual(streamed, report.items)
+        return report
+
+    def test_fenced_answer(self):
+        report = parse_json_array('```json\n' + json.dumps(self.ITEMS, ensure_ascii=False, indent=2) + '\n```')
+        self.assertEqual(report.items, self.ITEMS)
+        self.assertTrue(report.lossless)
+
+    def test_any_chunk_boundaries_give_the_same_items(self):
+        text = 'Here are the issues:\n```json\n' + json.dumps(self.ITEMS, ensure_ascii=False) + '\n```'
+        rng = random.Random(7)
+        for size in (1, 2, 3, 5, 17):
+            with self.subTest(size=size):
+                report = self._feed(text[i:i + size] for i in range(0, len(text), size))
+                self.assertEqual(report.items, self.ITEMS)
+                self.assertTrue(report.lossless)
+        for _ in range(20):
+            cuts = sorted(rng.sample(range(1, len(text)), 8))
+            report = self._feed(text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)]))
+            self.assertEqual(report.items, self.ITEMS)
+
+    def test_truncated_last_element(self):
+        text = json.dumps(self.ITEMS, ensure_ascii=False)
+        cut = text[:text.rindex('{"issue_no": "3"') + 30]
+        for report in (parse_json_array(cut), self._feed([cut[:40], cut[40:]])):
+            self.assertEqual(report.items, self.ITEMS[:2])
+            self.assertTrue(report.truncated)
+            self.assertFalse(report.lossless)
+            self.assertTrue(report.trailing.startswith('{"issue_no": "3"'))
+
+    def test_malformed_elements_are_skipped(self):
+        report = parse_json_array('[{"issue_no": "1"}, {"issue_no": 2,}, {issue_no: 3}, {"issue_no": "4"}]')
+        self.assertEqual(report.items, [{'issue_no': '1'}, {'issue_no': '4'}])
+        self.assertEqual(report.skipped, 2)
+        self.assertTrue(report.complete)
+        self.assertFalse(report.lossless)
+
+    def test_stray_bracket_in_preamble_is_not_the_array(self):
+        text = 'As noted in [section 2] and [3], the issues are:\n[\n  {"issue_no": "1"}\n]'
+        self.assertEqual(parse_json_array(text).items, [{'issue_no': '1'}])
+        # The bracket and the brace can arrive in different chunks
+        report = self._feed(['Items [see 2]. [', '\n  ', '{"issue_no": "1"}]'])
+        self.assertEqual(report.items, [{'issue_no': '1'}])
+        self.assertTrue(report.complete)
+
+    def test_empty_array(self):
+        report = self._feed(['Nothing found: [', ' ]'])
+        self.assertEqual(report.items, [])
+        self.assertTrue(report.lossless)
+
+
+class ExtractionCacheKeyTests(SimpleTestCase):
+    def test_settings_that_change_the_extraction_change_the_key(self):
+        departments = ['Executive Engineer, PWD Roads']
+        key = compute_cache_key('abc', departments)
+        self.assertEqual(compute_cache_key('abc', list(reversed(departments))), key)
+        self.assertNotEqual(compute_cache_key('abc', departments, streaming=True), key)
+        for name, value in [
+            ('EXTRACTION_PROMPT_VERSION', 'next'),
+            ('GEMINI_PRESEGMENT', not gemini_utils.GEMINI_PRESEGMENT),
+            ('GEMINI_EXTRACTION_MODE', 'sectioned'),
+            ('PDF_TEXT_MIN_MALAYALAM_RATIO', 0.9),
+        ]:
+            with self.subTest(setting=name), mock.patch.object(gemini_utils, name, value):
+                self.assertNotEqual(compute_cache_key('abc', departments), key)
+
+
+class PresegmentTests(SimpleTestCase):
+    ATTENDANCE = 'ഹാജർ: ജില്ലാ കളക്ടർ, ജില്ലാ പോലീസ് മേധാവി, എക്സിക്യൂട്ടീവ് എഞ്ചിനീയർ'
+
+    def test_long_issue_keeps_its_heading(self):
+        body = ['പാല - ഏറ്റുമാനൂർ റോഡിലെ കുഴികൾ അടയ്ക്കുന്നതിന് നടപടി സ്വീകരിക്കണമെന്ന് ആവശ്യപ്പെട്ടു. ' * 3] * 40
+        text = '\n'.join([self.ATTENDANCE, '1. റോഡ് അറ്റകുറ്റപ്പണി', *body, '(നടപടി: പൊതുമരാമത്ത് വകുപ്പ്)', '12'])
+        self.assertGreater(sum(len(line) for line in body), 4000)
+
+        segmented, stats = gemini_utils.presegment_action_items(text)
+
+        self.assertTrue(segmented.startswith('1. റോഡ് അറ്റകുറ്റപ്പണി\n'))
+        self.assertTrue(segmented.endswith('(നടപടി: പൊതുമരാമത്ത് വകുപ്പ്)'))
+        self.assertNotIn(self.ATTENDANCE, segmented)
+        self.assertEqual((stats['action_items'], stats['segments']), (1, 1))
+        self.assertEqual(stats['kept_chars'], len(segmented))
+
+    def test_unnumbered_items_stop_at_the_previous_action_item(self):
+        text = '\n'.join([
+            '1. കുടിവെള്ള ക്ഷാമം', 'വാർഡ് 4-ൽ പൈപ്പ് പൊട്ടി.', '(നടപടി: ജല അതോറിറ്റി)',
+            'തെരുവുവിളക്കുകൾ കത്തുന്നില്ല.', '(നടപടി: കെ.എസ്.ഇ.ബി)',
+        ])
+        segmented, stats = gemini_utils.presegment_action_items(text)
+        self.assertEqual(segmented, text)
+        self.assertEqual(stats['action_items'], 2)
+
+    def test_text_without_markers_is_unchanged(self):
+        text = self.ATTENDANCE + '\n1. റോഡ് അറ്റകുറ്റപ്പണി'
+        segmented, stats = gemini_utils.presegment_action_items(text)
+        self.assertEqual(segmented, text)
+        self.assertEqual((stats['segments'], stats['removed_chars']), (0, 0))
+
+    def test_stats_are_returned_to_the_caller(self):
+        text = '\n'.join([self.ATTENDANCE, '1. റോഡ്', '(നടപടി: പൊതുമരാമത്ത്)'])
+        outcome = {}
+        with mock.patch.object(gemini_utils, 'extract_document_text', return_value=text), \
+                mock.patch.object(gemini_utils, 'GEMINI_PRESEGMENT', True), \
+                mock.patch.object(gemini_utils, 'analyze_text_inline', return_value=([], True)):
+            gemini_utils.analyze_document_with_gemini('minutes.docx', [], outcome)
+        self.assertEqual(outcome['presegment']['removed_chars'], len(self.ATTENDANCE) + 1)
+
+
+class ExtractionCompletenessTests(SimpleTestCase):
+    def _sectioned(self, answers):
+        client = _fake_client(answers)
+        with mock.patch.object(gemini_utils, 'get_client', return_value=client), \
+                mock.patch.object(gemini_utils, 'get_best_model', return_value='model'), \
+                mock.patch.object(gemini_utils, 'split_into_sections', return_value=list(answers)), \
+                mock.patch.object(gemini_utils, 'GEMINI_SECTION_RETRIES', 0):
+            return gemini_utils.analyze_text_sectioned('minutes', [])
+
+    def test_all_sections_succeed(self):
+        issues, complete = self._sectioned({
+            'one': json.dumps([{'issue_no': '1'}]),
+            'two': json.dumps([{'issue_no': '2'}]),
+        })
+        self.assertEqual([i['issue_no'] for i in issues], ['1', '2'])
+        self.assertTrue(complete)
+
+    def test_failed_section_marks_result_incomplete(self):
+        issues, complete = self._sectioned({
+            'one': json.dumps([{'issue_no': '1'}]),
+            'two': RuntimeError('503'),
+        })
+        self.assertEqual([i['issue_no'] for i in issues], ['1'])
+        self.assertFalse(complete)
+
+    def test_truncated_answer_marks_result_incomplete(self):
+        issues, complete = self._sectioned({'one': '[{"issue_no": "1"}, {"issue_no": "2", "iss'})
+        self.assertEqual([i['issue_no'] for i in issues], ['1'])
+        self.assertFalse(complete)
+
+
+class StreamingExtractionTests(SimpleTestCase):
+    def _stream(self, answers, streams):
+        client = _fake_client(answers, streams)
+        outcome = {}
+        with mock.patch.object(gemini_utils, 'get_client', return_value=client), \
+                mock.patch.object(gemini_utils, 'get_best_model', return_value='model'), \
+                mock.patch.object(gemini_utils, 'extract_document_text', return_value='minutes'), \
+                mock.patch.object(gemini_utils, 'GEMINI_PRESEGMENT', False), \
+                mock.patch.object(gemini_utils, '_use_sectioned_mode', return_value=True), \
+                mock.patch.object(gemini_utils, 'split_into_sections', return_value=list(streams)), \
+                mock.patch.object(gemini_utils, 'GEMINI_MAX_CONCURRENCY', 4), \
+                mock.patch.object(gemini_utils, 'GEMINI_SECTION_RETRIES', 0):
+            issues = list(gemini_utils.stream_document_issues('minutes.pdf', [], outcome))
+        return [i['issue_no'] for i in issues], outcome['complete']
+
+    def test_sections_stream_concurrently_in_document_order(self):
+        # Section 1 cannot finish until section 2 has started, so a sequential stream would break it
+        both_started = threading.Barrier(2, timeout=5)
+
+        def wait():
+            both_started.wait()
+            return ''
+
+        issue_nos, complete = self._stream({}, {
+            'one': ['[{"issue_no": "1"},', wait, '{"issue_no": "2"}]'],
+            'two': [wait, '[{"issue_no": "3"}]'],
+            'three': ['[{"issue_no": "4"}]'],
+        })
+        self.assertEqual(issue_nos, ['1', '2', '3', '4'])
+        self.assertTrue(complete)
+
+    def test_mid_stream_failure_is_re_extracted_without_repeats(self):
+        issue_nos, complete = self._stream(
+            {'one': json.dumps([{'issue_no': '1'}, {'issue_no': '2'}, {'issue_no': '3'}])},
+            {'one': ['[{"issue_no": "1"},', RuntimeError('connection reset')], 'two': ['[{"issue_no": "4"}]']},
+        )
+        self.assertEqual(issue_nos, ['1', '2', '3', '4'])
+        self.assertTrue(complete)
+
+    def test_failed_re_extraction_marks_stream_incomplete(self):
+        issue_nos, complete = self._stream(
+            {'one': RuntimeError('503')},
+            {'one': ['[{"issue_no": "1"},', RuntimeError('connection reset')], 'two': ['[{"issue_no": "4"}]']},
+        )
+        self.assertEqual(issue_nos, ['1', '4'])
+        self.assertFalse(complete)
+
+
+class ModelMetricsTests(TestCase):
+    def test_pool_thread_calls_are_written_by_the_calling_thread(self):
+        with metrics_endpoint('job:test'):
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                for _ in range(3):
+                    pool.submit(contextvars.copy_context().run, record_call, 'generate_content', 'model').result()
+            self.assertEqual(ModelCallMetric.objects.count(), 0)
+        self.assertEqual(list(ModelCallMetric.objects.values_list('endpoint', flat=True)), ['job:test'] * 3)
+
+    def test_worker_rows_are_merged_into_the_parent_block(self):
+        with collect_metrics() as rows, metrics_endpoint('job:bulk_ingest'):
+            record_call('generate_content', 'model')
+        self.assertEqual(ModelCallMetric.objects.count(), 0)
+
+        with metrics_endpoint('job:parent'):
+            merge_metrics(rows)
+        self.assertEqual(list(ModelCallMetric.objects.values_list('endpoint', flat=True)), ['job:bulk_ingest'])
+
+
+class IssueIndexBackfillTests(TestCase):
+    def _legacy_issues(self):
+        minute_obj = _minutes()
+        # bulk_create sends no post_save, like rows written before the index existed
+        return Issue.objects.bulk_create([
+            Issue(minutes=minute_obj, issue_title='Road repair near the market', location='Kottayam', priority='High'),
+            Issue(minutes=minute_obj, issue_title='Drinking water shortage in ward 4', location='Pala', priority='Medium'),
+        ])
+
+    def test_loading_does_not_build_the_index(self):
+        self._legacy_issues()
+        index = PersistentIssueIndex()
+        self.assertEqual(index.search('drinking water shortage ward 4', top_k=1), [])
+        self.assertFalse(IssueIndexVocabulary.objects.exists())
+
+    def test_worker_startup_indexes_issues_that_predate_the_index(self):
+        issues = self._legacy_issues()
+        self.assertFalse(IssueIndexVocabulary.objects.exists())
+
+        call_command('run_jobs', once=True, stdout=io.StringIO())
+        results = PersistentIssueIndex().search('drinking water shortage ward 4', top_k=1)
+
+        self.assertEqual(IssueIndexEntry.objects.count(), 2)
+        self.assertEqual([issue_id for issue_id, _score in results], [issues[1].pk])
+        self.assertIsNone(ensure_index_built())
+
+    def test_deletion_reaches_other_processes_indexes(self):
+        issues = self._legacy_issues()
+        ensure_index_built()
+        # Another process's copy, loaded before the delete
+        other = PersistentIssueIndex()
+        other.load()
+        self.assertIn(issues[1].pk, other)
+
+        Issue.objects.filter(pk=issues[1].pk).delete()
+
+        self.assertEqual(other.search('drinking water shortage ward 4', top_k=1, min_score=0.2), [])
+        self.assertNotIn(issues[1].pk, other)
+
+
+class NearDuplicateAllocationTests(TestCase):
+    DESCRIPTION = 'The road near the Kottayam market must be repaired before the monsoon and the broken pipeline fixed'
+
+    def test_duplicates_are_only_flagged_by_default(self):
+        extracted = [
+            {'issue_no': '1', 'issue': 'Road repair', 'issue_description': self.DESCRIPTION},
+            {'issue_no': '2', 'issue': 'Road repair again', 'issue_description': self.DESCRIPTION + ' urgently'},
+        ]
+        clean = resolve_near_duplicates(extracted)
+        self.assertEqual([(item['issue_no'], item.get('near_duplicate_of')) for item in clean], [('1', None), ('2', '1')])
+
+    def test_merged_issue_is_allocated_to_every_department_of_its_group(self):
+        Department.objects.create(dept_name='PWD Roads')
+        Department.objects.create(dept_name='Water Authority')
+        Department.objects.create(dept_name='Health Services')
+        description = self.DESCRIPTION
+        extracted = [
+            {'issue_no': '1', 'issue': 'Road repair', 'issue_description': description,
+             'location': 'Kottayam', 'priority': 'High', 'departments': ['PWD Roads']},
+            {'issue_no': '2', 'issue': 'Road repair again', 'issue_description': description + ' urgently',
+             'location': 'Kottayam', 'priority': 'High', 'departments': ['Water Authority']},
+            {'issue_no': '3', 'issue': 'Hospital staff', 'issue_description': 'Appoint two more nurses at the taluk hospital',
+             'location': 'Pala', 'priority': 'Medium', 'departments': ['Health Services']},
+        ]
+        resolution = get_department_matcher().resolution('test')
+        clean = resolve_near_duplicates([resolution.normalize_issue(dict(item)) for item in extracted], mode='merge')
+
+        self.assertEqual([item['issue_no'] for item in clean], ['1', '3'])
+        self.assertEqual(json.loads(clean[0]['department']), ['PWD Roads', 'Water Authority'])
+
+        minute_obj = _minutes()
+        allocate_issues(minute_obj, clean)
+        links = IssueDepartment.objects.filter(issue__minutes=minute_obj, issue__issue_title='Road repair')
+        self.assertEqual(sorted(links.values_list('department__dept_name', flat=True)), ['PWD Roads', 'Water Authority'])
+
+
+class MinutesUploadJobTests(TestCase):
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        cwd = os.getcwd()
+        os.chdir(workdir.name)
+        self.addCleanup(os.chdir, cwd)
+
+    def test_upload_is_queued_and_run_by_the_worker(self):
+        Department.objects.create(dept_name='PWD Roads', designation='Executive Engineer')
+        client = APIClient()
+        client.force_authenticate(_dpo())
+        response = client.post('/upload-minutes', {
+            'file': SimpleUploadedFile('ddc.pdf', b'%PDF-1.4 minutes'), 'meeting_date': '26-04-2025',
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, 202)
+        job = ProcessingJob.objects.get(pk=response.json()['job_id'])
+        self.assertEqual((job.status, job.job_type), ('queued', 'minutes_upload'))
+        self.assertFalse(Minutes.objects.exists())
+
+        extracted = [{'issue_no': '1', 'issue': 'Road repair', 'departments': ['PWD Roads']}]
+        with mock.patch.object(jobs, 'GEMINI_STREAMING', False), \
+                mock.patch.object(jobs, 'analyze_document_with_gemini', return_value=(extracted, True)), \
+                mock.patch.object(jobs, 'upload_to_supabase', return_value='https://example.test/ddc.pdf'):
+            call_command('run_jobs', once=True, stdout=io.StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.stage, job.progress), ('completed', 'done', 100))
+        self.assertEqual(job.minutes.file_path, 'https://example.test/ddc.pdf')
+        self.assertEqual(job.minutes.meeting_date, date(2025, 4, 26))
+        self.assertEqual([item['departments'] for item in job.clean_data], [['PWD Roads']])
+
+    def test_jobs_left_running_by_a_dead_worker_are_requeued(self):
+        stale = ProcessingJob.objects.create(job_type='minutes_upload', created_by=_dpo(), file_path='x', meeting_date=date(2025, 1, 1), status='running')
+        fresh = ProcessingJob.objects.create(job_type='minutes_upload', created_by=_dpo(), file_path='y', meeting_date=date(2025, 1, 1), status='running')
+        # update() so auto_now leaves the timestamp alone
+        ProcessingJob.objects.filter(pk=stale.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(jobs.requeue_stale_jobs(), 1)
+        self.assertEqual(ProcessingJob.objects.get(pk=stale.pk).status, 'queued')
+        self.assertEqual(ProcessingJob.objects.get(pk=fresh.pk).status, 'running')
+        self.assertEqual(jobs.claim_next_job().pk, stale.pk)
+        self.assertIsNone(jobs.claim_next_job())
+
+
+@override_settings(JOB_EVENTS_POLL_SECONDS=0.01, JOB_EVENTS_MAX_SECONDS=0.1, JOB_EVENTS_RETRY_MS=500)
+class JobEventStreamTests(TestCase):
+    def _events(self, job, after=0):
+        return [block for block in ''.join(views._job_event_stream(job.pk, after)).split('\n\n') if block]
+
+    def test_stream_closes_and_resumes_after_the_last_issue(self):
+        job = ProcessingJob.objects.create(job_type='minutes_upload', created_by=_dpo(), file_path='x', meeting_date=date(2025, 1, 1),
+                                           status='running', stage='extracting', clean_data=[{'issue': 'one'}, {'issue': 'two'}])
+
+        events = self._events(job)
+        self.assertEqual(events[0], 'retry: 500')
+        issues = [block for block in events if 'event: issue' in block]
+        self.assertEqual([block.split('\n')[0] for block in issues], ['id: 1', 'id: 2'])
+        # Still running: the stream just ends and the client reconnects
+        self.assertFalse(any('event: done' in block or 'event: error' in block for block in events))
+
+        job.clean_data.append({'issue': 'three'})
+        job.save()
+        resumed = [block for block in self._events(job, after=2) if 'event: issue' in block]
+        self.assertEqual(len(resumed), 1)
+        self.assertIn('"three"', resumed[0])
+
+        job.status = 'completed'
+        job.save()
+        self.assertIn('event: done', self._events(job, after=3)[-1])
+        self.assertEqual(views.TEMP_DATA_CACHE, [])
+
+
+class BulkIngestManifestTests(TestCase):
+    def test_failed_and_partial_extractions_are_reported(self):
+        answers = {
+            'full.pdf': ([{'issue_no': '1', 'issue': 'Road repair', 'departments': []}], True),
+            'partial.pdf': ([{'issue_no': '1', 'issue': 'Water supply', 'departments': []}], False),
+            'failed.pdf': ([], False),
+        }
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        zip_path = os.path.join(workdir.name, 'minutes.zip')
+        with zipfile.ZipFile(zip_path, 'w') as archive:
+            for name in answers:
+                archive.writestr(name, name)
+
+        cwd = os.getcwd()
+        os.chdir(workdir.name)
+        self.addCleanup(os.chdir, cwd)
+        # Threads instead of processes so the mocks reach the workers
+        with mock.patch.object(bulk_ingest, 'ProcessPoolExecutor', lambda max_workers, **_: ThreadPoolExecutor(max_workers)), \
+                mock.patch.object(bulk_ingest, 'analyze_document_with_gemini', side_effect=lambda path, *_: answers[os.path.basename(path)]), \
+                mock.patch.object(bulk_ingest, 'upload_to_supabase', return_value='https://example.test/minutes.pdf'):
+            manifest = bulk_ingest.ingest_zip(zip_path, _dpo(), max_workers=2)
+
+        by_name = {entry['filename']: entry for entry in manifest}
+        self.assertEqual({name: (e['status'], e['complete'], e['issue_count']) for name, e in by_name.items()}, {
+            'full.pdf': ('ok', True, 1),
+            'partial.pdf': ('partial', False, 1),
+            'failed.pdf': ('failed', False, 0),
+        })
+        self.assertIsNone(by_name['failed.pdf']['minutes_id'])
+        self.assertEqual(sorted(Minutes.objects.values_list('title', flat=True)), ['full.pdf', 'partial.pdf'])
+
+
+class MatchBatchTests(SimpleTestCase):
+    def test_many_new_issues_are_split_instead_of_shrinking_existing_batches(self):
+        new = [{'index': i, 'issue': f'New issue {i}', 'issue_description': 'റോഡ് അറ്റകുറ്റപ്പണി നടത്തണം ' * 8} for i in range(100)]
+        existing = [{'id': i, 'issue': f'Existing issue {i}', 'issue_description': 'Drinking water pipeline broken ' * 6,
+                     'minutes_title': 'DDC'} for i in range(300)]
+        max_tokens = 8000
+
+        batches = gemini_utils.build_match_batches(new, existing, max_tokens=max_tokens)
+
+        # The new issues alone exceed the budget; sizing every batch for all of them gave one batch per existing issue
+        self.assertGreater(sum(gemini_utils._payload_tokens(n) for n in new), max_tokens)
+        self.assertLess(len(batches), 30)
+        for new_batch, existing_batch in batches:
+            self.assertLessEqual(gemini_utils.estimate_tokens(gemini_utils._build_match_prompt(new_batch, existing_batch)), max_tokens)
+        pairs = [(n['index'], e['id']) for new_batch, existing_batch in batches for n in new_batch for e in existing_batch]
+        self.assertEqual(len(pairs), len(new) * len(existing))
+        self.assertEqual(len(set(pairs)), len(pairs))
+
+
+class MatchVerdictCacheTests(TestCase):
+    def test_only_matches_are_cached(self):
+        minute_obj = _minutes()
+        first = Issue.objects.create(minutes=minute_obj, issue_title='Road repair', location='Kottayam', priority='High')
+        second = Issue.objects.create(minutes=minute_obj, issue_title='Water supply', location='Pala', priority='High')
+        new = [{'index': 0, 'issue': 'Road repair again'}, {'index': 1, 'issue': 'Water supply again'}]
+        existing = [{'id': first.pk, 'issue': 'Road repair'}, {'id': second.pk, 'issue': 'Water supply'}]
+        candidates = {0: [(first.pk, 0.9), (second.pk, 0.4)], 1: [(second.pk, 0.8)]}
+        sent = []
+
+        def fake_match(prompt_new, shortlisted, evaluated=None):
+            sent.append([n['index'] for n in prompt_new])
+            evaluated.update((n['index'], existing_id) for n in prompt_new for existing_id in n['candidate_ids'])
+            return [{'new_index': 0, 'existing_id': first.pk, 'confidence': 'high'}] if any(n['index'] == 0 for n in prompt_new) else []
+
+        with mock.patch.object(issue_matching, 'prefilter_candidates', return_value=candidates), \
+                mock.patch.object(issue_matching, 'match_issues_with_gemini', side_effect=fake_match):
+            issue_matching.match_new_issues(new, existing, engine='gemini')
+            again = issue_matching.match_new_issues(new, existing, engine='gemini')
+
+        # The unchosen pairs were judged against each other's company, so they are asked again
+        self.assertEqual(sent, [[0, 1], [1]])
+        self.assertEqual(list(MatchVerdict.objects.values_list('existing_issue_id', 'matched')), [(first.pk, True)])
+        self.assertEqual(again, [{'new_index': 0, 'existing_id': first.pk, 'confidence': 'high'}])
+
+
+class LexicalMatcherTests(SimpleTestCase):
+    EXISTING = [
+        {'id': 1, 'issue': 'Drinking water pipeline broken', 'issue_description': 'Pipeline near the school is broken', 'location': 'Pala'},
+        {'id': 2, 'issue': 'Road repair', 'issue_description': 'Potholes on the market road', 'location': 'Kottayam'},
+        {'id': 3, 'issue': 'റോഡുകൾ അറ്റകുറ്റപ്പണി', 'issue_description': 'ചന്ത റോഡിലെ കുഴികൾ', 'location': 'ഏറ്റുമാനൂർ'},
+        {'id': 4, 'issue': 'Street lights', 'issue_description': 'Street lights on the market road are off', 'location': 'Kottayam'},
+    ]
+
+    def test_malayalam_suffixes_are_stripped(self):
+        self.assertEqual(tokenize('റോഡിൽ റോഡിന്റെ റോഡുകൾ റോഡ്'), ['റോഡ'] * 4)
+        # At least two characters of stem are kept
+        self.assertEqual(tokenize('ഇത്'), ['ഇത'])
+
+    def test_ranking_order(self):
+        index = BM25Index([(e['id'], tokenize(e['issue'] + ' ' + e['issue_description'])) for e in self.EXISTING])
+        scores = index.scores(tokenize('market road potholes repair'))
+        ranked = [index.doc_ids[position] for position, _score in sorted(scores.items(), key=lambda kv: -kv[1])]
+        self.assertEqual(ranked, [2, 4])
+        self.assertTrue(all(0 < score <= 1 for score in scores.values()))
+
+    def test_suffix_stripped_match(self):
+        new = [{'index': 0, 'issue': 'റോഡിന്റെ അറ്റകുറ്റപ്പണി', 'issue_description': 'ചന്ത റോഡിൽ കുഴികൾ', 'location': 'ഏറ്റുമാനൂർ'}]
+        self.assertEqual(lexical_match(new, self.EXISTING), [{'new_index': 0, 'existing_id': 3, 'confidence': 'high'}])
+
+    def test_threshold_cut_off(self):
+        new = [{'index': 0, 'issue': 'Road repair', 'issue_description': 'bypass'}]
+        self.assertEqual(lexical_match(new, self.EXISTING), [{'new_index': 0, 'existing_id': 2, 'confidence': 'medium'}])
+        with override_settings(LEXICAL_MATCH_HIGH=0.4):
+            self.assertEqual(lexical_match(new, self.EXISTING)[0]['confidence'], 'high')
+        with override_settings(LEXICAL_MATCH_MEDIUM=0.5, LEXICAL_MATCH_HIGH=0.6):
+            self.assertEqual(lexical_match(new, self.EXISTING), [])
+        # Sharing one common word is below the default medium threshold
+        self.assertEqual(lexical_match([{'index': 1, 'issue': 'Road works near the bypass'}], self.EXISTING), [])
+
+    def test_candidate_ids_are_honored(self):
+        new = [{'index': 0, 'issue': 'Road repair', 'issue_description': 'Potholes on the market road', 'candidate_ids': [1]}]
+        self.assertEqual(lexical_match(new, self.EXISTING), [])
+
+
+class MatchEngineTests(TestCase):
+    def setUp(self):
+        minute_obj = _minutes()
+        self.existing = Issue.objects.create(minutes=minute_obj, issue_title='Road repair', location='Kottayam', priority='High')
+        self.new = [{'index': 0, 'issue': 'Road repair', 'issue_description': 'Potholes on the market road', 'location': 'Kottayam'}]
+        self.existing_issues = [{'id': self.existing.pk, 'issue': 'Road repair', 'issue_description': 'Potholes on the market road',
+                                 'location': 'Kottayam'}]
+
+    def test_unknown_engine_falls_back_to_auto(self):
+        # Every Gemini batch failed: nothing was judged, so 'auto' answers with the lexical matcher
+        with mock.patch.object(issue_matching, 'match_issues_with_gemini', return_value=[]) as gemini:
+            matches = issue_matching.match_new_issues(self.new, self.existing_issues, engine='bm25')
+        gemini.assert_called_once()
+        self.assertEqual(matches, [{'new_index': 0, 'existing_id': self.existing.pk, 'confidence': 'high'}])
+
+    def test_view_engine_parameter(self):
+        client = APIClient()
+        client.force_authenticate(_dpo())
+        payload = {'new_issues': self.new, 'existing_issues': self.existing_issues}
+
+        response = client.post('/match-issues', dict(payload, engine='bm25'), format='json')
+        self.assertEqual(response.status_code, 400)
+
+        with mock.patch.object(issue_matching, 'match_issues_with_gemini') as gemini:
+            response = client.post('/match-issues', dict(payload, engine='lexical'), format='json')
+        gemini.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{'new_index': 0, 'existing_id': self.existing.pk, 'confidence': 'high'}])
+
+
+class DepartmentKeyIndexGoldenTests(SimpleTestCase):
+    def test_index_agrees_with_the_linear_scan(self):
+        rng = random.Random(11)
+        maps = _build_department_name_maps(_synthetic_departments(500, rng))
+        index = maps['key_index']
+        narrow = DepartmentKeyIndex(maps['normalized'], maps['combined'])
+        for query in _queries(maps, 80, rng):
+            with self.subTest(query=query):
+                self.assertIs(index.containment(query), _scan_containment(query, maps))
+                expected = _scan_fuzzy(query, maps)
+                self.assertIs(index.fuzzy(query), expected)
+                # The trigram shortlist only orders the search; a narrow one must not change the answer
+                self.assertIs(narrow.fuzzy(query, candidates=2), expected)
+
+    def test_repeated_miss_is_answered_without_a_scan(self):
+        maps = _build_department_name_maps(_synthetic_departments(200, random.Random(3)))
+        index = maps['key_index']
+        self.assertIsNone(index.fuzzy('QQQXYZWVUTSRQQ'))
+        with mock.patch.object(index, '_closest') as closest:
+            self.assertIsNone(index.fuzzy('QQQXYZWVUTSRQQ'))
+        closest.assert_not_called()
+
+
+class DepartmentAliasLearningTests(TestCase):
+    LABEL = 'വൈദ്യുതി ബോർഡ്'
+
+    def setUp(self):
+        self.kseb = Department.objects.create(dept_name='Kerala State Electricity Board', designation='Chief Engineer')
+        Department.objects.create(dept_name='Health Services', designation='District Medical Officer')
+
+    def _corrected_issue(self):
+        # Extraction left the label unresolved; the DPO picked the department by hand
+        return {'issue_no': '1', 'issue': 'Power cuts', 'departments': [], 'unresolved_departments': [self.LABEL],
+                'department': json.dumps(['Kerala State Electricity Board'])}
+
+    def test_correction_creates_an_alias_the_next_lookup_resolves_through(self):
+        resolution = get_department_matcher().resolution('test')
+        self.assertIsNone(resolution.match(self.LABEL))
+        version = departments_version()
+
+        self.assertEqual(learn_department_aliases([self._corrected_issue()], resolution.maps, user=_dpo(), resolution=resolution), 1)
+
+        alias = DepartmentAlias.objects.get()
+        self.assertEqual((alias.alias, alias.alias_key, alias.department), (self.LABEL, canonical_key(self.LABEL), self.kseb))
+        # The stamp moved, so every process rebuilds its matcher with the alias
+        self.assertGreater(departments_version(), version)
+        self.assertEqual(get_department_matcher().match(self.LABEL), self.kseb)
+        # The memo that had cached the miss answers the label from now on
+        self.assertEqual(resolution.match(self.LABEL), self.kseb)
+
+    def test_explicit_aliases_and_repeats(self):
+        item = {'issue_no': '1', 'department_aliases': {self.LABEL: 'Kerala State Electricity Board', 'KSEB Pala': 'No Such Dept'}}
+        maps = get_department_matcher().maps
+        learn_department_aliases([item, dict(item)], maps)
+        self.assertEqual(list(DepartmentAlias.objects.values_list('alias', 'use_count')), [(self.LABEL, 1)])
+
+        learn_department_aliases([item], maps)
+        self.assertEqual(DepartmentAlias.objects.get().use_count, 2)
+
+    def test_allocation_learns_the_correction(self):
+        allocate_issues(_minutes(), [self._corrected_issue()], user=_dpo())
+        self.assertEqual(get_department_matcher().match(self.LABEL), self.kseb)
+        links = IssueDepartment.objects.values_list('department__dept_name', flat=True)
+        self.assertEqual(list(links), ['Kerala State Electricity Board'])
+
+    def test_alias_view_import_and_export(self):
+        client = APIClient()
+        client.force_authenticate(_dpo())
+        version = departments_version()
+
+        response = client.post('/departments/aliases', {'aliases': [
+            {'alias': self.LABEL, 'department': 'Kerala State Electricity Board'},
+            {'alias': 'Arogyam', 'department': 'No Such Dept'},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['imported'], 1)
+        self.assertEqual(len(response.json()['errors']), 1)
+        self.assertGreater(departments_version(), version)
+        self.assertEqual(get_department_matcher().match(self.LABEL), self.kseb)
+        self.assertEqual(client.get('/departments/aliases').json(), [{
+            'alias': self.LABEL, 'department': 'Kerala State Electricity Board', 'designation': 'Chief Engineer',
+            'source': 'import', 'use_count': 0,
+        }])
+
+
+class DepartmentKeyTests(SimpleTestCase):
+    def assertSameKey(self, key_fn, variants, expected):
+        for value in variants:
+            with self.subTest(value=value):
+                self.assertEqual(key_fn(value), expected)
+
+    def test_punctuation_spacing_and_case_are_dropped(self):
+        self.assertSameKey(canonical_key, ['PWD Roads', 'P.W.D. (Roads)', 'pwd-roads', ' Pwd_Roads ', 'ＰＷＤ Roads'], 'PWDROADS')
+
+    def test_designations_and_honorifics_are_kept(self):
+        self.assertSameKey(canonical_key, ['Executive Engineer, P.W.D.', 'Executive Engineer PWD'], 'EXECUTIVEENGINEERPWD')
+        self.assertEqual(canonical_key('Sri. K. Ravi'), 'SRIKRAVI')
+        self.assertEqual(department_keys(' PWD Roads ', 'Executive Engineer'), {
+            'name_key': 'PWDROADS', 'combined_key': 'EXECUTIVEENGINEERPWDROADS', 'phonetic_key': 'PVDRDS',
+        })
+        self.assertEqual(department_keys('PWD Roads')['combined_key'], '')
+
+    def test_malayalam_encoding_variants_share_a_key(self):
+        chillu_r = 'കളക്ടർ'
+        old_chillu_r = 'കളക്ടര\u0d4d\u200d'
+        self.assertSameKey(canonical_key, [chillu_r, old_chillu_r, 'കളക്\u200cടർ', ' കളക്ടർ.'], 'കളക്ടര\u0d4d')
+        # The old two-part AU sign and the length mark
+        self.assertEqual(canonical_key('ൌ'), canonical_key('ൗ'))
+
+    def test_intended_phonetic_collisions(self):
+        self.assertSameKey(phonetic_key, ['Panchayath', 'Panchayat', 'പഞ്ചായത്ത്'], 'PNYT')
+        self.assertSameKey(phonetic_key, ['Kerala Water Authority', 'കേരള വാട്ടർ അതോറിറ്റി'], 'KRLVTRATRT')
+        self.assertSameKey(phonetic_key, ['District Collector', 'ഡിസ്ട്രിക്ട് കളക്ടർ', 'ഡിസ്ട്രിക്ട് കലക്ടർ'], 'DSTRKTKLKTR')
+        self.assertSameKey(phonetic_key, ['Engineer', 'എഞ്ചിനീയർ'], 'ANNR')
+        self.assertSameKey(phonetic_key, ['Education', 'എഡ്യൂക്കേഷൻ'], 'ADKSN')
+        self.assertSameKey(phonetic_key, ['Irrigation', 'ഇറിഗേഷൻ'], 'ARGSN')
+        self.assertSameKey(phonetic_key, ['Agriculture', 'അഗ്രികൾച്ചർ'], 'AGRKLJR')
+        self.assertSameKey(phonetic_key, ['Revenue', 'റവന്യൂ'], 'RVN')
+
+    def test_distinct_departments_keep_distinct_skeletons(self):
+        names = ['Health', 'Police', 'Forest', 'Fisheries', 'Revenue', 'Education', 'Irrigation', 'Agriculture', 'KSEB']
+        self.assertEqual(len({phonetic_key(name) for name in names}), len(names))
+
+
+class DepartmentKeyRecomputeTests(TestCase):
+    def test_stale_keys_are_recomputed_once(self):
+        dept = Department.objects.create(dept_name='P.W.D. Roads', designation='Executive Engineer')
+        alias = DepartmentAlias.objects.create(alias='പി.ഡബ്ല്യു.ഡി', alias_key='stale', department=dept)
+        # Keys written by an older algorithm (update() skips the pre_save signal)
+        Department.objects.filter(pk=dept.pk).update(name_key='OLD', combined_key='OLD', phonetic_key='OLD')
+        CacheVersion.objects.update_or_create(key='department_keys', defaults={'version': KEY_VERSION - 1})
+
+        self.assertEqual(recompute_department_keys(), (1, 1))
+        dept.refresh_from_db()
+        alias.refresh_from_db()
+        self.assertEqual(
+            {'name_key': dept.name_key, 'combined_key': dept.combined_key, 'phonetic_key': dept.phonetic_key},
+            department_keys('P.W.D. Roads', 'Executive Engineer'),
+        )
+        self.assertEqual(alias.alias_key, canonical_key('പി.ഡബ്ല്യു.ഡി'))
+        self.assertEqual(CacheVersion.objects.get(key='department_keys').version, KEY_VERSION)
+        self.assertEqual(get_department_matcher().match('PWD Roads'), dept)
+
+        self.assertIsNone(recompute_department_keys())
+
+
+class AllocationQueryCountTests(TestCase):
+    """allocate_issues runs a fixed number of queries, however many issues the draft holds."""
+    FIRST_ALLOCATION_QUERIES = 12
+    REALLOCATION_QUERIES = 13
+
+    def setUp(self):
+        self.departments = [Department.objects.create(dept_name=f'Department {n}') for n in range(6)]
+        holder = _minutes('Parents')
+        root = Issue.objects.create(minutes=holder, issue_title='Root', location='', priority='Medium')
+        child = Issue.objects.create(minutes=holder, issue_title='Follow-up', location='', priority='Medium', parent_issue=root)
+        self.parent_ids = [root.pk, child.pk]
+
+    def _allocate(self, minute_obj, size, edited, queries):
+        draft = _draft(size, self.departments, self.parent_ids, edited=edited)
+        # Built outside the assertion: the matcher is cached per process, not per allocation
+        resolution = get_department_matcher().resolution('test')
+        with self.assertNumQueries(queries):
+            allocate_issues(minute_obj, draft, resolution=resolution)
+
+    def test_query_count_does_not_grow_with_the_draft(self):
+        for size in (5, 40):
+            with self.subTest(size=size):
+                minute_obj = _minutes(f'Minutes {size}')
+                self._allocate(minute_obj, size, False, self.FIRST_ALLOCATION_QUERIES)
+                self._allocate(minute_obj, size, True, self.REALLOCATION_QUERIES)
+                self.assertEqual(IssueDepartment.objects.filter(issue__minutes=minute_obj).count(), size * 2)
@@ -6,7 +6,12 @@ urlpatterns = [
     path('logout', views.logout_view),
     path('departments', views.get_departments),
     path('departments/create-user', views.create_department_user),
+    path('departments/aliases', views.department_aliases),
     path('upload-minutes', views.upload_minutes),
+    path('minutes/bulk-upload', views.bulk_upload_minutes),
+    path('jobs/<int:job_id>', views.get_job),
+    path('jobs/<int:job_id>/events', views.stream_job_events),
+    path('metrics/model-calls', views.get_model_call_metrics),
     path('minutes', views.get_minutes),
     path('minutes/<int:minutes_id>', views.delete_minutes),
     path('assign-issues', views.get_assign_issues),
@@ -1,7 +1,8 @@
-from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes, throttle_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.throttling import AnonRateThrottle
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 
 from django.contrib.auth import authenticate, login, logout, get_user_model
 from django.views.decorators.csrf import csrf_exempt
@@ -16,16 +17,17 @@ import os
 import json
 import openpyxl
 from openpyxl.styles import Font, Alignment, Border, Side
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from django.conf import settings
+import time
 
 from rest_framework.authtoken.models import Token
 from collections import defaultdict
 import httpx
 import requests
 import uuid
+import zipfile
 from urllib.parse import quote
-import difflib
-import re
 
 from .models import (
     User,
@@ -34,14 +36,24 @@ from .models import (
     IssueDepartment,
     Minutes,
     Response as ResponseModel,
-    Notification
+    Notification,
+    ProcessingJob
 )
 from .services import check_and_send_overdue_emails
-from .serializers import IssueDepartmentSerializer, NotificationSerializer, DPOIssueSerializer
-from .gemini_utils import analyze_document_with_gemini, match_issues_with_gemini
+from .serializers import IssueDepartmentSerializer, NotificationSerializer, DPOIssueSerializer, ProcessingJobSerializer
+from .issue_matching import MATCH_ENGINES, match_new_issues
 from .supabase_utils import upload_to_supabase
+from .department_utils import (
+    _department_inputs,
+    export_department_aliases,
+    get_department_matcher,
+    import_department_aliases,
+)
+from .allocation import allocate_issues
+from .jobs import enqueue_minutes_upload, enqueue_bulk_ingest
+from .model_metrics import metrics_endpoint, summarize as summarize_model_metrics
 import os
-from datetime import datetime, date, timedelta
+from datetime import datetime, date
 import io
 from reportlab.lib.pagesizes import landscape, A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
@@ -183,16 +195,43 @@ def get_departments(request):
     return Response(result)
 
 
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def department_aliases(request):
+    """GET exports every learned department alias; POST bulk-imports {"aliases": [{alias, department}, ...]}."""
+    if request.user.role.lower() != 'dpo':
+        return Response({"error": "Unauthorized"}, status=403)
+
+    if request.method == 'GET':
+        return Response(export_department_aliases())
+
+    rows = request.data.get('aliases')
+    if not isinstance(rows, list):
+        return Response({"error": "aliases must be a list of {alias, department} objects."}, status=400)
+    imported, errors = import_department_aliases(rows, user=request.user)
+    return Response({"imported": imported, "errors": errors}, status=400 if errors and not imported else 200)
+
+
 # ================= MINUTES UPLOAD ================= #
 
+def _parse_meeting_date(meeting_date_str):
+    """Parse a DD-MM-YYYY meeting date, falling back to today."""
+    try:
+        if meeting_date_str:
+            parts = meeting_date_str.split('-')
+            if len(parts) == 3:
+                return datetime.strptime(meeting_date_str, '%d-%m-%Y').date()
+    except ValueError:
+        pass
+    return timezone.now().date()
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def upload_minutes(request):
     if request.user.role.lower() != 'dpo':
         return Response({"error": "Only DPO can upload minutes"}, status=403)
 
-    global TEMP_DATA_CACHE
-
     file = request.FILES.get('file')
     meeting_date_str = request.POST.get('meeting_date')
     
@@ -207,79 +246,158 @@ def upload_minutes(request):
         for chunk in file.chunks():
             dest.write(chunk)
 
-    # Build a list of formatted department strings: "Designation, Department Name"
-    available_departments = []
-    for dept in Department.objects.all():
-        desig = (dept.designation or '').strip()
-        name = (dept.dept_name or '').strip()
-        if desig:
-            available_departments.append(f"{desig}, {name}")
-        else:
-            available_departments.append(name)
-
-    # Analyze with Gemini using current department master list (including designations)
-    raw_data = analyze_document_with_gemini(local_file_path, available_departments)
-
-    # Upload to Supabase Storage using shared utility
-    with open(local_file_path, 'rb') as f:
-        file_data = f.read()
-    supabase_public_url = upload_to_supabase(
-        file_data=file_data,
-        original_filename=file.name,
-        bucket=SUPABASE_BUCKET,
-        folder='public'
-    )
+    meeting_date_obj = _parse_meeting_date(meeting_date_str)
 
-    dept_objects = list(Department.objects.all())
-    dept_name_map = _build_department_name_maps(dept_objects)
+    # Extraction, normalization and storage run in the `run_jobs` worker;
+    # the client polls jobs/<id> for progress and the final clean_data.
+    job = enqueue_minutes_upload(request.user, local_file_path, file.name, meeting_date_obj)
+
+    return Response({"success": True, "job_id": job.id, "status": job.status}, status=202)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_upload_minutes(request):
+    """Queue a ZIP of PDF/DOCX minutes for bulk ingestion by the job worker."""
+    if request.user.role.lower() != 'dpo':
+        return Response({"error": "Only DPO can upload minutes"}, status=403)
+
+    file = request.FILES.get('file')
+    if not file:
+        return Response({"error": "File required"}, status=400)
+    if not file.name.lower().endswith('.zip'):
+        return Response({"error": "A .zip archive of PDF/DOCX minutes is required"}, status=400)
+
+    os.makedirs('media/bulk', exist_ok=True)
+    local_zip_path = f"media/bulk/{uuid.uuid4().hex[:8]}_{file.name}"
+    with open(local_zip_path, 'wb+') as dest:
+        for chunk in file.chunks():
+            dest.write(chunk)
+
+    if not zipfile.is_zipfile(local_zip_path):
+        os.remove(local_zip_path)
+        return Response({"error": "Uploaded file is not a valid ZIP archive"}, status=400)
+
+    # Used for files whose name carries no DD.MM.YYYY date
+    default_meeting_date = _parse_meeting_date(request.POST.get('meeting_date'))
+    job = enqueue_bulk_ingest(request.user, local_zip_path, file.name, default_meeting_date)
+
+    return Response({"success": True, "job_id": job.id, "status": job.status}, status=202)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_job(request, job_id):
+    if request.user.role.lower() != 'dpo':
+        return Response({"error": "Unauthorized"}, status=403)
 
-    print(f"🔍 Gemini returned {len(raw_data)} issues.")
-    
-    clean_data = []
-    for i, item in enumerate(raw_data):
-        print(f"--- Processing Issue {i+1} ---")
-        item = _normalize_issue_departments(item, dept_name_map)
-        print(f"  Matched Depts: {item.get('departments')}")
-        clean_data.append(item)
-
-    # ===== CREATE MINUTES RECORD NOW (not waiting for allocate_all) ===== #
-    u_by = request.user
-    # Parse meeting date if provided
     try:
-        if meeting_date_str:
-            parts = meeting_date_str.split('-')
-            if len(parts) == 3:
-                meeting_date_obj = datetime.strptime(meeting_date_str, '%d-%m-%Y').date()
-            else:
-                meeting_date_obj = timezone.now().date()
-        else:
-            meeting_date_obj = timezone.now().date()
-    except:
-        meeting_date_obj = timezone.now().date()
-
-    # Use Supabase URL if upload succeeded, otherwise fall back to local path
-    file_path_for_db = supabase_public_url or local_file_path
-    
-    # Create Minutes record IMMEDIATELY
-    minute_obj = Minutes.objects.create(
-        title=file.name,  # Use actual filename as title
-        meeting_date=meeting_date_obj,
-        uploaded_by=u_by,
-        file_path=file_path_for_db
-    )
-    
-    print(f"✅ Minutes record created: ID {minute_obj.id}, Title: {file.name}")
-    # ===== END NEW ===== #
-
-    # Store file path and minutes ID in TEMP_DATA_CACHE for the allocate step
-    TEMP_DATA_CACHE = {
-        'file_path': supabase_public_url or local_file_path,
-        'is_supabase': supabase_public_url is not None,
-        'issues': clean_data,
-        'minutes_id': minute_obj.id
-    }
-    
-    return Response({"success": True, "data": clean_data, "minutes_id": minute_obj.id})
+        job = ProcessingJob.objects.get(id=job_id, created_by=request.user)
+    except ProcessingJob.DoesNotExist:
+        return Response({"error": "Job not found"}, status=404)
+
+    # The client sends clean_data and minutes_id back with the allocate call
+    return Response(ProcessingJobSerializer(job).data)
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets DRF content negotiation accept `Accept: text/event-stream`."""
+    media_type = 'text/event-stream'
+    format = 'txt'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+
+def _sse(event, data, event_id=None):
+    prefix = f"id: {event_id}\n" if event_id is not None else ''
+    return f"{prefix}event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def _job_event_stream(job_id, after=0):
+    """
+    Push each newly normalized issue (from index `after` on), stage changes
+    and the final job payload. The stream closes after JOB_EVENTS_MAX_SECONDS
+    so a long job doesn't hold a web worker; the client reconnects with the
+    id of the last issue it received.
+    """
+    poll_interval = float(getattr(settings, 'JOB_EVENTS_POLL_SECONDS', 0.5))
+    deadline = time.monotonic() + float(getattr(settings, 'JOB_EVENTS_MAX_SECONDS', 60))
+    sent, last_stage, last_ping = after, None, time.monotonic()
+
+    yield f"retry: {int(getattr(settings, 'JOB_EVENTS_RETRY_MS', 2000))}\n\n"
+    while True:
+        job = ProcessingJob.objects.filter(id=job_id).first()
+        if job is None:
+            yield _sse('error', {'error': 'Job not found'})
+            return
+
+        if (job.stage, job.progress) != last_stage:
+            last_stage = (job.stage, job.progress)
+            yield _sse('progress', {'status': job.status, 'stage': job.stage, 'progress': job.progress})
+
+        issues = job.clean_data or []
+        # Only the streamed prefix is pushed while running; the final list comes with 'done'
+        if job.status == 'running':
+            for index in range(sent, len(issues)):
+                yield _sse('issue', {'index': index, 'issue': issues[index]}, event_id=index + 1)
+            sent = max(sent, len(issues))
+
+        if job.status == 'completed':
+            yield _sse('done', ProcessingJobSerializer(job).data)
+            return
+        if job.status == 'failed':
+            yield _sse('error', {'error': job.error or 'Extraction failed'})
+            return
+
+        if time.monotonic() + poll_interval >= deadline:
+            return
+        if time.monotonic() - last_ping > 15:
+            # Comment line keeps proxies from closing an idle stream
+            last_ping = time.monotonic()
+            yield ': ping\n\n'
+        time.sleep(poll_interval)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([EventStreamRenderer, JSONRenderer])
+def stream_job_events(request, job_id):
+    """
+    Server-Sent Events feed of a minutes job: 'progress', 'issue', then 'done'
+    or 'error'. Streams end after about a minute; reconnect with ?after=<last
+    issue id> (or the Last-Event-ID header) to carry on.
+    """
+    if request.user.role.lower() != 'dpo':
+        return Response({"error": "Unauthorized"}, status=403)
+
+    if not ProcessingJob.objects.filter(id=job_id, created_by=request.user).exists():
+        return Response({"error": "Job not found"}, status=404)
+
+    try:
+        after = max(0, int(request.query_params.get('after') or request.headers.get('Last-Event-ID') or 0))
+    except ValueError:
+        return Response({"error": "after must be an integer"}, status=400)
+
+    response = StreamingHttpResponse(_job_event_stream(job_id, after), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_model_call_metrics(request):
+    """p50/p95 Gemini latency and daily token totals. ?days= defaults to 7."""
+    if request.user.role.lower() != 'dpo' and not request.user.is_staff:
+        return Response({"error": "Unauthorized"}, status=403)
+
+    try:
+        days = max(1, int(request.query_params.get('days', 7)))
+    except (TypeError, ValueError):
+        return Response({"error": "days must be an integer"}, status=400)
+
+    return Response(summarize_model_metrics(days))
 
 
 @api_view(['GET'])
@@ -319,209 +437,13 @@ def _resolve_minutes_obj(minutes_id):
         return None, Response({"error": "Minutes record not found. Please upload file again."}, status=400)
 
 
-def _parse_deadline(item):
-    """Parse deadline from item data, defaulting to 14 days from today."""
-    raw = item.get('deadline', '')
-    if raw and raw.strip():
-        try:
-            # Handle DD-MM-YYYY format from frontend
-            parts = raw.strip().split('-')
-            if len(parts) == 3:
-                return date(int(parts[2]), int(parts[1]), int(parts[0]))
-        except (ValueError, IndexError):
-            pass
-    return date.today() + timedelta(days=14)
-
-
-def _extract_departments(item):
-    val = item.get('departments')
-    # AI now returns a list of objects: [{"designation": "...", "department": "..."}, ...]
-    if isinstance(val, list):
-        return val
-    
-    # Fallback for old/manual data
-    val = item.get('department', 'GENERAL')
-    return [
-        d.strip()[:100]
-        for d in str(val).split(',')
-        if d.strip()
-    ]
-
-
-def _dept_key(value):
-    # Keep alphabetical and numeric characters from any language (Malayalam, etc)
-    return re.sub(r'[^\w]+', '', (value or '').strip().upper())
-
-
-def _build_department_name_maps(departments):
-    exact = {}
-    normalized = {}
-    designation_map = {}
-    combined = {}
-
-    for dept in departments:
-        name = (dept.dept_name or '').strip()
-        desig = (dept.designation or '').strip()
-        if not name:
-            continue
-
-        exact[name.upper()] = dept
-        
-        n_name = _dept_key(name)
-        if n_name and n_name not in normalized:
-            normalized[n_name] = dept
-            
-        if desig:
-            n_desig = _dept_key(desig)
-            if n_desig and n_desig not in designation_map:
-                designation_map[n_desig] = dept
-            
-            n_comb = _dept_key(f"{desig}{name}")
-            if n_comb and n_comb not in combined:
-                combined[n_comb] = dept
-
-    return {
-        'exact': exact,
-        'normalized': normalized,
-        'designation': designation_map,
-        'combined': combined,
-        'normalized_keys': list(normalized.keys()),
-    }
-
-
-def _match_department(raw_input, dept_maps, cutoff=0.72):
-    if not raw_input:
-        return None
-
-    # Handle structured object from Gemini: {"designation": "...", "department": "..."}
-    if isinstance(raw_input, dict):
-        d_val = (raw_input.get('designation') or '').strip()
-        n_val = (raw_input.get('department') or '').strip()
-        query = f"{d_val}{n_val}"
-        raw_name = f"{d_val}, {n_val}" if d_val and n_val else (d_val or n_val)
-    else:
-        query = raw_input
-        raw_name = raw_input
-
-    print(f"    Matching Dept: '{raw_name}'")
-    
-    exact = dept_maps['exact']
-    normalized = dept_maps['normalized']
-    combined = dept_maps.get('combined', {})
-    designation_map = dept_maps.get('designation', {})
-
-    # 1. Try exact name match if query is a string
-    if not isinstance(raw_input, dict):
-        exact_match = exact.get(query.strip().upper())
-        if exact_match:
-            return exact_match
-
-    # 2. Try normalized combined match (designation + name)
-    key = _dept_key(query)
-    if not key:
-        return None
-
-    if key in combined:
-        return combined[key]
-
-    # 3. Try normalized name match
-    if key in normalized:
-        return normalized[key]
-        
-    # 4. Try normalized designation match (only if raw_input was a string/designation only)
-    if key in designation_map:
-        return designation_map[key]
-
-    # 5. Handle alias-like values by containment
-    containment_candidates = []
-    for normalized_key, dept in normalized.items():
-        if key in normalized_key or normalized_key in key:
-            containment_candidates.append((abs(len(normalized_key) - len(key)), dept))
-            
-    for comb_key, dept in combined.items():
-        if key in comb_key:
-             containment_candidates.append((abs(len(comb_key) - len(key)), dept))
-
-    if containment_candidates:
-        containment_candidates.sort(key=lambda x: x[0])
-        return containment_candidates[0][1]
-
-    # 6. Fuzzy match fallback
-    close = difflib.get_close_matches(key, dept_maps['normalized_keys'], n=1, cutoff=0.55)
-    if close:
-        return normalized.get(close[0])
-
-    print(f"    ⚠️ Match Failed for: '{raw_name}'")
-    return None
-
-
-def _normalize_issue_departments(item, dept_maps):
-    # PRIORITY: Manual edits from UI (department string) take precedence over extracted array
-    dept_str = item.get('department', '').strip()
-    raw_depts = []
-    
-    if dept_str:
-        # Try to parse as JSON array first (from DepartmentSelector)
-        try:
-            if dept_str.startswith('['):
-                parsed = json.loads(dept_str)
-                if isinstance(parsed, list):
-                    raw_depts = parsed
-        except (json.JSONDecodeError, ValueError):
-            # Not JSON, fall through to comma-separated parsing
-            pass
-        
-        # Fall back to comma-separated parsing (for backward compatibility)
-        if not raw_depts:
-            raw_depts = [d.strip() for d in dept_str.split(',') if d.strip()]
-    
-    # If still no departments, try the extracted array
-    if not raw_depts:
-        raw_depts = item.get('departments') or []
-        if not raw_depts:
-            raw_depts = [item.get('department', 'GENERAL')]
-
-    resolved = []
-    unresolved = []
-    seen = set()
-
-    for raw_input in raw_depts:
-        if not raw_input:
-            continue
-
-        matched = _match_department(raw_input, dept_maps)
-        if matched:
-            canonical = matched.dept_name
-            if canonical not in seen:
-                resolved.append(canonical)
-                seen.add(canonical)
-        else:
-            # For unresolved, if it's a dict, convert to a readable string for display
-            if isinstance(raw_input, dict):
-                d_val = (raw_input.get('designation') or '').strip()
-                n_val = (raw_input.get('department') or '').strip()
-                label = f"{d_val}, {n_val}" if d_val and n_val else (d_val or n_val)
-                unresolved.append(label or "Unknown")
-            else:
-                unresolved.append(str(raw_input))
-
-    if resolved:
-        item['departments'] = resolved
-        item['department'] = json.dumps(resolved)
-    else:
-        item['departments'] = unresolved
-        item['department'] = json.dumps(unresolved)
-
-    return item
-
-
-def _collect_unknown_departments(issues_data):
-    dept_maps = _build_department_name_maps(Department.objects.all())
+def _collect_unknown_departments(issues_data, resolution):
     unknown = set()
 
     for item in issues_data:
-        for dept_input in _extract_departments(item):
-            if not _match_department(dept_input, dept_maps):
+        # Same inputs allocate_issues will resolve: the DPO's edited list first
+        for dept_input in _department_inputs(item):
+            if not resolution.match(dept_input):
                 if isinstance(dept_input, dict):
                     d_val = (dept_input.get('designation') or '').strip()
                     n_val = (dept_input.get('department') or '').strip()
@@ -533,78 +455,6 @@ def _collect_unknown_departments(issues_data):
     return sorted(list(unknown))
 
 
-def _create_issues_for_minutes(minute_obj, issues_data):
-    dept_counts = {}
-    dept_maps = _build_department_name_maps(Department.objects.all())
-
-    for item in issues_data:
-        issue_title = item.get('issue', 'No Title')
-
-        # Resolve parent_issue if provided
-        parent_issue_id = item.get('parent_issue_id')
-        parent_issue_obj = None
-        if parent_issue_id:
-            try:
-                parent_issue_obj = Issue.objects.get(id=int(parent_issue_id))
-                # Star topology: always point to the absolute root
-                # Recursive traversal to the top-most parent
-                visited = set()
-                while parent_issue_obj.parent_issue and parent_issue_obj.id not in visited:
-                    visited.add(parent_issue_obj.id)
-                    parent_issue_obj = parent_issue_obj.parent_issue
-            except (Issue.DoesNotExist, ValueError, TypeError):
-                parent_issue_obj = None
-
-        # Use update_or_create to avoid duplicates when re-allocating from drafts.
-        # Match on minutes + issue_title to find existing issues.
-        issue, created = Issue.objects.update_or_create(
-            minutes=minute_obj,
-            issue_title=issue_title,
-            defaults={
-                'issue_no': str(item.get('issue_no', '')),
-                'issue_description': item.get('issue_description', ''),
-                'location': item.get('location', ''),
-                'priority': item.get('priority', 'Medium'),
-                'parent_issue': parent_issue_obj,
-            }
-        )
-
-        normalized_item = _normalize_issue_departments(item, dept_maps)
-        dept_list = _extract_departments(normalized_item)
-
-        d_date = _parse_deadline(item)
-
-        for dept_name in dept_list:
-            dept = _match_department(dept_name, dept_maps)
-            if not dept:
-                continue
-
-            # Use update_or_create for IssueDepartment too, so re-allocation
-            # updates the existing assignment instead of creating a duplicate.
-            _issue_dept, id_created = IssueDepartment.objects.update_or_create(
-                issue=issue,
-                department=dept,
-                defaults={
-                    'deadline_date': d_date,
-                    'status': 'pending',
-                }
-            )
-
-            # Only count as new assignment if the IssueDepartment was just created
-            if id_created:
-                dept_counts[dept] = dept_counts.get(dept, 0) + 1
-
-    # Only send notifications for genuinely new assignments
-    for dept, count in dept_counts.items():
-        users = User.objects.filter(department=dept).exclude(role__in=['DPO', 'COLLECTOR'])
-        for u in users:
-            Notification.objects.create(
-                user=u,
-                issue_department=None,
-                message=f"ACTION REQUIRED: {count} new issues have been assigned to your department."
-            )
-
-
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def allocate_single(request):
@@ -620,7 +470,8 @@ def allocate_single(request):
     if err:
         return err
 
-    unknown_departments = _collect_unknown_departments([issue_item])
+    resolution = get_department_matcher().resolution('allocate_single')
+    unknown_departments = _collect_unknown_departments([issue_item], resolution)
     if unknown_departments:
         return Response(
             {
@@ -630,7 +481,8 @@ def allocate_single(request):
             status=400,
         )
 
-    _create_issues_for_minutes(minute_obj, [issue_item])
+    allocate_issues(minute_obj, [issue_item], user=request.user, resolution=resolution)
+    resolution.log()
     return Response({"success": True, "allocated": 1})
 
 
@@ -656,7 +508,8 @@ def allocate_all(request):
     if err:
         return err
 
-    unknown_departments = _collect_unknown_departments(issues_data)
+    resolution = get_department_matcher().resolution('allocate_all')
+    unknown_departments = _collect_unknown_departments(issues_data, resolution)
     if unknown_departments:
         return Response(
             {
@@ -666,7 +519,8 @@ def allocate_all(request):
             status=400,
         )
 
-    _create_issues_for_minutes(minute_obj, issues_data)
+    allocate_issues(minute_obj, issues_data, user=request.user, resolution=resolution)
+    resolution.log()
 
     TEMP_DATA_CACHE = []
     return Response({"success": True, "allocated": len(issues_data)})
@@ -1243,17 +1097,21 @@ def get_existing_issues(request):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def match_issues(request):
-    """Use Gemini to suggest matches between new and existing issues."""
+    """Suggest matches between new and existing issues (local prefilter, then Gemini)."""
     if request.user.role.lower() != 'dpo':
         return Response({"error": "Unauthorized"}, status=403)
 
     new_issues = request.data.get('new_issues', [])
     existing_issues = request.data.get('existing_issues', [])
+    engine = request.data.get('engine') or None
+    if engine is not None and engine not in MATCH_ENGINES:
+        return Response({"error": f"engine must be one of: {', '.join(MATCH_ENGINES)}"}, status=400)
 
     if not new_issues or not existing_issues:
         return Response([])
 
-    matches = match_issues_with_gemini(new_issues, existing_issues)
+    with metrics_endpoint('match_issues'):
+        matches = match_new_issues(new_issues, existing_issues, engine=engine)
     return Response(matches)
 
 
@@ -123,6 +123,44 @@ REST_FRAMEWORK = {
     },
 }
 TOKEN_TTL_HOURS = int(os.getenv('TOKEN_TTL_HOURS', '8'))
+# Background jobs left 'running' longer than this are requeued when a worker starts
+JOB_STALE_AFTER_MINUTES = int(os.getenv('JOB_STALE_AFTER_MINUTES', '30'))
+# How often the jobs/<id>/events SSE stream re-reads the job row
+JOB_EVENTS_POLL_SECONDS = float(os.getenv('JOB_EVENTS_POLL_SECONDS', '0.5'))
+# Each SSE stream is closed after this long so it doesn't hold a web worker; clients reconnect
+JOB_EVENTS_MAX_SECONDS = float(os.getenv('JOB_EVENTS_MAX_SECONDS', '60'))
+JOB_EVENTS_RETRY_MS = int(os.getenv('JOB_EVENTS_RETRY_MS', '2000'))
+# Gemini extraction cache (see api/extraction_cache.py); 0 disables the limit
+EXTRACTION_CACHE_TTL_DAYS = int(os.getenv('EXTRACTION_CACHE_TTL_DAYS', '30'))
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv('EXTRACTION_CACHE_MAX_ENTRIES', '500'))
+# Process pool size for ZIP bulk ingestion; 0 = min(4, CPU count)
+BULK_INGEST_MAX_WORKERS = int(os.getenv('BULK_INGEST_MAX_WORKERS', '0'))
+# One ModelCallMetric row per Gemini call (see api/model_metrics.py)
+MODEL_METRICS_ENABLED = os.getenv('MODEL_METRICS_ENABLED', 'True').lower() == 'true'
+# Issue matching: only the top-K most similar existing issues per new issue
+# (character n-gram TF-IDF, see api/issue_index.py) are sent to Gemini
+MATCH_PREFILTER_TOP_K = int(os.getenv('MATCH_PREFILTER_TOP_K', '5'))
+MATCH_PREFILTER_MIN_SCORE = float(os.getenv('MATCH_PREFILTER_MIN_SCORE', '0.05'))
+# n-grams kept per issue / looked up per query in the persistent similarity index (api/issue_index_store.py)
+ISSUE_INDEX_MAX_TERMS = int(os.getenv('ISSUE_INDEX_MAX_TERMS', '64'))
+ISSUE_INDEX_QUERY_TERMS = int(os.getenv('ISSUE_INDEX_QUERY_TERMS', '32'))
+
+# Issue matching engine: 'auto' (Gemini, lexical fallback), 'gemini' or 'lexical'.
+# The lexical matcher (api/lexical_matcher.py) scores BM25 plus location overlap in [0, 1].
+MATCH_ENGINE = os.getenv('MATCH_ENGINE', 'auto')
+LEXICAL_MATCH_HIGH = float(os.getenv('LEXICAL_MATCH_HIGH', '0.55'))
+LEXICAL_MATCH_MEDIUM = float(os.getenv('LEXICAL_MATCH_MEDIUM', '0.35'))
+LEXICAL_MATCH_LOCATION_WEIGHT = float(os.getenv('LEXICAL_MATCH_LOCATION_WEIGHT', '0.2'))
+
+# Near-duplicate issues within one upload (api/near_duplicates.py): 'flag', 'merge' or 'off'.
+# 'flag' only marks them for the DPO; 'merge' drops them, so a false positive loses an action item.
+# With BANDS bands of NUM_PERM/BANDS rows, pairs around Jaccard 0.5 and up become candidates;
+# THRESHOLD is then checked on the exact shingle sets.
+NEAR_DUPLICATE_MODE = os.getenv('NEAR_DUPLICATE_MODE', 'flag')
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', '0.7'))
+NEAR_DUPLICATE_NUM_PERM = int(os.getenv('NEAR_DUPLICATE_NUM_PERM', '64'))
+NEAR_DUPLICATE_BANDS = int(os.getenv('NEAR_DUPLICATE_BANDS', '16'))
+NEAR_DUPLICATE_SHINGLE_SIZE = int(os.getenv('NEAR_DUPLICATE_SHINGLE_SIZE', '5'))
 SESSION_COOKIE_SAMESITE = 'Lax'
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SECURE = os.getenv('SESSION_COOKIE_SECURE', 'False').lower() == 'true'
@@ -46,6 +46,7 @@ export default function AssignIssues({ draftId = null }) {
       index: idx,
       issue: iss.issue || "",
       issue_description: iss.issue_description || "",
+      location: iss.location || "",
     }));
 
     const existingForMatching = existingIssues.map((iss) => ({
@@ -53,6 +54,7 @@ export default function AssignIssues({ draftId = null }) {
       issue: iss.issue,
       issue_description: iss.issue_description,
       minutes_title: iss.minutes_title,
+      location: iss.location || "",
     }));
 
     setMatchingInProgress(true);
@@ -79,6 +79,16 @@ export default function IssueAssignCard({
               <LinkIcon style={{ fontSize: 14 }} /> Follow-up
             </span>
           )}
+          {issue.merged_issue_nos?.length > 0 && (
+            <span className="dpo-duplicate-badge" title={`Merged near-duplicates: ${issue.merged_issue_nos.join(", ")}`}>
+              +{issue.merged_issue_nos.length} merged
+            </span>
+          )}
+          {issue.near_duplicate_of && (
+            <span className="dpo-duplicate-badge" title="Near-duplicate of another issue in these minutes">
+              Duplicate of {issue.near_duplicate_of}
+            </span>
+          )}
         </div>
         <button
           className={`dpo-flag-btn ${mappedExistingId ? "dpo-flag-btn-mapped" : ""} ${
@@ -162,6 +172,9 @@ export default function IssueAssignCard({
           <DepartmentSelector
             value={issue.department}
             onChange={(value) => handleChange("department", value)}
+            onAliasMapped={(label, deptName) =>
+              handleChange("department_aliases", { ...(issue.department_aliases || {}), [label]: deptName })
+            }
           />
         </div>
 
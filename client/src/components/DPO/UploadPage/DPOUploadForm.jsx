@@ -2,8 +2,17 @@
 import React, { useRef, useState, useEffect } from "react";
 import "./DPOUploadForm.css";
 import api from "../../../api/axios";
+import { getAuthValue } from "../../../utils/authStorage";
 import { saveDraft } from "../../../utils/dpoDrafts";
 
+const JOB_POLL_INTERVAL_MS = 2000;
+// Wait before reopening the event stream, unless the server sends its own `retry:`
+const JOB_STREAM_RETRY_MS = 2000;
+// Give up on a job after this long (e.g. when the run_jobs worker is not running)
+const JOB_TIMEOUT_MS = 10 * 60 * 1000;
+const JOB_TIMEOUT_MESSAGE =
+  "Extraction is taking too long. The processing service may be down; please try again later.";
+
 export default function UploadForm({ onProcessed }) {
   /* ================= REFS ================= */
   const datePickerRef = useRef(null);
@@ -14,6 +23,7 @@ export default function UploadForm({ onProcessed }) {
   const [date, setDate] = useState("");
   const [dragOver, setDragOver] = useState(false);
   const [uploading, setUploading] = useState(false);
+  const [streamedIssues, setStreamedIssues] = useState([]);
 
   /* ================= STATUS TEXT ================= */
   const statusMessages = [
@@ -44,6 +54,83 @@ export default function UploadForm({ onProcessed }) {
     return `${digits.slice(0, 2)}-${digits.slice(2, 4)}-${digits.slice(4)}`;
   };
 
+  // Extraction runs in a background worker; poll the job until it finishes or the deadline passes.
+  const waitForJob = async (jobId, deadline) => {
+    if (!jobId) throw new Error("No job id returned by upload");
+
+    while (Date.now() < deadline) {
+      const { data } = await api.get(`/jobs/${jobId}`);
+      if (data?.status === "completed") return data;
+      if (data?.status === "failed") throw new Error(data?.error || "Extraction failed");
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    }
+    throw new Error(JOB_TIMEOUT_MESSAGE);
+  };
+
+  // Server-Sent Events feed of the job: each issue shows up as soon as it is extracted.
+  // The server closes each stream after about a minute; reconnect from the last issue received.
+  const streamJob = async (jobId, onIssue, deadline) => {
+    // Aborting at the deadline makes the pending fetch/read below reject
+    const controller = new AbortController();
+    const timer = setTimeout(() => controller.abort(), Math.max(0, deadline - Date.now()));
+    const cursor = { after: 0 };
+    try {
+      while (true) {
+        const { job, retryMs } = await readJobEvents(jobId, onIssue, controller.signal, cursor);
+        if (job) return job;
+        await new Promise((resolve) => setTimeout(resolve, retryMs));
+      }
+    } finally {
+      clearTimeout(timer);
+    }
+  };
+
+  // fetch() is used instead of EventSource so the auth header can be sent.
+  const readJobEvents = async (jobId, onIssue, signal, cursor) => {
+    const res = await fetch(`${api.defaults.baseURL}/jobs/${jobId}/events?after=${cursor.after}`, {
+      headers: {
+        Accept: "text/event-stream",
+        Authorization: `Token ${getAuthValue("token")}`,
+      },
+      signal,
+    });
+    if (!res.ok || !res.body) throw new Error(`Event stream unavailable (${res.status})`);
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let retryMs = JOB_STREAM_RETRY_MS;
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) return { job: null, retryMs };
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary;
+      while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        let event = "message";
+        let data = "";
+        for (const line of block.split("\n")) {
+          if (line.startsWith("event:")) event = line.slice(6).trim();
+          else if (line.startsWith("data:")) data += line.slice(5).trim();
+          else if (line.startsWith("retry:")) retryMs = Number(line.slice(6).trim()) || retryMs;
+        }
+        if (!data) continue;
+
+        const payload = JSON.parse(data);
+        if (event === "issue") {
+          cursor.after = payload.index + 1;
+          onIssue(payload.issue);
+        }
+        if (event === "done") return { job: payload, retryMs };
+        if (event === "error") throw new Error(payload.error || "Extraction failed");
+      }
+    }
+  };
+
   /* ================= HANDLERS ================= */
   const handleDateChange = (e) => {
     setDate(formatDateInput(e.target.value));
@@ -68,6 +155,7 @@ export default function UploadForm({ onProcessed }) {
 
     try {
       setUploading(true);
+      setStreamedIssues([]);
 
       const formData = new FormData();
       formData.append("meeting_date", date);
@@ -77,8 +165,19 @@ export default function UploadForm({ onProcessed }) {
         headers: { "Content-Type": "multipart/form-data" },
       });
 
-      const extractedIssues = Array.isArray(res?.data?.data) ? res.data.data : [];
-      const minutesId = res?.data?.minutes_id || null;
+      const jobId = res?.data?.job_id;
+      const deadline = Date.now() + JOB_TIMEOUT_MS;
+      let job;
+      try {
+        job = await streamJob(jobId, (issue) => setStreamedIssues((prev) => [...prev, issue]), deadline);
+      } catch (streamErr) {
+        if (Date.now() >= deadline) throw new Error(JOB_TIMEOUT_MESSAGE);
+        console.warn("Streaming unavailable, polling job instead:", streamErr);
+        job = await waitForJob(jobId, deadline);
+      }
+
+      const extractedIssues = Array.isArray(job?.clean_data) ? job.clean_data : [];
+      const minutesId = job?.minutes_id || null;
       const draftId = `draft_${Date.now()}`;
 
       saveDraft({
@@ -92,7 +191,7 @@ export default function UploadForm({ onProcessed }) {
       onProcessed(draftId);
     } catch (err) {
       console.error("Upload error:", err);
-      alert("Failed to upload file.");
+      alert(err?.message === JOB_TIMEOUT_MESSAGE ? JOB_TIMEOUT_MESSAGE : "Failed to upload file.");
       setUploading(false);
     }
   };
@@ -113,8 +212,20 @@ export default function UploadForm({ onProcessed }) {
             <div className="dpo-field dpo-medium"></div>
           </div>
 
-          <p className="dpo-status">{statusMessages[statusIndex]}</p>
+          <p className="dpo-status">
+            {streamedIssues.length > 0
+              ? `${streamedIssues.length} issue(s) extracted so far…`
+              : statusMessages[statusIndex]}
+          </p>
         </div>
+
+        {streamedIssues.length > 0 && (
+          <ul className="dpo-streamed-issues">
+            {streamedIssues.map((issue, idx) => (
+              <li key={idx}>{issue?.issue || "Untitled issue"}</li>
+            ))}
+          </ul>
+        )}
       </div>
     );
   }
@@ -3,11 +3,13 @@ import "./DepartmentSelector.css";
 import CloseIcon from "@mui/icons-material/Close";
 import api from "../../../api/axios";
 
-export default function DepartmentSelector({ value = "", onChange }) {
+export default function DepartmentSelector({ value = "", onChange, onAliasMapped }) {
   const [departments, setDepartments] = useState([]);
   const [selectedDepts, setSelectedDepts] = useState([]);
   const [dropdownOpen, setDropdownOpen] = useState(false);
   const [searchInput, setSearchInput] = useState("");
+  // Unknown (unmatched) tag the DPO is replacing with a master-list department
+  const [replacing, setReplacing] = useState(null);
   const dropdownRef = useRef(null);
 
   // Parse the value (could be JSON array, string array, or comma-separated)
@@ -61,9 +63,19 @@ export default function DepartmentSelector({ value = "", onChange }) {
     );
   });
 
+  const knownNames = new Set(departments.map((dept) => dept.dept_name));
+  const isUnknown = (deptName) => departments.length > 0 && !knownNames.has(deptName);
+
   // Handle adding a department
   const handleAddDept = (deptName) => {
-    const updated = [...selectedDepts, deptName];
+    let updated = [...selectedDepts, deptName];
+    if (replacing) {
+      // Replace the unknown tag in place; the backend learns it as an alias on allocation
+      updated = selectedDepts.map((d) => (d === replacing ? deptName : d));
+      updated = updated.filter((d, i) => updated.indexOf(d) === i);
+      onAliasMapped?.(replacing, deptName);
+      setReplacing(null);
+    }
     setSelectedDepts(updated);
     // Use JSON encoding to safely handle department names with commas
     onChange(JSON.stringify(updated));
@@ -71,6 +83,12 @@ export default function DepartmentSelector({ value = "", onChange }) {
     setDropdownOpen(false);
   };
 
+  const handleStartReplace = (deptName) => {
+    setReplacing(deptName);
+    setSearchInput("");
+    setDropdownOpen(true);
+  };
+
   // Handle removing a department
   const handleRemoveDept = (deptName) => {
     const updated = selectedDepts.filter((d) => d !== deptName);
@@ -87,6 +105,9 @@ export default function DepartmentSelector({ value = "", onChange }) {
       }
     };
 
+    if (!dropdownOpen) {
+      setReplacing(null);
+    }
     if (dropdownOpen) {
       document.addEventListener("mousedown", handleClickOutside);
       return () => document.removeEventListener("mousedown", handleClickOutside);
@@ -98,8 +119,23 @@ export default function DepartmentSelector({ value = "", onChange }) {
       <div className="dept-selector-input-wrapper">
         <div className="dept-tags-area">
           {selectedDepts.map((dept) => (
-            <div key={dept} className="dept-tag">
-              <span className="dept-tag-label">{dept}</span>
+            <div
+              key={dept}
+              className={`dept-tag ${isUnknown(dept) ? "dept-tag-unknown" : ""} ${
+                replacing === dept ? "dept-tag-replacing" : ""
+              }`}
+            >
+              {isUnknown(dept) ? (
+                <button
+                  className="dept-tag-label dept-tag-map"
+                  onClick={() => handleStartReplace(dept)}
+                  title="Not in the master list - click to map it to a department"
+                >
+                  {dept}
+                </button>
+              ) : (
+                <span className="dept-tag-label">{dept}</span>
+              )}
               <button
                 className="dept-tag-remove"
                 onClick={() => handleRemoveDept(dept)}
@@ -123,6 +159,9 @@ export default function DepartmentSelector({ value = "", onChange }) {
 
       {dropdownOpen && (
         <div className="dept-dropdown">
+          {replacing && (
+            <div className="dept-dropdown-hint">Map "{replacing}" to:</div>
+          )}
           {filteredDepts.length === 0 && (
             <div className="dept-dropdown-empty">
               {searchInput.trim()